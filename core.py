@@ -14,30 +14,46 @@ Environment Variables:
 - AUTHENTIK_CLIENT_SECRET: Client secret for Authentik.
 - AUTHENTIK_REDIRECT_URI: Redirect URI for OAuth.
 - AUTHENTIK_JWKS_URL: JWKS URL for Authentik.
+
+The OAuth client is registered on first use (get_oauth), and AUTHENTIK_URL is
+validated in the application lifespan, so importing this module has no side
+effects beyond reading the environment.
 """
 
 import os
+from functools import lru_cache
 from fastapi.templating import Jinja2Templates
-from authlib.integrations.starlette_client import OAuth # type: ignore
 from dotenv import load_dotenv # type: ignore
 
 load_dotenv()
 
 url = os.getenv("AUTHENTIK_URL")
-if not url:
-    raise ValueError("AUTHENTIK_URL environment variable is not set.")
 
 templates = Jinja2Templates(directory="templates")
-oauth = OAuth()
-
-oauth.register(
-    name='authentik',
-    client_id=os.getenv("AUTHENTIK_CLIENT_ID"),
-    client_secret=os.getenv("AUTHENTIK_CLIENT_SECRET"),
-    authorize_url=f'{url}/application/o/authorize/',
-    access_token_url=f'{url}/application/o/token/',
-    refresh_token_url=f'{url}/application/o/token/',
-    redirect_uri=os.getenv("AUTHENTIK_REDIRECT_URI"),
-    client_kwargs={'scope': 'openid profile email offline_access'},
-    jwks_uri=os.getenv("AUTHENTIK_JWKS_URL")
-)
+
+
+def validar_configuracion_oauth():
+    """Raises if AUTHENTIK_URL is missing; called at startup and before registering the client."""
+    if not url:
+        raise ValueError("AUTHENTIK_URL environment variable is not set.")
+
+
+@lru_cache(maxsize=None)
+def get_oauth():
+    """Returns the OAuth client, registering it on first use (authlib is imported here)."""
+    from authlib.integrations.starlette_client import OAuth # type: ignore
+
+    validar_configuracion_oauth()
+    oauth = OAuth()
+    oauth.register(
+        name='authentik',
+        client_id=os.getenv("AUTHENTIK_CLIENT_ID"),
+        client_secret=os.getenv("AUTHENTIK_CLIENT_SECRET"),
+        authorize_url=f'{url}/application/o/authorize/',
+        access_token_url=f'{url}/application/o/token/',
+        refresh_token_url=f'{url}/application/o/token/',
+        redirect_uri=os.getenv("AUTHENTIK_REDIRECT_URI"),
+        client_kwargs={'scope': 'openid profile email offline_access'},
+        jwks_uri=os.getenv("AUTHENTIK_JWKS_URL")
+    )
+    return oauth
@@ -10,39 +10,106 @@ Dependencies:
 
 Environment Variables:
 - SQLALCHEMY_DATABASE_URL: Database connection URL.
+- DB_CONNECT_RETRIES: Connection attempts at startup before giving up (default 10).
+- DB_CONNECT_DELAY: Seconds between connection attempts (default 5).
+- DB_POOL_SIZE: Connections kept open in the pool (default 5).
+- DB_MAX_OVERFLOW: Extra connections opened under bursts beyond DB_POOL_SIZE (default 10).
+- DB_POOL_TIMEOUT: Seconds a request waits for a free connection before failing (default 30).
+- DB_POOL_RECYCLE: Seconds after which a connection is replaced; -1 disables it (default 1800).
+- DB_POOL_PRE_PING: Test each connection on checkout and replace dead ones (default true).
+- DB_STATEMENT_TIMEOUT_MS: PostgreSQL statement_timeout per connection; 0 disables it (default 0).
+- DB_ASYNC_POOL_SIZE, DB_ASYNC_MAX_OVERFLOW: Pool of the async engine (default: same as the sync pool).
+- DB_REPLICA_URLS and related: Read replicas for get_async_db (see src.utils.db_replicas).
 
 Functions:
 - get_db: Yields a database session for use in FastAPI routes.
-- load_triggers: Loads triggers from an SQL file.
+- esperar_base_de_datos: Waits for the database at application startup.
+- crear_engine: Creates an engine with the configured, instrumented pool (src.utils.db_pool).
+- get_async_db: Yields an AsyncSession (asyncpg, or aiosqlite for SQLite) for async routes,
+  on a healthy read replica when DB_REPLICA_URLS is set.
+
+Importing this module does not connect: create_engine is lazy, and the wait
+for the database runs in the application lifespan (main.create_app).
 """
 
 import time
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 import os
+from src.utils.db_pool import InstrumentedAsyncAdaptedQueuePool, InstrumentedQueuePool
+from src.utils.db_replicas import DB_REPLICA_URLS, EnrutadorLecturas
 
 # Cargar las variables de entorno desde el archivo .env
 load_dotenv()
 
 # Leer la URL de la base de datos desde las variables de entorno
 DATABASE_URL = os.getenv("SQLALCHEMY_DATABASE_URL")
-print(f"Conectando a la base de datos: {DATABASE_URL}")
+DB_CONNECT_RETRIES = int(os.getenv("DB_CONNECT_RETRIES", "10"))
+DB_CONNECT_DELAY = float(os.getenv("DB_CONNECT_DELAY", "5"))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+DB_ASYNC_POOL_SIZE = int(os.getenv("DB_ASYNC_POOL_SIZE", str(DB_POOL_SIZE)))
+DB_ASYNC_MAX_OVERFLOW = int(os.getenv("DB_ASYNC_MAX_OVERFLOW", str(DB_MAX_OVERFLOW)))
 
-for _ in range(10):  # Intentar 10 veces
-    try:
-        engine = create_engine(DATABASE_URL)
-        connection = engine.connect()
-        print("Conexión exitosa a la base de datos")
-        break
-    except OperationalError:
-        print("Base de datos no disponible, reintentando en 5 segundos...")
-        time.sleep(5)
-else:
-    print("No se pudo conectar a la base de datos después de varios intentos")
-    raise
+
+# Driver asíncrono por base de datos (asyncpg en producción, aiosqlite en desarrollo)
+DRIVERS_ASYNC = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def crear_engine(url: str, asincrono: bool = False):
+    """
+    Engine con el pool configurado por las variables DB_POOL_* e instrumentado.
+    Con `asincrono=True` devuelve un AsyncEngine sobre el driver de DRIVERS_ASYNC.
+    """
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if asincrono:
+        url = url.set(drivername=f"{backend}+{DRIVERS_ASYNC[backend]}")
+    if backend == "sqlite" and url.database in (None, "", ":memory:"):
+        # SQLite en memoria usa un pool por hilo propio de SQLAlchemy
+        return create_async_engine(url) if asincrono else create_engine(url)
+
+    connect_args = {}
+    if backend == "postgresql" and DB_STATEMENT_TIMEOUT_MS > 0:
+        # Cancela en el servidor las sentencias que superan el límite
+        if asincrono:
+            connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+        else:
+            connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    opciones = dict(
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+    if asincrono:
+        return create_async_engine(
+            url,
+            poolclass=InstrumentedAsyncAdaptedQueuePool,
+            pool_size=DB_ASYNC_POOL_SIZE,
+            max_overflow=DB_ASYNC_MAX_OVERFLOW,
+            **opciones,
+        )
+    return create_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        **opciones,
+    )
+
+
+# create_engine no abre conexiones: la primera se abre al usarla
+engine = crear_engine(DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
@@ -53,4 +120,70 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# Réplicas de lectura (DB_REPLICA_URLS); sin réplicas todo va al primario
+enrutador_lecturas = EnrutadorLecturas(DB_REPLICA_URLS, crear_engine)
+
+# Engine asíncrono: se crea al primer uso, junto al síncrono y sobre la misma base
+_async_engine = None
+_AsyncSessionLocal = None
+
+
+def get_async_engine():
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is None:
+        _async_engine = crear_engine(DATABASE_URL, asincrono=True)
+        _AsyncSessionLocal = async_sessionmaker(
+            _async_engine, autoflush=False, expire_on_commit=False
+        )
+    return _async_engine
+
+
+async def get_async_db():
+    """
+    Sesión asíncrona para rutas `async def`: la espera de la base no ocupa un
+    hilo del threadpool de AnyIO. Los servicios síncronos se reutilizan con
+    `await db.run_sync(servicio, ...)`, que los ejecuta sobre la conexión asíncrona.
+
+    Con réplicas configuradas, la sesión usa una réplica sana salvo que el
+    cliente haya escrito hace poco (lectura de las propias escrituras); por eso
+    solo la usan rutas de lectura: las escrituras van siempre por get_db.
+    """
+    replica = enrutador_lecturas.elegir()
+    if replica is None:
+        get_async_engine()
+        fabrica = _AsyncSessionLocal
+    else:
+        fabrica = replica.sesiones_async()
+    async with fabrica() as db:
+        yield db
+
+
+async def cerrar_async_engine():
+    """Cierra las conexiones del engine asíncrono y de las réplicas al apagar la aplicación."""
+    global _async_engine, _AsyncSessionLocal
+    await enrutador_lecturas.detener()
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = _AsyncSessionLocal = None
+
+
+def esperar_base_de_datos(
+    intentos: int = DB_CONNECT_RETRIES, espera: float = DB_CONNECT_DELAY
+):
+    """Comprueba la conexión al arrancar, reintentando mientras la base no esté disponible."""
+    print(f"Conectando a la base de datos: {engine.url.render_as_string(hide_password=True)}")
+    for intento in range(intentos):
+        try:
+            with engine.connect():
+                pass
+            print("Conexión exitosa a la base de datos")
+            return
+        except OperationalError:
+            if intento == intentos - 1:
+                print("No se pudo conectar a la base de datos después de varios intentos")
+                raise
+            print(f"Base de datos no disponible, reintentando en {espera:g} segundos...")
+            time.sleep(espera)
@@ -3,9 +3,8 @@ main.py
 Este archivo es el punto de entrada para la aplicación FastAPI. Configura middleware, rutas y la inicialización de la base de datos.
 
 Características:
-- Configuración de middleware para servir archivos estáticos.
-- Registro de rutas para diferentes módulos de la aplicación.
-- Inicialización de la base de datos.
+- Fábrica de la aplicación (create_app) con middleware, rutas y archivos estáticos.
+- Inicialización de la base de datos y de los workers en el lifespan, no al importar.
 
 Dependencias:
 - fastapi: Framework para construir la aplicación web.
@@ -15,10 +14,17 @@ Dependencias:
 
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
-from database import Base, engine
+from starlette.concurrency import run_in_threadpool
+from database import (
+    Base,
+    cerrar_async_engine,
+    engine,
+    enrutador_lecturas,
+    esperar_base_de_datos,
+)
 from dotenv import load_dotenv
 from fastapi.security import OAuth2AuthorizationCodeBearer
-from core import url
+from core import url, validar_configuracion_oauth
 import os
 from starlette.middleware.sessions import SessionMiddleware
 
@@ -31,6 +37,7 @@ from src.documento.factura.facturaRouter import router as factura_router
 from src.monedas.monedaRouter import router as moneda_router
 from src.loggers.loggerRouter import router as logger_router
 from src.documento.notas.notaRouter import router as nota_router
+from src.monitoreo.monitoreoRouter import router as monitoreo_router
 
 # from src.documento.notas.notaRouter import router as nota_router
 # from src.documento.orden_entrega.ordenEntregaRouter import (
@@ -46,14 +53,31 @@ from src.documento.factura.detalleFactura.detalleFacturaRouter import (
 
 from src.auditoria.audRouter import router as auditoria_router
 from src.auth.auth_routes import router as auth_router
-from src.utils.custom_handlers import authentik_swagger_protection, custom_404_handler
-from src.utils.cron.updateDolar import iniciar_cron_job, detener_cron_job
+from src.utils.custom_handlers import (
+    AuthentikSwaggerProtectionMiddleware,
+    custom_404_handler,
+    cursor_invalido_handler,
+)
+from src.utils.pagination import CursorInvalidoError
+from src.utils.db_replicas import ConsistenciaLecturaMiddleware
+from src.utils.sql_metricas import SQLMetricasMiddleware
+from src.utils.esquema import asegurar_esquema
+from src.utils.cron.planificador import iniciar_planificador, detener_planificador
+from src.utils.cron import updateDolar  # Registrar el job de actualización del dólar
+from src.documento.documentoService.smartClient import smart_client
+from src.documento.documentoService.smartService import validar_configuracion_smart
+from src.documento.imprenta.imprentaService import (
+    iniciar_workers_imprenta,
+    detener_workers_imprenta,
+)
 from src.auditoria import auditoria_triggers # Importar triggers de auditoría
 from src.auth.group_middleware import GroupMembershipMiddleware
 
 # Cargar variables de entorno
 load_dotenv()
 
+POST_SMART = os.getenv("POST_SMART") == "true"
+
 # Define OAuth2 scheme for Authentik
 authentik_oauth2_scheme = OAuth2AuthorizationCodeBearer(
     authorizationUrl=f"{url}/application/o/authorize/",
@@ -61,9 +85,19 @@ authentik_oauth2_scheme = OAuth2AuthorizationCodeBearer(
 )
 
 
-async def lifespan_with_cron(app: FastAPI):
+def _reiniciar_base_de_datos():
+    """Elimina y recrea todas las tablas (RESET_DB=true)."""
+    print("Reiniciando la base de datos...")
+    Base.metadata.drop_all(bind=engine)
+    print("Tablas eliminadas correctamente.")
+    Base.metadata.create_all(bind=engine)
+    print("Tablas recreadas correctamente.")
+
+
+async def lifespan(app: FastAPI):
     """
-    Lifespan event handler to manage the application lifecycle with cron job initialization and cleanup.
+    Lifespan event handler: validates the configuration, waits for the database
+    and starts the background workers. Nothing here runs at import time.
 
     Args:
         app (FastAPI): The FastAPI application instance.
@@ -71,86 +105,105 @@ async def lifespan_with_cron(app: FastAPI):
     Yields:
         None
     """
-    # Iniciar el cron job al inicio de la aplicación
-    iniciar_cron_job()
+    # Validar la configuración obligatoria al arrancar (no al importar)
+    validar_configuracion_oauth()
+    if POST_SMART:
+        validar_configuracion_smart()
+
+    # Esperar a la base de datos fuera del event loop
+    await run_in_threadpool(esperar_base_de_datos)
+    if app.state.reset_db:
+        await run_in_threadpool(_reiniciar_base_de_datos)
+    # Crear las tablas e índices agregados después del esquema inicial, si faltan
+    await run_in_threadpool(asegurar_esquema)
+
+    # Comprobar la salud de las réplicas de lectura (si hay)
+    enrutador_lecturas.iniciar()
+    # Iniciar el planificador; solo el worker líder ejecuta los jobs
+    iniciar_planificador()
+    # Iniciar los trabajadores de la cola de imprenta
+    if POST_SMART:
+        iniciar_workers_imprenta()
 
     yield
 
-    # Detener el cron job al apagar la aplicación
-    detener_cron_job()
+    # Detener el planificador al apagar la aplicación (espera los jobs en curso y libera el liderazgo)
+    await run_in_threadpool(detener_planificador)
+    if POST_SMART:
+        detener_workers_imprenta()
+    # Cerrar el pool de conexiones del cliente SMART
+    smart_client.close()
+    # Cerrar las conexiones del engine asíncrono y de las réplicas (rutas GET)
+    await cerrar_async_engine()
 
 
-async def lifespan_with_reset_and_cron(app: FastAPI):
+def create_app(reset_db: bool = None) -> FastAPI:
     """
-    Lifespan event handler to manage the application lifecycle with database reset and cron job initialization.
+    Construye la aplicación: rutas, middlewares y manejadores. La conexión a la
+    base de datos, el cliente OAuth y los workers se inicializan en el lifespan
+    o en su primer uso.
 
     Args:
-        app (FastAPI): The FastAPI application instance.
-
-    Yields:
-        None
+        reset_db (bool): Recrear las tablas al arrancar; por defecto, RESET_DB.
     """
-    # Reiniciar la base de datos
-    print("Reiniciando la base de datos...")
-    Base.metadata.drop_all(bind=engine)
-    print("Tablas eliminadas correctamente.")
-    Base.metadata.create_all(bind=engine)
-    print("Tablas recreadas correctamente.")
-
-    # Iniciar el cron job al inicio de la aplicación
-    iniciar_cron_job()
-
-    yield
-
-    # Detener el cron job al apagar la aplicación
-    detener_cron_job()
-
-
-# Configurar la aplicación FastAPI
-USE_RESET = os.getenv("RESET_DB", "False").lower() == "true"
-
-app = FastAPI(
-    description="Version de notas de debito y credito",
-    title="API Facturacion AGV Services",
-    version="0.5.3",
-    lifespan=lifespan_with_reset_and_cron if USE_RESET else lifespan_with_cron,
-)
-
-# Middleware para servir archivos estáticos
-app.mount("/documents", StaticFiles(directory="documents"), name="documents")
-app.mount(
-    "/static",
-    StaticFiles(directory="static", html=True, check_dir=False),
-    name="static",
-)
-
-
-# Incluir routers con tags para organización
-app.include_router(empresa_router)
-app.include_router(cliente_router)
-app.include_router(producto_router)
-app.include_router(pedido_router)
-app.include_router(documento_router)
-app.include_router(factura_router)
-app.include_router(nota_router)
-# app.include_router(orden_entrega_router)
-# app.include_router(comprobante_retencion_router)
-app.include_router(detalle_factura_router)
-app.include_router(moneda_router)
-app.include_router(auditoria_router)
-app.include_router(logger_router)
-app.include_router(auth_router)
-
-# Registrar el exception handler
-app.exception_handler(404)(custom_404_handler)
-
-# Registrar el middleware
-app.middleware("http")(authentik_swagger_protection)
-
-# Agregar el SessionMiddleware
-app.add_middleware(
-    SessionMiddleware, secret_key=os.getenv("SESSION_SECRET_KEY", "default_secret_key")
-)
-
-# Agrgar el middleware de grupo de membresía
-app.add_middleware(GroupMembershipMiddleware)
\ No newline at end of file
+    if reset_db is None:
+        reset_db = os.getenv("RESET_DB", "False").lower() == "true"
+
+    app = FastAPI(
+        description="Version de notas de debito y credito",
+        title="API Facturacion AGV Services",
+        version="0.5.3",
+        lifespan=lifespan,
+    )
+    app.state.reset_db = reset_db
+
+    # Middleware para servir archivos estáticos
+    app.mount("/documents", StaticFiles(directory="documents"), name="documents")
+    app.mount(
+        "/static",
+        StaticFiles(directory="static", html=True, check_dir=False),
+        name="static",
+    )
+
+    # Incluir routers con tags para organización
+    app.include_router(empresa_router)
+    app.include_router(cliente_router)
+    app.include_router(producto_router)
+    app.include_router(pedido_router)
+    app.include_router(documento_router)
+    app.include_router(factura_router)
+    app.include_router(nota_router)
+    # app.include_router(orden_entrega_router)
+    # app.include_router(comprobante_retencion_router)
+    app.include_router(detalle_factura_router)
+    app.include_router(moneda_router)
+    app.include_router(auditoria_router)
+    app.include_router(logger_router)
+    app.include_router(monitoreo_router)
+    app.include_router(auth_router)
+
+    # Registrar el exception handler
+    app.exception_handler(404)(custom_404_handler)
+    app.exception_handler(CursorInvalidoError)(cursor_invalido_handler)
+
+    # Registrar los middlewares (ASGI puros). El último agregado es el más externo:
+    # SQLMetricasMiddleware -> GroupMembershipMiddleware -> SessionMiddleware -> AuthentikSwaggerProtectionMiddleware
+    # -> ConsistenciaLecturaMiddleware (ve el usuario ya verificado)
+    app.add_middleware(ConsistenciaLecturaMiddleware, enrutador=enrutador_lecturas)
+    app.add_middleware(AuthentikSwaggerProtectionMiddleware)
+
+    # Agregar el SessionMiddleware
+    app.add_middleware(
+        SessionMiddleware, secret_key=os.getenv("SESSION_SECRET_KEY", "default_secret_key")
+    )
+
+    # Agrgar el middleware de grupo de membresía
+    app.add_middleware(GroupMembershipMiddleware)
+
+    # Contar las consultas SQL de cada petición (Server-Timing, logs y N+1)
+    app.add_middleware(SQLMetricasMiddleware)
+    return app
+
+
+# Instancia usada por `uvicorn main:app`
+app = create_app()
@@ -0,0 +1,164 @@
+"""
+bench_async.py
+Benchmark de concurrencia de las rutas de lectura síncronas contra las asíncronas.
+
+Una ruta `def` con la sesión de get_db ocupa un hilo del threadpool de AnyIO
+(40 por defecto) durante toda su ida y vuelta a la base; una ruta `async def`
+con get_async_db solo ocupa una conexión. El benchmark expone la misma lectura
+(una consulta lenta de BENCH_LATENCIA_MS que simula la latencia de red de la
+base, seguida de get_producto_by_id) en las dos variantes, lanza N peticiones
+concurrentes a cada una y reporta el throughput, la latencia y el máximo de
+consultas en vuelo: la variante síncrona se estanca en el límite del
+threadpool y la asíncrona llega al tamaño del pool de conexiones.
+
+Los pools de ambos engines se dimensionan con BENCH_POOL para que no sean el
+límite. En SQLite la espera es una función registrada en cada conexión; en
+Postgres se usa pg_sleep. Cliente y aplicación comparten el proceso, así que
+con latencias muy bajas domina el costo de CPU por petición (aiosqlite pasa
+cada llamada por un hilo propio; asyncpg es más liviano) y la variante
+asíncrona no gana: su ventaja aparece cuando la espera por la base domina.
+
+Uso:
+    BENCH_DATABASE_URL=sqlite:///bench_async.db python scripts/bench_async.py
+
+Environment Variables:
+- BENCH_DATABASE_URL: Base de datos del benchmark (se crea la tabla de productos si falta). Por defecto SQLite local.
+- BENCH_CONCURRENCIA: Niveles de concurrencia separados por coma (por defecto "40,200,400").
+- BENCH_LATENCIA_MS: Latencia simulada por petición en milisegundos (por defecto 100).
+- BENCH_POOL: Tamaño de los pools síncrono y asíncrono (por defecto 250).
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BENCH_DATABASE_URL = os.getenv("BENCH_DATABASE_URL", "sqlite:///bench_async.db")
+BENCH_CONCURRENCIA = [int(n) for n in os.getenv("BENCH_CONCURRENCIA", "40,200,400").split(",")]
+BENCH_LATENCIA_MS = float(os.getenv("BENCH_LATENCIA_MS", "100"))
+BENCH_POOL = os.getenv("BENCH_POOL", "250")
+
+os.environ["SQLALCHEMY_DATABASE_URL"] = BENCH_DATABASE_URL
+for variable in ("DB_POOL_SIZE", "DB_ASYNC_POOL_SIZE"):
+    os.environ[variable] = BENCH_POOL
+
+import httpx  # noqa: E402
+from fastapi import Depends, FastAPI  # noqa: E402
+from sqlalchemy import event, insert, text  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+from sqlalchemy.schema import CreateTable  # noqa: E402
+
+from database import SessionLocal, engine, get_async_db, get_async_engine, get_db  # noqa: E402
+import main  # noqa: E402,F401  (registra todos los modelos)
+from src.producto.prodModel import Producto  # noqa: E402
+from src.producto.productoService import get_producto_by_id  # noqa: E402
+
+POSTGRES = engine.dialect.name == "postgresql"
+ESPERA = text("SELECT pg_sleep(:ms / 1000.0)" if POSTGRES else "SELECT espera(:ms)")
+
+
+class EnVuelo:
+    """Consultas ejecutándose al mismo tiempo (máximo observado)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.actual = 0
+        self.maximo = 0
+
+    def entrar(self, *args):
+        with self._lock:
+            self.actual += 1
+            self.maximo = max(self.maximo, self.actual)
+
+    def salir(self, *args):
+        with self._lock:
+            self.actual -= 1
+
+
+en_vuelo = EnVuelo()
+
+
+def _registrar_espera(dbapi_connection, connection_record):
+    # La espera corre en el hilo del driver (sqlite3 o el de aiosqlite), no en el event loop
+    dbapi_connection.create_function("espera", 1, lambda ms: time.sleep(ms / 1000) or 0)
+
+
+for motor in (engine, get_async_engine().sync_engine):
+    event.listen(motor, "before_cursor_execute", en_vuelo.entrar)
+    event.listen(motor, "after_cursor_execute", en_vuelo.salir)
+    if not POSTGRES:
+        event.listen(motor, "connect", _registrar_espera)
+
+app = FastAPI()
+
+
+@app.get("/sync/{producto_id}")
+def leer_sync(producto_id: int, db: Session = Depends(get_db)):
+    db.execute(ESPERA, {"ms": BENCH_LATENCIA_MS})
+    return get_producto_by_id(db, producto_id)
+
+
+@app.get("/async/{producto_id}")
+async def leer_async(producto_id: int, db: AsyncSession = Depends(get_async_db)):
+    await db.execute(ESPERA, {"ms": BENCH_LATENCIA_MS})
+    return await db.run_sync(get_producto_by_id, producto_id)
+
+
+def preparar():
+    # CREATE TABLE directo: sin los triggers de auditoría (solo Postgres)
+    with engine.begin() as conexion:
+        conexion.execute(CreateTable(Producto.__table__, if_not_exists=True))
+    with SessionLocal() as db:
+        if db.get(Producto, 1) is None:
+            db.execute(
+                insert(Producto),
+                [{"id": 1, "codigo": "BENCH", "descripcion": "Bench", "precio": 10, "stock": 1, "alicuota_iva": 16, "exento": False}],
+            )
+            db.commit()
+
+
+async def medir(cliente, ruta: str, concurrencia: int) -> dict:
+    en_vuelo.maximo = 0
+
+    async def una():
+        inicio = time.perf_counter()
+        respuesta = await cliente.get(ruta)
+        respuesta.raise_for_status()
+        return (time.perf_counter() - inicio) * 1000
+
+    inicio = time.perf_counter()
+    latencias = sorted(await asyncio.gather(*(una() for _ in range(concurrencia))))
+    total = time.perf_counter() - inicio
+    return {
+        "req_s": concurrencia / total,
+        "p50_ms": statistics.median(latencias),
+        "p95_ms": latencias[min(int(len(latencias) * 0.95), len(latencias) - 1)],
+        "en_vuelo": en_vuelo.maximo,
+    }
+
+
+async def ejecutar():
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+        # Calentar: abrir conexiones y compilar las consultas
+        for ruta in ("/sync/1", "/async/1"):
+            await medir(cliente, ruta, 20)
+        print(f"Latencia simulada: {BENCH_LATENCIA_MS:g} ms, pools: {BENCH_POOL} conexiones")
+        print(f"{'concurrencia':>12}  {'variante':>8}  {'req/s':>8}  {'p50 ms':>8}  {'p95 ms':>8}  {'en vuelo':>8}")
+        for concurrencia in BENCH_CONCURRENCIA:
+            for variante in ("sync", "async"):
+                r = await medir(cliente, f"/{variante}/1", concurrencia)
+                print(
+                    f"{concurrencia:>12}  {variante:>8}  {r['req_s']:>8.0f}  "
+                    f"{r['p50_ms']:>8.1f}  {r['p95_ms']:>8.1f}  {r['en_vuelo']:>8}"
+                )
+
+
+if __name__ == "__main__":
+    preparar()
+    asyncio.run(ejecutar())
@@ -0,0 +1,139 @@
+"""
+bench_documentos.py
+Benchmark de los listados de documentos sobre un conjunto sembrado.
+
+Siembra BENCH_DOCUMENTOS documentos (facturas con su iva y notas de crédito y
+débito) en una base de datos desechable y compara, por página, la cantidad de
+consultas y el tiempo del listado anterior (una consulta por documento) con el
+listado actual de get_documentoService.
+
+Uso:
+    BENCH_DATABASE_URL=sqlite:///bench_documentos.db python scripts/bench_documentos.py
+
+Environment Variables:
+- BENCH_DATABASE_URL: Base de datos del benchmark (se recrean sus tablas). Por defecto SQLite local.
+- BENCH_DOCUMENTOS: Cantidad de documentos a sembrar (por defecto 100000).
+- BENCH_PAGINA: Tamaño de página (por defecto 100).
+"""
+
+import os
+import sys
+import time
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BENCH_DATABASE_URL = os.getenv("BENCH_DATABASE_URL", "sqlite:///bench_documentos.db")
+BENCH_DOCUMENTOS = int(os.getenv("BENCH_DOCUMENTOS", "100000"))
+BENCH_PAGINA = int(os.getenv("BENCH_PAGINA", "100"))
+
+os.environ["SQLALCHEMY_DATABASE_URL"] = BENCH_DATABASE_URL
+
+from sqlalchemy import event, insert  # noqa: E402
+
+from database import Base, SessionLocal, engine  # noqa: E402
+from src.cliente.cliModel import Cliente  # noqa: E402
+from src.empresa.empModel import Empresa  # noqa: E402
+from src.pedidos.pedidoModel import Pedido  # noqa: E402
+from src.pedidos.detallePedido.detallePedidoModel import DetallePedido  # noqa: E402,F401
+from src.producto.prodModel import Producto  # noqa: E402,F401
+from src.documento.factura.detalleFactura.detalleFacturaModel import DetalleFactura  # noqa: E402,F401
+from src.documento.docModel import Documento  # noqa: E402
+from src.documento.factura.facModel import Factura  # noqa: E402
+from src.documento.factura.iva.ivaModel import iva  # noqa: E402
+from src.documento.notas.notaModel import NotaCredito, NotaDebito  # noqa: E402
+from src.documento.documentoService.get_documentoService import (  # noqa: E402
+    get_documentos_by_empresa_id,
+)
+
+consultas = 0
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _contar(conn, cursor, statement, parameters, context, executemany):
+    global consultas
+    consultas += 1
+
+
+def sembrar(db, cantidad: int):
+    tablas = [
+        Empresa.__table__, Cliente.__table__, Pedido.__table__, Documento.__table__,
+        Factura.__table__, NotaCredito.__table__, NotaDebito.__table__, iva.__table__,
+    ]
+    Base.metadata.drop_all(bind=engine, tables=tablas)
+    Base.metadata.create_all(bind=engine, tables=tablas)
+    db.execute(insert(Empresa), [{"id": 1, "nombre": "Bench", "rif": "J-0", "domicilio_fiscal": "-", "telefono": "0", "email": "b@b"}])
+    db.execute(insert(Cliente), [{"id": 1, "nombre": "Bench", "documento": "V-0", "tipo_documento": "cedula", "domicilio_fiscal": "-"}])
+    db.execute(insert(Pedido), [{"id": 1, "cliente_id": 1, "empresa_id": 1, "estado": "procesado"}])
+
+    hoy, ahora = date.today(), datetime.now().time()
+    documentos, facturas, impuestos, creditos, debitos = [], [], [], [], []
+    factura_id = credito_id = debito_id = 0
+    for documento_id in range(1, cantidad + 1):
+        tipo = ("Factura", "Factura", "Factura", "NotaCredito", "NotaDebito")[documento_id % 5]
+        documentos.append({
+            "id": documento_id, "tipo_documento": tipo, "fecha_emision": hoy, "hora_emision": ahora,
+            "empresa_id": 1, "cliente_id": 1, "estado": "Procesado a imprenta",
+            "numero_control": f"00-{documento_id:08d}",
+        })
+        if tipo == "Factura":
+            factura_id += 1
+            facturas.append({"factura_id": factura_id, "documento_id": documento_id, "pedido_id": 1, "total": 116.0, "aplica_igtf": False})
+            impuestos.append({"factura_id": factura_id, "subtotal_productos": 100.0, "base": 100.0, "monto_exento": 0.0, "monto": 116.0})
+        elif tipo == "NotaCredito":
+            credito_id += 1
+            creditos.append({"nota_credito_id": credito_id, "documento_id": documento_id, "factura_id": max(factura_id, 1), "monto_credito": 10.0, "descripcion": "-"})
+        else:
+            debito_id += 1
+            debitos.append({"nota_debito_id": debito_id, "documento_id": documento_id, "factura_id": max(factura_id, 1), "monto_debito": 10.0, "descripcion": "-"})
+
+    for tabla, filas in ((Documento.__table__, documentos), (Factura.__table__, facturas), (iva.__table__, impuestos),
+                         (NotaCredito.__table__, creditos), (NotaDebito.__table__, debitos)):
+        if filas:
+            db.execute(tabla.insert(), filas)
+    db.commit()
+
+
+def listado_anterior(db, empresa_id: int, limit: int, offset: int):
+    """Reproduce el listado anterior: una consulta por documento y otra por sus impuestos."""
+    resultado = []
+    for documento in db.query(Documento).filter(Documento.empresa_id == empresa_id).offset(offset).limit(limit).all():
+        fila = {"id": documento.id}
+        if documento.tipo_documento == "Factura":
+            factura = db.query(Factura).filter(Factura.id == documento.id).first()
+            fila["factura_id"] = factura.factura_id if factura else None
+            fila["impuestos"] = db.query(iva).filter(iva.factura_id == documento.id).all()
+        elif documento.tipo_documento == "NotaCredito":
+            fila["nota_credito_id"] = db.query(NotaCredito).filter(NotaCredito.id == documento.id).first().nota_credito_id
+        elif documento.tipo_documento == "NotaDebito":
+            fila["nota_debito_id"] = db.query(NotaDebito).filter(NotaDebito.id == documento.id).first().nota_debito_id
+        resultado.append(fila)
+    return resultado
+
+
+def medir(nombre, funcion, paginas):
+    global consultas
+    with SessionLocal() as db:
+        consultas = 0
+        inicio = time.perf_counter()
+        for pagina in paginas:
+            funcion(db, 1, limit=BENCH_PAGINA, offset=pagina * BENCH_PAGINA)
+            db.expunge_all()
+        duracion = time.perf_counter() - inicio
+    print(
+        f"{nombre:<10} | {consultas / len(paginas):>10.1f} consultas/página | "
+        f"{duracion / len(paginas) * 1000:>8.2f} ms/página"
+    )
+
+
+if __name__ == "__main__":
+    print(f"Sembrando {BENCH_DOCUMENTOS} documentos en {BENCH_DATABASE_URL}...")
+    inicio = time.perf_counter()
+    with SessionLocal() as db:
+        sembrar(db, BENCH_DOCUMENTOS)
+    print(f"Sembrado en {time.perf_counter() - inicio:.1f} s")
+
+    total_paginas = BENCH_DOCUMENTOS // BENCH_PAGINA
+    paginas = [0, 1, 2, 3, 4, total_paginas // 2, total_paginas - 1]
+    medir("anterior", listado_anterior, paginas)
+    medir("actual", get_documentos_by_empresa_id, paginas)
@@ -0,0 +1,414 @@
+"""
+bench_impuestos.py
+Valores de referencia y benchmark del motor de impuestos (impuestoService).
+
+Compara calcular_totales contra la implementación anterior con Decimal
+(copiada abajo como referencia) en casos fijos y en facturas aleatorias, y mide
+el tiempo de ambas en facturas de 1 a 10.000 líneas. Luego compara el cálculo
+en lote (impuestoLoteService) contra calcular_totales factura por factura y
+mide ambos en lotes de hasta 10.000 facturas. No necesita base de datos.
+Termina con código 1 si algún resultado difiere.
+
+Uso:
+    python scripts/bench_impuestos.py
+
+Environment Variables:
+- BENCH_FACTURAS_ALEATORIAS: Facturas aleatorias a comparar (por defecto 2000).
+- BENCH_SEMILLA: Semilla del generador aleatorio (por defecto 2024).
+"""
+
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.documento.documentoService.impuestoService import (  # noqa: E402
+    calcular_impuestos,
+    lineas_de_detalles,
+)
+from src.documento.documentoService.impuestoLoteService import (  # noqa: E402
+    calcular_impuestos_lote,
+)
+
+BENCH_FACTURAS_ALEATORIAS = int(os.getenv("BENCH_FACTURAS_ALEATORIAS", "2000"))
+BENCH_SEMILLA = int(os.getenv("BENCH_SEMILLA", "2024"))
+
+
+# region Referencia
+def calcular_totales_referencia(detalles, aplica_igtf, precio_bcv):
+    """Implementación anterior de helperService.calcular_totales (Decimal por línea)."""
+    subtotal_total_sin_descuento = 0
+    monto_exento = 0
+    monto_base_general = 0
+    monto_base_reducida = 0
+    monto_base_adicional = 0
+    descuento_total = 0
+    iva_general_monto = 0
+    iva_reducida_monto = 0
+    iva_adicional_monto = 0
+
+    for detalle in detalles:
+        if not (0 <= (detalle.descuento or 0) <= 1):
+            raise ValueError(
+                f"El descuento del producto con ID {detalle.producto_id} es inválido: {detalle.descuento}"
+            )
+
+        total_producto = Decimal(detalle.cantidad) * Decimal(detalle.precio_unitario)
+        subtotal_total_sin_descuento += total_producto
+
+        if detalle.producto.exento:
+            monto_exento += total_producto
+        elif detalle.alicuota_iva == 16:
+            monto_base_general += total_producto
+            iva_general_monto += round(total_producto * Decimal("0.16"), 4)
+        elif detalle.alicuota_iva == 8:
+            monto_base_reducida += total_producto
+            iva_reducida_monto += round(total_producto * Decimal("0.08"), 4)
+        elif detalle.alicuota_iva == 31:
+            monto_base_adicional += total_producto
+            iva_adicional_monto += round(total_producto * Decimal("0.31"), 4)
+
+        descuento_producto = total_producto * Decimal(detalle.descuento or 0)
+        descuento_total += descuento_producto
+
+    monto_total = (
+        monto_base_general
+        + iva_general_monto
+        + monto_base_reducida
+        + iva_reducida_monto
+        + monto_base_adicional
+        + iva_adicional_monto
+        + monto_exento
+    )
+
+    monto_igtf = 0
+    if aplica_igtf and monto_total > 0:
+        monto_igtf = round(monto_total * Decimal("0.03"), 2)
+
+    return {
+        "subtotal_productos": round(float(max(subtotal_total_sin_descuento, 0)), 4),
+        "monto_base": round(
+            float(
+                max(monto_base_general + monto_base_reducida + monto_base_adicional, 0)
+            ),
+            4,
+        ),
+        "monto_exento": round(float(max(monto_exento, 0)), 4),
+        "monto_base_general": round(float(max(monto_base_general, 0)), 4),
+        "monto_base_reducida": round(float(max(monto_base_reducida, 0)), 4),
+        "monto_base_adicional": round(float(max(monto_base_adicional, 0)), 4),
+        "descuento_total": round(float(max(descuento_total, 0)), 4),
+        "iva_general": 16,
+        "iva_reducida": 8,
+        "iva_adicional": 31,
+        "iva_general_monto": round(float(max(iva_general_monto, 0)), 4),
+        "iva_reducida_monto": round(float(max(iva_reducida_monto, 0)), 4),
+        "iva_adicional_monto": round(float(max(iva_adicional_monto, 0)), 4),
+        "igtf": 3,
+        "base_igtf": round(float(max(monto_total, 0)), 4),
+        "monto_igtf": round(float(max(monto_igtf, 0)), 4),
+        "monto_dolares": (
+            round(float(max((monto_total + monto_igtf) / precio_bcv, 0)), 4)
+            if precio_bcv
+            else 0
+        ),
+        "monto_total": round(float(max(monto_total + monto_igtf, 0)), 4),
+    }
+
+
+# endregion
+
+
+def detalle(producto_id, cantidad, precio, alicuota, exento=False, descuento="0"):
+    return SimpleNamespace(
+        producto_id=producto_id,
+        cantidad=cantidad,
+        precio_unitario=Decimal(precio),
+        descuento=Decimal(descuento) if descuento is not None else None,
+        alicuota_iva=Decimal(alicuota),
+        producto=SimpleNamespace(exento=exento),
+    )
+
+
+def calcular_totales(detalles, aplica_igtf, precio_bcv):
+    return calcular_impuestos(lineas_de_detalles(detalles), aplica_igtf, precio_bcv)
+
+
+# Casos fijos: (descripción, detalles, aplica_igtf, precio_bcv, valores esperados)
+CASOS_FIJOS = [
+    (
+        "una línea por alícuota, exento e IGTF",
+        [
+            detalle(1, 3, "10.50", "16.00"),
+            detalle(2, 2, "21.00", "8.00", descuento="0.10"),
+            detalle(3, 1, "31.50", "31.00"),
+            detalle(4, 5, "52.50", "0.00", exento=True),
+        ],
+        True,
+        Decimal("36.5000"),
+        {
+            "subtotal_productos": 367.5,
+            "monto_base": 105.0,
+            "monto_exento": 262.5,
+            "descuento_total": 4.2,
+            "iva_general_monto": 5.04,
+            "iva_reducida_monto": 3.36,
+            "iva_adicional_monto": 9.765,
+            "base_igtf": 385.665,
+            "monto_igtf": 11.57,
+            "monto_total": 397.235,
+            "monto_dolares": 10.8832,
+        },
+    ),
+    (
+        "redondeo al par del IGTF y alícuota desconocida",
+        [
+            detalle(1, 1, "0.05", "16.00"),
+            detalle(2, 7, "0.13", "31.00"),
+            detalle(3, 4, "99.99", "15.00"),
+        ],
+        True,
+        Decimal("1"),
+        {
+            "subtotal_productos": 400.92,
+            "monto_base": 0.96,
+            "iva_general_monto": 0.008,
+            "iva_adicional_monto": 0.2821,
+            "base_igtf": 1.2501,
+            "monto_igtf": 0.04,
+            "monto_total": 1.2901,
+        },
+    ),
+    ("factura vacía", [], True, Decimal("36.5"), {"monto_total": 0.0, "monto_dolares": 0.0}),
+    ("sin tasa de cambio", [detalle(1, 1, "10.00", "16")], False, None, {"monto_dolares": 0}),
+]
+
+
+def factura_aleatoria(rng, lineas, productos=None):
+    """
+    Factura con precios aleatorios. Con `productos`, las líneas toman precio,
+    alícuota y descuento de un catálogo de ese tamaño, como los pedidos reales.
+    """
+    catalogo = {}
+    detalles = []
+    for _ in range(lineas):
+        producto_id = rng.randint(1, productos or 10**9)
+        if producto_id not in catalogo or not productos:
+            catalogo[producto_id] = (
+                f"{rng.randint(1, 99999999) / 100:.2f}",
+                rng.choice(["16.00", "8.00", "31.00", "0.00", "15.00"]),
+                rng.random() < 0.1,
+                rng.choice([None, "0", "0.05", "0.10", "0.25", "1.00", "0.33"]),
+            )
+        precio, alicuota, exento, descuento = catalogo[producto_id]
+        detalles.append(
+            detalle(
+                producto_id,
+                rng.randint(1, 500),
+                precio,
+                alicuota,
+                exento=exento,
+                descuento=descuento,
+            )
+        )
+    return detalles
+
+
+def comparar(detalles, aplica_igtf, precio_bcv):
+    esperado = calcular_totales_referencia(detalles, aplica_igtf, precio_bcv)
+    obtenido = calcular_totales(detalles, aplica_igtf, precio_bcv)
+    if list(esperado.items()) != list(obtenido.items()):
+        diferencias = {
+            clave: (esperado[clave], obtenido.get(clave))
+            for clave in esperado
+            if esperado[clave] != obtenido.get(clave)
+        }
+        return diferencias or {"orden de claves": (list(esperado), list(obtenido))}
+    return None
+
+
+def a_columnas(facturas):
+    """Líneas de varias facturas en las columnas de calcular_impuestos_lote."""
+    columnas = {
+        "facturas": [],
+        "cantidades": [],
+        "precios_unitarios": [],
+        "descuentos": [],
+        "alicuotas_iva": [],
+        "exentos": [],
+        "producto_ids": [],
+    }
+    for indice, detalles in enumerate(facturas):
+        for d in detalles:
+            columnas["facturas"].append(indice)
+            columnas["cantidades"].append(d.cantidad)
+            columnas["precios_unitarios"].append(d.precio_unitario)
+            columnas["descuentos"].append(d.descuento)
+            columnas["alicuotas_iva"].append(d.alicuota_iva)
+            columnas["exentos"].append(d.producto.exento)
+            columnas["producto_ids"].append(d.producto_id)
+    return columnas
+
+
+def a_numericas(columnas):
+    """Las mismas columnas como arreglos float/int, como las leería un reporte."""
+    return {
+        "facturas": np.array(columnas["facturas"], dtype=np.int64),
+        "cantidades": np.array(columnas["cantidades"], dtype=np.int64),
+        "precios_unitarios": np.array([float(v) for v in columnas["precios_unitarios"]]),
+        "descuentos": np.array([float(v or 0) for v in columnas["descuentos"]]),
+        "alicuotas_iva": np.array([float(v) for v in columnas["alicuotas_iva"]]),
+        "exentos": np.array(columnas["exentos"], dtype=bool),
+    }
+
+
+def comparar_lote(facturas, aplica_igtf, precios_bcv):
+    """Número de facturas del lote cuyo resultado difiere de calcular_totales."""
+    columnas = a_columnas(facturas)
+    distintas = 0
+    for entrada in (columnas, a_numericas(columnas)):
+        obtenidos = calcular_impuestos_lote(
+            aplica_igtf=aplica_igtf, precios_bcv=precios_bcv, **entrada
+        )
+        distintas += sum(
+            list(calcular_totales(detalles, igtf, bcv).items()) != list(obtenido.items())
+            for detalles, igtf, bcv, obtenido in zip(
+                facturas, aplica_igtf, precios_bcv, obtenidos
+            )
+        )
+    return distintas
+
+
+def main():
+    errores = 0
+
+    print("Casos fijos")
+    for descripcion, detalles, aplica_igtf, precio_bcv, valores in CASOS_FIJOS:
+        obtenido = calcular_totales(detalles, aplica_igtf, precio_bcv)
+        diferencias = comparar(detalles, aplica_igtf, precio_bcv) or {
+            clave: (valor, obtenido[clave])
+            for clave, valor in valores.items()
+            if obtenido[clave] != valor
+        }
+        errores += bool(diferencias)
+        print(f"  {'OK ' if not diferencias else 'ERR'} {descripcion} {diferencias or ''}")
+
+    try:
+        calcular_totales([detalle(9, 1, "1.00", "16", descuento="4.20")], False, 1)
+        print("  ERR un descuento mayor que 1 debe rechazarse")
+        errores += 1
+    except ValueError as e:
+        print(f"  OK  descuento inválido: {e}")
+
+    rng = random.Random(BENCH_SEMILLA)
+    print(f"Facturas aleatorias: {BENCH_FACTURAS_ALEATORIAS}")
+    distintas = 0
+    for _ in range(BENCH_FACTURAS_ALEATORIAS):
+        detalles = factura_aleatoria(rng, rng.randint(0, 60), rng.choice([None, 5, 50]))
+        precio_bcv = Decimal(f"{rng.randint(1, 9999999) / 10000:.4f}")
+        diferencias = comparar(detalles, rng.random() < 0.5, precio_bcv)
+        if diferencias:
+            distintas += 1
+            if distintas < 10:
+                print(f"  ERR {diferencias}")
+    errores += distintas
+    print(f"  {'OK' if not distintas else 'ERR'}")
+
+    print("Tiempo por factura (catálogo de 500 productos)")
+    print(f"{'líneas':>8} {'anterior (ms)':>14} {'entero (ms)':>12} {'x':>6}")
+    for lineas in (1, 10, 100, 1000, 10000):
+        detalles = factura_aleatoria(rng, lineas, 500)
+        repeticiones = max(5, 20000 // lineas)
+        tiempos = []
+        for funcion in (calcular_totales_referencia, calcular_totales):
+            # Mejor de 5 rondas para reducir el ruido del recolector y del sistema
+            rondas = []
+            for _ in range(5):
+                inicio = time.perf_counter()
+                for _ in range(repeticiones):
+                    funcion(detalles, True, Decimal("36.5"))
+                rondas.append((time.perf_counter() - inicio) / repeticiones * 1000)
+            tiempos.append(min(rondas))
+        print(f"{lineas:>8} {tiempos[0]:>14.3f} {tiempos[1]:>12.3f} {tiempos[0] / tiempos[1]:>6.1f}")
+
+    print("Lotes aleatorios")
+    distintas = 0
+    for _ in range(max(1, BENCH_FACTURAS_ALEATORIAS // 50)):
+        n = rng.randint(1, 80)
+        facturas = [
+            factura_aleatoria(rng, rng.randint(0, 40), rng.choice([None, 5, 50]))
+            for _ in range(n)
+        ]
+        aplica_igtf = [rng.random() < 0.5 for _ in range(n)]
+        precios_bcv = [Decimal(f"{rng.randint(1, 9999999) / 10000:.4f}") for _ in range(n)]
+        distintas += comparar_lote(facturas, aplica_igtf, precios_bcv)
+    # Montos que desbordarían int64 pasan al cálculo por factura
+    gigante = [detalle(1, 10**9, "99999999.99", "16.00", descuento="0.5")] * 20
+    distintas += comparar_lote([gigante, gigante[:1]], [True, True], [Decimal("1"), Decimal("2")])
+    # Un descuento inválido se rechaza igual que en calcular_totales
+    try:
+        calcular_impuestos_lote(
+            aplica_igtf=[False],
+            precios_bcv=[1],
+            **a_columnas([[detalle(9, 1, "1.00", "16", descuento="4.20")]]),
+        )
+        distintas += 1
+    except ValueError:
+        pass
+    errores += distintas
+    print(f"  {'OK' if not distintas else 'ERR'}")
+
+    print("Tiempo por lote (facturas de 20 líneas, catálogo de 500 productos)")
+    print("  lote: columnas de Decimal; numérico: arreglos float/int (p. ej. para reportes)")
+    print(
+        f"{'facturas':>8} {'por factura (ms)':>17} {'lote (ms)':>10} {'x':>6}"
+        f" {'numérico (ms)':>14} {'x':>6}"
+    )
+    for n in (1, 10, 100, 1000, 10000):
+        facturas = [factura_aleatoria(rng, 20, 500) for _ in range(n)]
+        aplica_igtf = [True] * n
+        precios_bcv = [Decimal("36.5")] * n
+        columnas = a_columnas(facturas)
+
+        def por_factura():
+            for detalles in facturas:
+                calcular_totales(detalles, True, Decimal("36.5"))
+
+        numericas = a_numericas(columnas)
+
+        def lote():
+            calcular_impuestos_lote(aplica_igtf=aplica_igtf, precios_bcv=precios_bcv, **columnas)
+
+        def lote_numerico():
+            calcular_impuestos_lote(
+                aplica_igtf=aplica_igtf, precios_bcv=precios_bcv, **numericas
+            )
+
+        repeticiones = max(1, 2000 // n)
+        tiempos = []
+        for funcion in (por_factura, lote, lote_numerico):
+            rondas = []
+            for _ in range(5):
+                inicio = time.perf_counter()
+                for _ in range(repeticiones):
+                    funcion()
+                rondas.append((time.perf_counter() - inicio) / repeticiones * 1000)
+            tiempos.append(min(rondas))
+        print(
+            f"{n:>8} {tiempos[0]:>17.3f} {tiempos[1]:>10.3f} {tiempos[0] / tiempos[1]:>6.1f}"
+            f" {tiempos[2]:>14.3f} {tiempos[0] / tiempos[2]:>6.1f}"
+        )
+
+    if errores:
+        print(f"{errores} resultado(s) distinto(s) de la referencia")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
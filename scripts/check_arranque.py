@@ -0,0 +1,124 @@
+"""
+check_arranque.py
+Presupuesto de tiempo de arranque de la aplicación.
+
+Mide, en procesos nuevos, el tiempo de `import main` con `python -X importtime`
+y el tiempo hasta la primera respuesta (import, lifespan y una petición con
+TestClient). Reporta la mediana de varias corridas, los módulos que más tardan
+en importarse y termina con código 1 si se supera algún presupuesto.
+
+Importar main no debe conectarse a la base de datos ni a servicios externos:
+eso ocurre en el lifespan (create_app) o en el primer uso. La base de datos sí
+debe estar disponible para medir la primera petición. Se ejecuta desde el
+directorio de trabajo actual, que debe tener las carpetas que monta la
+aplicación (documents/), como al correr uvicorn.
+
+Uso:
+    python scripts/check_arranque.py
+
+Environment Variables:
+- ARRANQUE_MAX_IMPORT_MS: Presupuesto de `import main` en milisegundos (por defecto 1500).
+- ARRANQUE_MAX_PRIMERA_MS: Presupuesto hasta la primera respuesta en milisegundos (por defecto 2500).
+- ARRANQUE_REPETICIONES: Corridas por medición; se reporta la mediana (por defecto 3).
+- ARRANQUE_TOP: Módulos más lentos a listar (por defecto 15).
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ARRANQUE_MAX_IMPORT_MS = float(os.getenv("ARRANQUE_MAX_IMPORT_MS", "1500"))
+ARRANQUE_MAX_PRIMERA_MS = float(os.getenv("ARRANQUE_MAX_PRIMERA_MS", "2500"))
+ARRANQUE_REPETICIONES = int(os.getenv("ARRANQUE_REPETICIONES", "3"))
+ARRANQUE_TOP = int(os.getenv("ARRANQUE_TOP", "15"))
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Proceso hijo: import, lifespan y primera petición con TestClient
+PRIMERA_PETICION = """
+import json, time
+inicio = time.perf_counter()
+import main
+importado = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as cliente:
+    respuesta = cliente.get("/monitoreo/planificador")
+    listo = time.perf_counter()
+print("ARRANQUE " + json.dumps({
+    "import_ms": (importado - inicio) * 1000,
+    "primera_ms": (listo - inicio) * 1000,
+    "status": respuesta.status_code,
+}))
+"""
+
+
+def _ejecutar(argumentos):
+    entorno = {**os.environ, "PYTHONPATH": RAIZ}
+    resultado = subprocess.run(
+        [sys.executable, *argumentos], env=entorno, capture_output=True, text=True
+    )
+    if resultado.returncode != 0:
+        print(resultado.stderr[-2000:], file=sys.stderr)
+        sys.exit(f"Falló: python {' '.join(argumentos)[:80]}")
+    return resultado
+
+
+def medir_importtime():
+    """Milisegundos de `import main` y tiempos por módulo (propio y acumulado)."""
+    resultado = _ejecutar(["-X", "importtime", "-c", "import main"])
+    modulos = []
+    for linea in resultado.stderr.splitlines():
+        if not linea.startswith("import time:") or "self [us]" in linea:
+            continue
+        propio, acumulado, nombre = linea[len("import time:"):].split("|")
+        modulos.append((nombre.strip(), int(propio) / 1000, int(acumulado) / 1000))
+    total = next(acumulado for nombre, _, acumulado in modulos if nombre == "main")
+    return total, modulos
+
+
+def medir_primera_peticion():
+    resultado = _ejecutar(["-c", PRIMERA_PETICION])
+    # Los jobs del planificador también escriben en stdout
+    linea = next(l for l in resultado.stdout.splitlines() if l.startswith("ARRANQUE "))
+    return json.loads(linea[len("ARRANQUE "):])
+
+
+def main():
+    # Una corrida previa para compilar los .pyc y no medir la compilación
+    medir_importtime()
+
+    corridas = [medir_importtime() for _ in range(ARRANQUE_REPETICIONES)]
+    import_ms = statistics.median(total for total, _ in corridas)
+    _, modulos = corridas[-1]
+
+    peticiones = [medir_primera_peticion() for _ in range(ARRANQUE_REPETICIONES)]
+    primera_ms = statistics.median(p["primera_ms"] for p in peticiones)
+
+    print(f"Módulos más lentos (acumulado, ms) de {len(modulos)} importados:")
+    for nombre, propio, acumulado in sorted(modulos, key=lambda m: m[2], reverse=True)[
+        1 : ARRANQUE_TOP + 1
+    ]:
+        print(f"  {acumulado:8.1f}  {propio:7.1f}  {nombre}")
+
+    print(
+        f"\nimport main: {import_ms:.0f} ms (presupuesto {ARRANQUE_MAX_IMPORT_MS:.0f} ms)"
+    )
+    print(
+        f"primera respuesta: {primera_ms:.0f} ms (presupuesto {ARRANQUE_MAX_PRIMERA_MS:.0f} ms, "
+        f"status {peticiones[-1]['status']})"
+    )
+
+    excedidos = []
+    if import_ms > ARRANQUE_MAX_IMPORT_MS:
+        excedidos.append("import main")
+    if primera_ms > ARRANQUE_MAX_PRIMERA_MS:
+        excedidos.append("primera respuesta")
+    if excedidos:
+        sys.exit(f"Presupuesto de arranque excedido: {', '.join(excedidos)}")
+    print("Dentro del presupuesto.")
+
+
+if __name__ == "__main__":
+    main()
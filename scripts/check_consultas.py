@@ -0,0 +1,104 @@
+"""
+check_consultas.py
+Presupuesto de consultas SQL por endpoint.
+
+Llama a cada ruta de PRESUPUESTOS con TestClient sobre la base configurada y
+compara el encabezado X-DB-Queries (src.utils.sql_metricas) con su
+presupuesto. Un presupuesto excedido suele ser un N+1: una consulta por fila en
+lugar de una por relación. El detector de N+1 queda activo (SQL_N1_UMBRAL) y
+sus hallazgos se listan junto al resultado. Termina con código 1 si alguna
+ruta no responde 200, excede su presupuesto o tiene un N+1.
+
+Los presupuestos no dependen de la cantidad de filas, pero solo se ponen a
+prueba con datos: una ruta que responde 404 no ejecutó las consultas que se
+quieren medir, así que cuenta como fallo. La base debe tener al menos una
+empresa, un cliente, un producto, un pedido facturado (los IDs de las rutas
+son los primeros de cada tabla) y filas de auditoría, que generan los triggers
+de scripts/auditoria_triggers.sql. La
+autenticación no se mide: se quita GroupMembershipMiddleware de la aplicación.
+Se ejecuta desde el directorio de trabajo actual, como check_arranque.py.
+
+Uso:
+    python scripts/check_consultas.py
+
+Environment Variables:
+- SQL_N1_UMBRAL: Repeticiones de un mismo SELECT que se marcan como N+1 (por defecto 3).
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SQL_N1_UMBRAL", "3")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from main import create_app  # noqa: E402
+from src.auth.group_middleware import GroupMembershipMiddleware  # noqa: E402
+
+# Ruta -> máximo de consultas
+PRESUPUESTOS = {
+    "/documento/?limit=50": 1,
+    "/documento/1": 2,
+    "/documento/empresa/1?limit=50": 2,
+    "/documento/cliente/1?limit=50": 2,
+    "/factura/?limit=50": 1,
+    "/factura/1": 4,
+    "/factura/1/detalles": 1,
+    "/factura/1/iva": 1,
+    "/factura/1/pedido": 1,
+    "/factura/empresa/1?limit=50": 1,
+    "/factura/cliente/1?limit=50": 1,
+    "/pedidos/?limit=50": 2,
+    "/pedidos/1": 2,
+    "/pedidos/empresa/1?limit=50": 2,
+    "/pedidos/cliente/1?limit=50": 2,
+    "/producto/?limit=50": 1,
+    "/cliente/?limit=50": 1,
+    "/empresa/": 1,
+    "/auditoria/?limit=50": 1,
+}
+
+
+def main():
+    app = create_app(reset_db=False)
+    app.user_middleware = [
+        m for m in app.user_middleware if m.cls is not GroupMembershipMiddleware
+    ]
+
+    excedidas = []
+    fallidas = []
+    print(f"{'ruta':36}  {'status':>6}  {'consultas':>9}  {'presupuesto':>11}  {'ms':>7}")
+    with TestClient(app) as cliente:
+        for ruta, presupuesto in PRESUPUESTOS.items():
+            respuesta = cliente.get(ruta)
+            consultas = int(respuesta.headers.get("x-db-queries", 0))
+            # Server-Timing: db;dur=1.3;desc="..."
+            duracion = respuesta.headers.get("server-timing", "dur=0;").split("dur=")[1].split(";")[0]
+            n1 = respuesta.headers.get("x-db-n1")
+            marca = ""
+            if respuesta.status_code != 200:
+                fallidas.append(f"{ruta} ({respuesta.status_code})")
+                marca = "  <- sin respuesta 200"
+            elif consultas > presupuesto or n1:
+                excedidas.append(ruta)
+                marca = f"  <- excedido{f' (N+1: {n1} repeticiones)' if n1 else ''}"
+            print(
+                f"{ruta:36}  {respuesta.status_code:>6}  {consultas:>9}  {presupuesto:>11}  "
+                f"{float(duracion):>7.1f}{marca}"
+            )
+
+    errores = []
+    if fallidas:
+        errores.append(
+            f"Rutas sin respuesta 200 (¿faltan datos en la base?): {', '.join(fallidas)}"
+        )
+    if excedidas:
+        errores.append(f"Presupuesto de consultas excedido en: {', '.join(excedidas)}")
+    if errores:
+        sys.exit("\n".join(errores))
+    print("Dentro del presupuesto.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+check_numeracion.py
+Prueba de concurrencia de la numeración de documentos y facturas.
+
+Crea NUMERACION_FACTURAS pedidos pendientes con la primera empresa, el primer
+cliente y el primer producto de la base configurada, y los factura en paralelo
+desde NUMERACION_HILOS hilos con `get_or_create_factura`, cada uno con su
+propia sesión (como las peticiones concurrentes de la API). Comprueba que
+todas las facturas se crearon y que los `factura_id` y los IDs de documento
+asignados no tienen duplicados ni huecos. Termina con código 1 si alguna
+comprobación falla.
+
+Escribe en la base: conviene correrlo sobre una base de pruebas sin otras
+escrituras en curso (cualquier otra factura creada a la vez aparecería como un
+hueco). Con NUMERACION_BLOQUE > 1 los números se entregan por bloques de cada
+proceso, así que en un solo proceso tampoco deben quedar huecos. El envío a
+SMART se desactiva (POST_SMART=false) salvo que se indique otra cosa.
+
+Uso:
+    python scripts/check_numeracion.py
+
+Environment Variables:
+- NUMERACION_FACTURAS: Facturas a crear (por defecto 50).
+- NUMERACION_HILOS: Hilos que facturan a la vez (por defecto 10).
+"""
+
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("POST_SMART", "false")
+
+from database import SessionLocal  # noqa: E402
+from src.cliente.cliModel import Cliente  # noqa: E402
+from src.documento.documentoService.create_documentoService import get_or_create_factura  # noqa: E402
+from src.documento.factura.facModel import Factura  # noqa: E402
+from src.documento.factura.facturaSchema import FacturaSchema  # noqa: E402
+from src.empresa.empModel import Empresa  # noqa: E402
+from src.pedidos.detallePedido.detallePedidoModel import DetallePedido  # noqa: E402
+from src.pedidos.pedidoModel import Pedido  # noqa: E402
+from src.producto.prodModel import Producto  # noqa: E402
+from src.utils.esquema import asegurar_esquema  # noqa: E402
+
+NUMERACION_FACTURAS = int(os.getenv("NUMERACION_FACTURAS", "50"))
+NUMERACION_HILOS = int(os.getenv("NUMERACION_HILOS", "10"))
+
+
+def crear_pedidos(cantidad: int) -> list:
+    """Crea `cantidad` pedidos pendientes de una línea y devuelve sus IDs."""
+    with SessionLocal() as db:
+        empresa = db.query(Empresa).order_by(Empresa.id).first()
+        cliente = db.query(Cliente).order_by(Cliente.id).first()
+        producto = db.query(Producto).order_by(Producto.id).first()
+        if not (empresa and cliente and producto):
+            sys.exit("La base necesita al menos una empresa, un cliente y un producto.")
+
+        pedidos = []
+        for _ in range(cantidad):
+            pedido = Pedido(
+                cliente_id=cliente.id,
+                empresa_id=empresa.id,
+                estado="pendiente",
+                tasa_cambio=Decimal("1"),
+            )
+            db.add(pedido)
+            db.flush()
+            db.add(
+                DetallePedido(
+                    pedido_id=pedido.id,
+                    producto_id=producto.id,
+                    cantidad=1,
+                    precio_unitario=producto.precio,
+                    descuento=Decimal("0"),
+                    alicuota_iva=producto.alicuota_iva,
+                    total=producto.precio,
+                )
+            )
+            pedidos.append(pedido.id)
+        db.commit()
+        return pedidos
+
+
+def facturar(pedido_id: int) -> dict:
+    with SessionLocal() as db:
+        return get_or_create_factura(db, FacturaSchema(pedido_id=pedido_id, aplica_igtf=False))
+
+
+def _revisar(nombre: str, numeros: list, esperados: int) -> list:
+    """Errores de una numeración: duplicados y huecos dentro del rango asignado."""
+    errores = []
+    duplicados = sorted({n for n in numeros if numeros.count(n) > 1})
+    if duplicados:
+        errores.append(f"{nombre}: números duplicados {duplicados}")
+    if numeros:
+        faltantes = sorted(set(range(min(numeros), max(numeros) + 1)) - set(numeros))
+        if faltantes:
+            errores.append(f"{nombre}: huecos en la numeración {faltantes}")
+    if len(numeros) != esperados:
+        errores.append(f"{nombre}: {len(numeros)} números asignados, se esperaban {esperados}")
+    return errores
+
+
+def main():
+    asegurar_esquema()
+    pedidos = crear_pedidos(NUMERACION_FACTURAS)
+    print(f"Facturando {len(pedidos)} pedidos desde {NUMERACION_HILOS} hilos...")
+
+    with ThreadPoolExecutor(max_workers=NUMERACION_HILOS) as ejecutor:
+        resultados = list(ejecutor.map(facturar, pedidos))
+
+    errores = [
+        f"pedido {pedido_id}: {resultado['error']}"
+        for pedido_id, resultado in zip(pedidos, resultados)
+        if "error" in resultado
+    ]
+
+    with SessionLocal() as db:
+        facturas = (
+            db.query(Factura.id, Factura.factura_id)
+            .filter(Factura.pedido_id.in_(pedidos))
+            .all()
+        )
+    documentos = [f.id for f in facturas]
+    numeros_factura = [f.factura_id for f in facturas]
+    errores += _revisar("documento", documentos, len(pedidos))
+    errores += _revisar("factura", numeros_factura, len(pedidos))
+
+    if numeros_factura:
+        print(
+            f"Facturas {min(numeros_factura)}-{max(numeros_factura)}, "
+            f"documentos {min(documentos)}-{max(documentos)}"
+        )
+    if errores:
+        sys.exit("Numeración con errores:\n" + "\n".join(errores))
+    print("Numeración sin duplicados ni huecos.")
+
+
+if __name__ == "__main__":
+    main()
@@ -151,4 +151,54 @@ CREATE TABLE IF NOT EXISTS dolar (
     fecha DATE DEFAULT CURRENT_DATE NOT NULL,
     precio FLOAT NOT NULL,
     fecha_actualizacion TIMESTAMP NOT NULL
-);
\ No newline at end of file
+);
+
+-- Crear tabla SMART_OUTBOX (cola de envíos a la imprenta digital)
+-- depende_de: factura que debe tener número de control antes de enviar una nota
+CREATE TABLE IF NOT EXISTS smart_outbox (
+    id SERIAL PRIMARY KEY,
+    documento_id INT NOT NULL REFERENCES documento(id),
+    depende_de INT REFERENCES documento(id),
+    url VARCHAR(255) NOT NULL,
+    payload JSON NOT NULL,
+    estado VARCHAR(20) NOT NULL DEFAULT 'pendiente',
+    intentos INT NOT NULL DEFAULT 0,
+    proximo_intento TIMESTAMP NOT NULL,
+    ultimo_error TEXT,
+    fecha_creacion TIMESTAMP NOT NULL,
+    fecha_actualizacion TIMESTAMP NOT NULL
+);
+ALTER TABLE smart_outbox ADD COLUMN IF NOT EXISTS depende_de INT REFERENCES documento(id);
+CREATE INDEX IF NOT EXISTS ix_smart_outbox_id ON smart_outbox (id);
+CREATE INDEX IF NOT EXISTS ix_smart_outbox_documento_id ON smart_outbox (documento_id);
+CREATE INDEX IF NOT EXISTS ix_smart_outbox_estado_proximo ON smart_outbox (estado, proximo_intento);
+
+-- Crear tabla CONTADOR_DOCUMENTO (último número asignado por numeración)
+CREATE TABLE IF NOT EXISTS contador_documento (
+    nombre VARCHAR(50) PRIMARY KEY,
+    ultimo_valor INT NOT NULL DEFAULT 0,
+    semilla_manual INT
+);
+-- Sembrar desde el MAX actual para que una base existente continúe su numeración.
+-- factura, nota_credito y nota_debito se siembran al arrancar la aplicación
+-- (src/utils/esquema.py) desde las columnas de sus modelos.
+INSERT INTO contador_documento (nombre, ultimo_valor)
+SELECT 'documento', COALESCE(MAX(id), 0) FROM documento
+ON CONFLICT (nombre) DO NOTHING;
+
+-- Crear tabla CACHE_STAMP (versión compartida de las cachés entre workers)
+CREATE TABLE IF NOT EXISTS cache_stamp (
+    nombre VARCHAR(50) PRIMARY KEY,
+    version INT NOT NULL DEFAULT 0
+);
+
+-- Índice de la clave de orden de los listados de documentos (paginación por cursor)
+CREATE INDEX IF NOT EXISTS ix_documento_fecha_emision_id ON documento (fecha_emision, id);
+
+-- Crear tabla DOLAR_HISTORIAL (solo se agregan filas: cada tasa rige desde fecha_vigencia)
+CREATE TABLE IF NOT EXISTS dolar_historial (
+    id SERIAL PRIMARY KEY,
+    precio FLOAT NOT NULL,
+    fecha_vigencia TIMESTAMP NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_dolar_historial_fecha_vigencia ON dolar_historial (fecha_vigencia);
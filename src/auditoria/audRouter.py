@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
-from sqlalchemy.orm import Session
-from database import get_db
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
 from src.auditoria.audService import (
     get_auditoria_by_id,
     get_all_auditorias,
 )
 from src.loggers.loggerService import get_logger, get_request_info
+from src.utils.pagination import CURSOR_DESCRIPTION, OFFSET_DESCRIPTION, agregar_cursor
 
 logger = get_logger("AuditoriaRouter")
 
@@ -13,12 +15,12 @@ router = APIRouter(tags=["Auditoria"], prefix="/auditoria")
 
 
 @router.get("/{auditoria_id}", response_model=dict)
-def get_auditoria_endpoint(
-    auditoria_id: int, request: Request, db: Session = Depends(get_db)
+async def get_auditoria_endpoint(
+    auditoria_id: int, request: Request, db: AsyncSession = Depends(get_async_db)
 ):
     request_info = get_request_info(request)
     logger.info(f"Obteniendo auditoría con ID: {auditoria_id}", extra=request_info)
-    auditoria = get_auditoria_by_id(db, auditoria_id)
+    auditoria = await db.run_sync(get_auditoria_by_id, auditoria_id)
     if not auditoria:
         logger.warning(
             f"Auditoría con ID: {auditoria_id} no encontrada", extra=request_info
@@ -28,19 +30,22 @@ def get_auditoria_endpoint(
 
 
 @router.get("/", response_model=list)
-def get_auditorias_endpoint(
+async def get_auditorias_endpoint(
     request: Request,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     limit: int = Query(100, ge=1),
-    page: int = Query(1, ge=1),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    page: int = Query(1, ge=1, deprecated=True, description=OFFSET_DESCRIPTION),
 ):
     request_info = get_request_info(request)
     logger.info(
         f"Obteniendo auditorías con límite: {limit} y página: {page}",
         extra=request_info,
     )
-    auditorias = get_all_auditorias(db, limit=limit, page=page)
+    auditorias = await db.run_sync(get_all_auditorias, limit=limit, page=page, cursor=cursor)
     if not auditorias:
         logger.warning("No se encontraron auditorías", extra=request_info)
         raise HTTPException(status_code=404, detail="No se encontraron auditorías")
+    agregar_cursor(response, auditorias)
     return auditorias
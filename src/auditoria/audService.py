@@ -1,4 +1,5 @@
 from sqlalchemy.orm import Session
+from src.utils.pagination import CursorInvalidoError, Pagina, paginar
 from src.auditoria.audModel import Auditoria
 
 def get_auditoria_by_id(db: Session, auditoria_id: int):
@@ -9,10 +10,12 @@ def get_auditoria_by_id(db: Session, auditoria_id: int):
         return f"Error al obtener auditoria: {e}"
 
 # Function to get all auditorias with pagination to avoid performance issues and test for others endpoints
-def get_all_auditorias(db: Session, limit: int = 100, page: int = 1): 
+def get_all_auditorias(db: Session, limit: int = 100, page: int = 1, cursor: str = None):
     try:
         offset = (page - 1) * limit
-        auditorias = db.query(Auditoria).offset(offset).limit(limit).all()
-        return [auditoria.to_dict() for auditoria in auditorias]
+        auditorias = paginar(db.query(Auditoria), [Auditoria.id], limit, cursor, offset)
+        return Pagina([auditoria.to_dict() for auditoria in auditorias], auditorias.next_cursor)
+    except CursorInvalidoError:
+        raise
     except Exception as e:
         return f"Error al obtener auditorias: {e}"
@@ -9,7 +9,7 @@ Features:
 
 Dependencies:
 - fastapi: For API routing.
-- core.oauth: For OAuth2 client integration.
+- core.get_oauth: For OAuth2 client integration.
 - loggers.logger: For logging actions.
 - secrets: For generating secure random states.
 - os: For accessing environment variables.
@@ -26,7 +26,7 @@ from fastapi.openapi.docs import get_swagger_ui_html
 from fastapi.security import OAuth2AuthorizationCodeBearer
 import os
 import secrets
-from core import url, oauth
+from core import url, get_oauth
 from src.loggers.loggerService import get_logger, get_request_info
 from src.auth.jwt_middleware import decode_access_token_with_jwks
 
@@ -62,7 +62,7 @@ async def oauth_authorize(request: Request):
     redirect_uri = os.getenv("AUTHENTIK_REDIRECT_URI")
     state = secrets.token_urlsafe(16)
     request.session["oauth_state"] = state
-    return oauth.authentik.authorize_redirect(request, redirect_uri, state=state)
+    return get_oauth().authentik.authorize_redirect(request, redirect_uri, state=state)
 
 
 @router.get("/oauth/callback", include_in_schema=False)
@@ -90,7 +90,7 @@ async def oauth_callback(request: Request):
 
     try:
 
-        token_data = await oauth.authentik.authorize_access_token(request)
+        token_data = await get_oauth().authentik.authorize_access_token(request)
 
         access_token = token_data.get("access_token")
 
@@ -1,13 +1,12 @@
-from fastapi import Request, HTTPException  # Import Request and HTTPException
-from starlette.middleware.base import (
-    BaseHTTPMiddleware,
-)  # Import BaseHTTPMiddleware from Starlette
+from fastapi import Request  # Import Request
+from starlette.types import ASGIApp, Receive, Scope, Send  # Import ASGI types
 from starlette.responses import (
     JSONResponse,
 )  # Import JSONResponse for custom error handling
 from src.auth.jwt_middleware import (
     decode_access_token_with_jwks,
 )  # Import token decoder
+from src.auth.route_matcher import RouteGroupMatcher  # Import compiled route matcher
 from src.loggers.loggerService import (
     get_logger,
     get_request_info,
@@ -16,7 +15,15 @@ from src.loggers.loggerService import (
 logger = get_logger("GroupMembershipMiddleware")
 
 
-class GroupMembershipMiddleware(BaseHTTPMiddleware):
+class GroupMembershipMiddleware:
+    """
+    Middleware ASGI que valida el token Bearer y la pertenencia a grupos.
+
+    Se implementa como ASGI puro (sin BaseHTTPMiddleware) para no envolver el
+    cuerpo de la solicitud ni de la respuesta: las rutas excluidas se delegan
+    directamente a la aplicación y las respuestas en streaming no se alteran.
+    """
+
     # Define a mapping of routes and methods to required groups
     route_group_mapping = {
         # Rutas para el módulo empresa
@@ -41,6 +48,8 @@ class GroupMembershipMiddleware(BaseHTTPMiddleware):
         ("/auth", "ALL"): ["authentik Admins"],
         # Rutas para notas
         ("/notas", "ALL"): ["authentik Admins"],
+        # Rutas para métricas de monitoreo
+        ("/monitoreo", "ALL"): ["authentik Admins"],
     }
 
     # Define excluded routes
@@ -51,72 +60,75 @@ class GroupMembershipMiddleware(BaseHTTPMiddleware):
         "/get-token",
     ]
 
-    async def dispatch(self, request: Request, call_next):
-        try:
-            # Log para depuración de rutas excluidas
-            if any(
-                request.scope["path"].startswith(prefix)
-                for prefix in self.excluded_routes
-            ):
-                return await call_next(request)
-
-            authorization: str = request.headers.get("Authorization", "")
-            if not authorization.startswith("Bearer "):
-                logger.warning(
-                    "Authorization inválido.",
-                    extra=get_request_info(request),
-                )
-                return JSONResponse(
-                    status_code=401,
-                    content={"detail": "Authorization inválido."},
-                )
-
-            token = authorization.split(" ")[1]
-            decoded_token = decode_access_token_with_jwks(token)
-            if not decoded_token:
-                logger.error(
-                    "El token no pudo ser decodificado o es inválido.",
-                    extra=get_request_info(request),
-                )
-                return JSONResponse(
-                    status_code=401,
-                    content={"detail": "Token inválido o expirado."},
-                )
-
-            payload = decoded_token
-            groups = payload.get("groups", [])
-
-            # Determine the required group for the current route and method
-            route = request.url.path
-            method = request.method
-
-            # Buscar coincidencias exactas, rutas con parámetros dinámicos o prefijos generales
-            required_group = self.route_group_mapping.get((route, method))
-            if not required_group:
-                for (pattern, m), group in self.route_group_mapping.items():
-                    if (m == method or m == "ALL") and (
-                        pattern.endswith("}")
-                        and route.startswith(pattern.rsplit("/", 1)[0])
-                        or route.startswith(pattern)
-                    ):
-                        required_group = group
-                        break
-
-            # Verificar si el usuario pertenece a cualquiera de los grupos permitidos
-            if required_group and not any(group in groups for group in required_group):
-                logger.warning(
-                    f"Usuario {payload.get('nickname', 'UnknownUser')} no tiene acceso a este recurso {route}.",
-                    extra=get_request_info(request),
-                )
-                return JSONResponse(
-                    status_code=403,
-                    content={"detail": "No tienes acceso a este recurso."},
-                )
-
-            # Attach payload to the request state for further use
-            request.state.user_payload = payload
-            return await call_next(request)
-
-        except Exception:
-            # Permitir que las funciones manejen las excepciones directamente
-            raise
+    # Compilar el mapeo una sola vez al importar el módulo
+    matcher = RouteGroupMatcher(route_group_mapping, excluded_routes)
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Determine the required group for the current route and method
+        route = scope["path"]
+        method = scope["method"]
+        excluded, required_group = self.matcher.match(route, method)
+
+        # Las rutas excluidas no requieren autenticación
+        if excluded:
+            await self.app(scope, receive, send)
+            return
+
+        # Solo se leen los encabezados; el cuerpo queda intacto para la aplicación
+        request = Request(scope)
+
+        authorization: str = request.headers.get("Authorization", "")
+        if not authorization.startswith("Bearer "):
+            logger.warning(
+                "Authorization inválido.",
+                extra=get_request_info(request),
+            )
+            response = JSONResponse(
+                status_code=401,
+                content={"detail": "Authorization inválido."},
+            )
+            await response(scope, receive, send)
+            return
+
+        token = authorization.split(" ")[1]
+        decoded_token = decode_access_token_with_jwks(token)
+        if not decoded_token:
+            logger.error(
+                "El token no pudo ser decodificado o es inválido.",
+                extra=get_request_info(request),
+            )
+            response = JSONResponse(
+                status_code=401,
+                content={"detail": "Token inválido o expirado."},
+            )
+            await response(scope, receive, send)
+            return
+
+        payload = decoded_token
+        groups = payload.get("groups", [])
+
+        # Adjuntar el payload al estado de la solicitud para que los routers
+        # (y get_request_info) no vuelvan a decodificar el token
+        request.state.user_payload = payload
+
+        # Verificar si el usuario pertenece a cualquiera de los grupos permitidos
+        if required_group and not any(group in groups for group in required_group):
+            logger.warning(
+                f"Usuario {payload.get('nickname', 'UnknownUser')} no tiene acceso a este recurso {route}.",
+                extra=get_request_info(request),
+            )
+            response = JSONResponse(
+                status_code=403,
+                content={"detail": "No tienes acceso a este recurso."},
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
@@ -1,13 +1,229 @@
 import os
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 import requests
 from jose import jwt, JWTError
 from jose.utils import base64url_decode
 from cryptography.hazmat.primitives.asymmetric import rsa
 from cryptography.hazmat.backends import default_backend
 
+from src.loggers.loggerService import get_logger
+
 # URL del JWKS para Authentik
 JWKS_URL = os.getenv("AUTHENTIK_JWKS_URL")
 
+# Tiempo de vida de las claves en memoria antes de refrescarlas (segundos)
+JWKS_TTL = int(os.getenv("AUTHENTIK_JWKS_TTL", "3600"))
+# Tiempo máximo de espera para la descarga del JWKS (segundos)
+JWKS_TIMEOUT = float(os.getenv("AUTHENTIK_JWKS_TIMEOUT", "5"))
+# Intervalo mínimo entre descargas forzadas por un kid desconocido (segundos)
+JWKS_MIN_REFETCH_INTERVAL = int(os.getenv("AUTHENTIK_JWKS_MIN_REFETCH", "30"))
+# Cantidad máxima de tokens verificados que se mantienen en memoria
+JWT_CACHE_MAXSIZE = int(os.getenv("JWT_CACHE_MAXSIZE", "1024"))
+
+logger = get_logger("jwt_middleware")
+
+
+def _jwk_a_clave_publica(jwk: dict):
+    """Convierte una clave JWK (RSA) en un objeto RSAPublicKey."""
+    n = int.from_bytes(base64url_decode(jwk["n"].encode("utf-8")), "big")
+    e = int.from_bytes(base64url_decode(jwk["e"].encode("utf-8")), "big")
+    return rsa.RSAPublicNumbers(e, n).public_key(default_backend())
+
+
+class JWKSKeyStore:
+    """
+    Almacén en memoria de las claves públicas del JWKS de Authentik.
+
+    - Las claves se indexan por `kid` y se guardan ya convertidas a RSAPublicKey.
+    - Al vencer el TTL se siguen sirviendo las claves actuales mientras se
+      refrescan en segundo plano.
+    - Un `kid` desconocido fuerza una descarga inmediata (limitada por
+      JWKS_MIN_REFETCH_INTERVAL para no saturar a Authentik).
+    - Si la descarga falla se conservan las claves anteriores (stale-while-error).
+    """
+
+    def __init__(
+        self,
+        jwks_url: str,
+        ttl: int = JWKS_TTL,
+        timeout: float = JWKS_TIMEOUT,
+        min_refetch_interval: int = JWKS_MIN_REFETCH_INTERVAL,
+    ):
+        self.jwks_url = jwks_url
+        self.ttl = ttl
+        self.timeout = timeout
+        self.min_refetch_interval = min_refetch_interval
+        self._keys = {}
+        self._fetched_at = 0.0
+        self._last_attempt = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        # Lock propio de los contadores: `_lock` se mantiene durante la descarga
+        # y no debe frenar las lecturas de claves ya cargadas
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+            "background_refreshes": 0,
+        }
+
+    def get_key(self, kid: str):
+        """Devuelve la clave pública para el `kid` indicado o None si no existe."""
+        key = self._keys.get(kid)
+        if key is not None:
+            self._contar("hits")
+            if time.monotonic() - self._fetched_at > self.ttl:
+                self._refresh_in_background()
+            return key
+
+        self._contar("misses")
+        # Kid desconocido: forzar la descarga del JWKS
+        self.refresh(kid)
+        return self._keys.get(kid)
+
+    def _contar(self, nombre: str):
+        with self._stats_lock:
+            self.stats[nombre] += 1
+
+    def refresh(self, kid: str = None) -> bool:
+        """
+        Descarga el JWKS y reemplaza las claves. Conserva las anteriores si falla.
+
+        Si se indica `kid`, la descarga se omite cuando otro hilo ya obtuvo esa
+        clave o cuando el último intento fue hace menos de JWKS_MIN_REFETCH_INTERVAL.
+        """
+        with self._lock:
+            if kid is not None:
+                if kid in self._keys:
+                    return True
+                if (
+                    self._keys
+                    and time.monotonic() - self._last_attempt < self.min_refetch_interval
+                ):
+                    return False
+            self._last_attempt = time.monotonic()
+            try:
+                response = requests.get(self.jwks_url, timeout=self.timeout)
+                if response.status_code != 200:
+                    raise ValueError(f"Respuesta inesperada del JWKS: {response.status_code}")
+
+                jwks = response.json()
+                # Validar la estructura del JWKS
+                if not jwks or "keys" not in jwks or not jwks["keys"]:
+                    raise ValueError("El JWKS no contiene claves.")
+
+                keys = {
+                    k["kid"]: _jwk_a_clave_publica(k)
+                    for k in jwks["keys"]
+                    if k.get("kid") and k.get("kty", "RSA") == "RSA"
+                }
+            except Exception as e:
+                self._contar("refresh_errors")
+                logger.warning(f"Error al refrescar el JWKS, se conservan las claves anteriores: {e}")
+                return False
+
+            self._keys = keys
+            self._fetched_at = time.monotonic()
+            self._contar("refreshes")
+            return True
+
+    def _refresh_in_background(self):
+        """Lanza un único refresco en segundo plano mientras se sirven las claves actuales."""
+        with self._lock:
+            # Evitar refrescos en cadena mientras Authentik sigue fallando
+            if (
+                self._refreshing
+                or time.monotonic() - self._last_attempt < self.min_refetch_interval
+            ):
+                return
+            self._refreshing = True
+
+        def _run():
+            try:
+                self._contar("background_refreshes")
+                self.refresh()
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=_run, name="jwks-refresh", daemon=True).start()
+
+    def get_stats(self) -> dict:
+        """Devuelve los contadores del almacén junto con su estado actual."""
+        age = time.monotonic() - self._fetched_at if self._fetched_at else None
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return {
+            **stats,
+            "keys": len(self._keys),
+            "age_seconds": round(age, 3) if age is not None else None,
+            "ttl_seconds": self.ttl,
+        }
+
+
+class VerifiedTokenCache:
+    """
+    Caché LRU acotada de payloads de tokens ya verificados.
+
+    Las entradas se indexan por el hash SHA-256 del token (el token en claro no
+    se guarda) y expiran en el `exp` del propio token. Los tokens sin `exp` no
+    se almacenan.
+    """
+
+    def __init__(self, maxsize: int = JWT_CACHE_MAXSIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
+    @staticmethod
+    def _hash(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str):
+        """Devuelve el payload verificado del token o None si no está (o expiró)."""
+        key = self._hash(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            exp, payload = entry
+            if exp <= time.time():
+                del self._entries[key]
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return payload
+
+    def set(self, token: str, payload: dict):
+        """Guarda el payload verificado hasta el `exp` del token."""
+        exp = payload.get("exp")
+        if not isinstance(exp, (int, float)) or exp <= time.time():
+            return
+        key = self._hash(token)
+        with self._lock:
+            self._entries[key] = (exp, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def get_stats(self) -> dict:
+        """Devuelve los contadores de la caché junto con su ocupación."""
+        return {**self.stats, "size": len(self._entries), "maxsize": self.maxsize}
+
+
+# Instancias globales compartidas por todas las solicitudes del proceso
+jwks_store = JWKSKeyStore(JWKS_URL)
+token_cache = VerifiedTokenCache()
+
 
 def decode_access_token_with_jwks(token: str):
     """
@@ -24,14 +240,10 @@ def decode_access_token_with_jwks(token: str):
         if token.count(".") != 2:
             return None
 
-        response = requests.get(JWKS_URL)
-        if response.status_code != 200:
-            return None
-
-        jwks = response.json()
-        # Validar la estructura del JWKS
-        if not jwks or "keys" not in jwks or not jwks["keys"]:
-            return None
+        # Reutilizar el payload si el token ya fue verificado y no ha expirado
+        cached = token_cache.get(token)
+        if cached is not None:
+            return cached
 
         try:
             # Extraer el kid del encabezado del token
@@ -42,22 +254,17 @@ def decode_access_token_with_jwks(token: str):
         except Exception:
             return None
 
-        # Buscar la clave correspondiente en el JWKS
-        key = next((k for k in jwks["keys"] if k["kid"] == kid), None)
-        if not key:
+        # Buscar la clave correspondiente en el almacén de claves
+        public_key = jwks_store.get_key(kid)
+        if public_key is None:
             return None
 
         try:
-            # Convertir la clave JWK a formato PEM
-            n = int.from_bytes(base64url_decode(key["n"].encode("utf-8")), "big")
-            e = int.from_bytes(base64url_decode(key["e"].encode("utf-8")), "big")
-
-            public_key = rsa.RSAPublicNumbers(e, n).public_key(default_backend())
-
             # Decodificar el token utilizando la clave pública
             payload = jwt.decode(
                 token, public_key, algorithms=["RS256"], options={"verify_aud": False}
             )
+            token_cache.set(token, payload)
             return payload
         except ValueError:
             return None
@@ -0,0 +1,117 @@
+"""
+route_matcher.py
+Compila el mapeo de rutas a grupos de GroupMembershipMiddleware en un árbol de prefijos.
+
+El árbol se indexa carácter a carácter para conservar la semántica de
+`str.startswith` del middleware original (por ejemplo, la regla "/pedido" también
+protege "/pedidos/1"). El costo de cada decisión depende del largo de la ruta y no
+de la cantidad de reglas. La decisión se memoriza en el último nodo alcanzado
+por la ruta, por método: "/documento/1" y "/documento/2" comparten el nodo de
+"/documento/" y su decisión, así que la memoria no crece con los IDs.
+
+Ejecutar `python -m src.auth.route_matcher` imprime un micro-benchmark con
+cantidades crecientes de reglas.
+"""
+
+
+class _Nodo:
+    __slots__ = ("hijos", "reglas", "excluida", "decisiones")
+
+    def __init__(self):
+        self.hijos = {}
+        self.reglas = None  # {método: grupos}
+        self.excluida = False
+        # Decisión memorizada para las rutas que terminan su recorrido aquí: {método: (excluida, grupos)}
+        self.decisiones = {}
+
+
+class RouteGroupMatcher:
+    """
+    Resuelve qué grupos se requieren para una ruta y un método.
+
+    - Las rutas excluidas cortocircuitan la decisión en cuanto se encuentra su prefijo.
+    - Una coincidencia exacta (ruta, método) tiene prioridad sobre los prefijos.
+    - Entre prefijos gana el más largo; dentro de un mismo prefijo, el método
+      exacto tiene prioridad sobre "ALL".
+    - Los patrones con parámetro final (".../{id}") se registran sobre su ruta padre.
+    """
+
+    def __init__(self, route_group_mapping: dict, excluded_routes=()):
+        self._raiz = _Nodo()
+        self._exactas = dict(route_group_mapping)
+
+        for (patron, metodo), grupos in route_group_mapping.items():
+            prefijo = patron.rsplit("/", 1)[0] if patron.endswith("}") else patron
+            nodo = self._insertar(prefijo)
+            if nodo.reglas is None:
+                nodo.reglas = {}
+            nodo.reglas.setdefault(metodo, grupos)
+
+        for prefijo in excluded_routes:
+            self._insertar(prefijo).excluida = True
+
+    def _insertar(self, prefijo: str) -> _Nodo:
+        nodo = self._raiz
+        for caracter in prefijo:
+            nodo = nodo.hijos.setdefault(caracter, _Nodo())
+        return nodo
+
+    def match(self, ruta: str, metodo: str):
+        """
+        Returns:
+            tuple: (excluida, grupos_requeridos). `grupos_requeridos` es None si
+            ninguna regla aplica a la ruta.
+        """
+        nodo = self._raiz
+        for caracter in ruta:
+            siguiente = nodo.hijos.get(caracter)
+            if siguiente is None:
+                break
+            nodo = siguiente
+        # Todas las rutas que terminan en este nodo recorrieron los mismos prefijos
+        decision = nodo.decisiones.get(metodo)
+        if decision is None:
+            decision = nodo.decisiones[metodo] = self._decidir(ruta, metodo)
+        excluida, grupos = decision
+        if excluida:
+            return decision
+        return False, self._exactas.get((ruta, metodo), grupos)
+
+    def _decidir(self, ruta: str, metodo: str):
+        """Recorre el árbol aplicando exclusiones y reglas de prefijo (sin coincidencias exactas)."""
+        grupos = None
+        nodo = self._raiz
+        for caracter in ruta:
+            nodo = nodo.hijos.get(caracter)
+            if nodo is None:
+                break
+            if nodo.excluida:
+                return True, None
+            if nodo.reglas:
+                regla = nodo.reglas.get(metodo) or nodo.reglas.get("ALL")
+                if regla:
+                    grupos = regla
+        return False, grupos
+
+
+if __name__ == "__main__":
+    import timeit
+
+    # IDs distintos en cada ronda: la memoria por nodo no depende de ellos
+    rutas_consulta = ["/documento/{}", "/pedidos/empresa/{}", "/docs", "/sin/regla/{}"]
+    print(f"{'reglas':>8} | {'µs por decisión (sin memo)':>26} | {'µs por decisión (memo)':>22}")
+    for cantidad in (10, 100, 500, 1000):
+        mapeo = {(f"/modulo{i}/recurso", "ALL"): ["authentik Admins"] for i in range(cantidad)}
+        mapeo[("/documento", "ALL")] = ["authentik Admins"]
+        mapeo[("/pedido", "GET")] = ["authentik Admins"]
+        matcher = RouteGroupMatcher(mapeo, ["/docs", "/openapi.json"])
+        n = 20000
+        ids = iter(range(10**9))
+        sin_memo = timeit.timeit(
+            lambda: [matcher._decidir(r.format(next(ids)), "GET") for r in rutas_consulta], number=n
+        )
+        con_memo = timeit.timeit(
+            lambda: [matcher.match(r.format(next(ids)), "GET") for r in rutas_consulta], number=n
+        )
+        total = n * len(rutas_consulta)
+        print(f"{cantidad:>8} | {sin_memo / total * 1e6:>26.3f} | {con_memo / total * 1e6:>22.3f}")
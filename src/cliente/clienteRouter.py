@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from src.cliente.clienteSchema import ClienteSchema, ClienteUpdateSchema
-from database import get_db
+from database import get_async_db, get_db
 from src.cliente.clienteService import (
     get_cliente_by_id,
     get_all_clientes,
@@ -10,6 +13,7 @@ from src.cliente.clienteService import (
     # delete_cliente,
 )
 from src.loggers.loggerService import get_logger, get_request_info
+from src.utils.pagination import CURSOR_DESCRIPTION, OFFSET_DESCRIPTION, agregar_cursor
 
 logger = get_logger("ClienteRouter")
 
@@ -17,17 +21,26 @@ router = APIRouter(prefix="/cliente", tags=["Cliente"])
 
 
 @router.get("/")
-def get_clientes(request: Request, db: Session = Depends(get_db), limit: int = 10, page: int = 1):
+async def get_clientes(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    limit: int = 10,
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    page: int = Query(1, ge=1, deprecated=True, description=OFFSET_DESCRIPTION),
+):
     request_info = get_request_info(request)
     logger.info("Obteniendo todos los clientes", extra=request_info)
-    return get_all_clientes(db, limit=limit, page=page)
+    clientes = await db.run_sync(get_all_clientes, limit=limit, page=page, cursor=cursor)
+    agregar_cursor(response, clientes)
+    return clientes
 
 
 @router.get("/{cliente_id}")
-def get_cliente(cliente_id: int, request: Request, db: Session = Depends(get_db)):
+async def get_cliente(cliente_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
     request_info = get_request_info(request)
     logger.info(f"Obteniendo cliente con ID: {cliente_id}", extra=request_info)
-    cliente = get_cliente_by_id(db, cliente_id)
+    cliente = await db.run_sync(get_cliente_by_id, cliente_id)
     if not cliente:
         logger.warning(f"Cliente con ID: {cliente_id} no encontrado", extra=request_info)
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
@@ -54,12 +67,13 @@ def update_cliente_endpoint(
 
 
 @router.get("/documento/{documento}")
-def get_cliente_by_documento(documento: str, request: Request, db: Session = Depends(get_db)):
+async def get_cliente_by_documento(documento: str, request: Request, db: AsyncSession = Depends(get_async_db)):
     from src.cliente.cliModel import Cliente  # Importar el modelo Cliente
 
     request_info = get_request_info(request)
     logger.info(f"Obteniendo cliente con documento: {documento}", extra=request_info)
-    cliente = db.query(Cliente).filter(Cliente.documento == documento).first()
+    resultado = await db.execute(select(Cliente).where(Cliente.documento == documento))
+    cliente = resultado.scalars().first()
     if not cliente:
         logger.warning(f"Cliente con documento: {documento} no encontrado", extra=request_info)
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
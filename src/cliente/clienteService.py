@@ -1,13 +1,16 @@
 from sqlalchemy.orm import Session
+from src.utils.pagination import CursorInvalidoError, Pagina, paginar
 from src.cliente.cliModel import Cliente
 from src.cliente.clienteSchema import ClienteSchema, ClienteUpdateSchema
 
 
-def get_all_clientes(db: Session, limit: int = 10, page: int = 1):
+def get_all_clientes(db: Session, limit: int = 10, page: int = 1, cursor: str = None):
     try:
         offset = (page - 1) * limit
-        clientes = db.query(Cliente).offset(offset).limit(limit).all()
-        return [cliente.to_dict() for cliente in clientes]
+        clientes = paginar(db.query(Cliente), [Cliente.id], limit, cursor, offset)
+        return Pagina([cliente.to_dict() for cliente in clientes], clientes.next_cursor)
+    except CursorInvalidoError:
+        raise
     except Exception as e:
         return f"Error al obtener clientes: {e}"
 
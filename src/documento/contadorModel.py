@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String
+from database import Base
+
+
+class ContadorDocumento(Base):
+    """
+    Último número asignado por tipo de numeración ("documento", "factura",
+    "nota_credito", "nota_debito"). La fila se bloquea al incrementarla, por lo
+    que la asignación es segura entre transacciones y procesos concurrentes.
+    """
+
+    __tablename__ = "contador_documento"
+
+    nombre = Column(String(50), primary_key=True)
+    ultimo_valor = Column(Integer, nullable=False, default=0)
+    # Último valor de MANUAL_*_ID ya aplicado, para no reaplicarlo en otros workers o reinicios
+    semilla_manual = Column(Integer, nullable=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Numeric, String, Date, Time, ForeignKey
+from sqlalchemy import Column, Integer, Numeric, String, Date, Time, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declared_attr
 from database import Base
@@ -31,3 +31,7 @@ class Documento(Base):
             "polymorphic_on": cls.tipo_documento,
             "polymorphic_identity": "documento",
         }
+
+
+# Índice de la clave de orden de los listados (paginación por cursor)
+ix_documento_fecha_emision_id = Index("ix_documento_fecha_emision_id", Documento.fecha_emision, Documento.id)
@@ -1,6 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, Query
+import os
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_async_db, get_db
 from src.documento.documentoService.get_documentoService import (
     get_documento_by_id,
     get_all_documentos,
@@ -10,34 +14,46 @@ from src.documento.documentoService.get_documentoService import (
 )
 from src.documento.documentoService.create_documentoService import (
     get_or_create_factura,
+    create_facturas_batch,
     get_or_create_nota_credito,
     get_or_create_nota_debito,
 )
 from src.documento.factura.facturaSchema import FacturaSchema
 from src.documento.notas.notaSchema import NotaCreditoSchema, NotaDebitoSchema
 from src.loggers.loggerService import get_logger, get_request_info
+from src.utils.pagination import CURSOR_DESCRIPTION, OFFSET_DESCRIPTION, agregar_cursor
 
 logger = get_logger("DocumentoRouter")
 
 router = APIRouter(prefix="/documento", tags=["Documento"])
 
+# Cantidad máxima de facturas por solicitud de lote
+FACTURA_BATCH_MAX = int(os.getenv("FACTURA_BATCH_MAX", "1000"))
+
 
 # Endpoints para obtener documentos
 # Endpoint para obtener todos los documentos con paginación usando query parameters
 @router.get("/")
-def get_documentos(
-    request: Request, db: Session = Depends(get_db), limit: int = Query(10, ge=1), offset: int = Query(0, ge=0)
+async def get_documentos(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    limit: int = Query(10, ge=1),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    offset: int = Query(0, ge=0, deprecated=True, description=OFFSET_DESCRIPTION),
 ):
     request_info = get_request_info(request)
     logger.info("Obteniendo todos los documentos", extra=request_info)
-    return get_all_documentos(db, limit=limit, offset=offset)
+    resultado = await db.run_sync(get_all_documentos, limit=limit, cursor=cursor, offset=offset)
+    agregar_cursor(response, resultado)
+    return resultado
 
 
 @router.get("/{documento_id}")
-def get_documento(documento_id: int, request: Request, db: Session = Depends(get_db)):
+async def get_documento(documento_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
     request_info = get_request_info(request)
     logger.info(f"Obteniendo documento con ID: {documento_id}", extra=request_info)
-    documento = get_documento_by_id(db, documento_id)
+    documento = await db.run_sync(get_documento_by_id, documento_id)
     if not documento:
         logger.warning(
             f"Documento con ID: {documento_id} no encontrado", extra=request_info
@@ -47,15 +63,15 @@ def get_documento(documento_id: int, request: Request, db: Session = Depends(get
 
 
 @router.get("/numero-control/{numero_control}")
-def get_documento_numero_control(
-    numero_control: str, request: Request, db: Session = Depends(get_db)
+async def get_documento_numero_control(
+    numero_control: str, request: Request, db: AsyncSession = Depends(get_async_db)
 ):
     request_info = get_request_info(request)
     logger.info(
         f"Obteniendo documento con número de control: {numero_control}",
         extra=request_info,
     )
-    documento = get_documento_by_numero_control(db, numero_control)
+    documento = await db.run_sync(get_documento_by_numero_control, numero_control)
     if not documento:
         logger.warning(
             f"Documento con número de control: {numero_control} no encontrado",
@@ -67,20 +83,22 @@ def get_documento_numero_control(
 
 # Endpoint para obtener documentos por ID de empresa con paginación usando query parameters
 @router.get("/empresa/{empresa_id}")
-def get_documentos_empresa_id(
+async def get_documentos_empresa_id(
     empresa_id: int,
     request: Request,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     limit: int = Query(10, ge=1),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    offset: int = Query(0, ge=0, deprecated=True, description=OFFSET_DESCRIPTION),
 ):
     request_info = get_request_info(request)
     logger.info(
         f"Obteniendo documentos para la empresa con ID: {empresa_id}",
         extra=request_info,
     )
-    documentos = get_documentos_by_empresa_id(
-        db, empresa_id, limit=limit, offset=offset
+    documentos = await db.run_sync(
+        get_documentos_by_empresa_id, empresa_id, limit=limit, cursor=cursor, offset=offset
     )
     if not documentos:
         logger.warning(
@@ -91,25 +109,28 @@ def get_documentos_empresa_id(
             status_code=404,
             detail="No se encontraron documentos para la empresa especificada",
         )
+    agregar_cursor(response, documentos)
     return documentos
 
 
 # Endpoint para obtener documentos por ID de cliente con paginación usando query parameters
 @router.get("/cliente/{cliente_id}")
-def get_documentos_cliente_id(
+async def get_documentos_cliente_id(
     cliente_id: int,
     request: Request,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     limit: int = Query(10, ge=1),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    offset: int = Query(0, ge=0, deprecated=True, description=OFFSET_DESCRIPTION),
 ):
     request_info = get_request_info(request)
     logger.info(
         f"Obteniendo documentos para el cliente con ID: {cliente_id}",
         extra=request_info,
     )
-    documentos = get_documentos_by_cliente_id(
-        db, cliente_id, limit=limit, offset=offset
+    documentos = await db.run_sync(
+        get_documentos_by_cliente_id, cliente_id, limit=limit, cursor=cursor, offset=offset
     )
     if not documentos:
         logger.warning(
@@ -120,6 +141,7 @@ def get_documentos_cliente_id(
             status_code=404,
             detail="No se encontraron documentos para el cliente especificado",
         )
+    agregar_cursor(response, documentos)
     return documentos
 
 
@@ -133,6 +155,29 @@ def create_factura_endpoint(
     return get_or_create_factura(db, factura_data)
 
 
+# Endpoint para convertir varios pedidos en facturas en una sola transacción
+@router.post("/create/factura/batch")
+def create_facturas_batch_endpoint(
+    facturas_data: List[FacturaSchema], request: Request, db: Session = Depends(get_db)
+):
+    request_info = get_request_info(request)
+    if not facturas_data:
+        raise HTTPException(status_code=400, detail="El lote de facturas está vacío")
+    if len(facturas_data) > FACTURA_BATCH_MAX:
+        raise HTTPException(
+            status_code=400,
+            detail=f"El lote excede el máximo de {FACTURA_BATCH_MAX} facturas",
+        )
+    logger.info(f"Creando lote de {len(facturas_data)} facturas", extra=request_info)
+    resultado = create_facturas_batch(db, facturas_data)
+    logger.info(
+        f"Lote de facturas: {resultado['creadas']} creadas, {resultado['fallidas']} fallidas, "
+        f"{resultado['facturas_por_segundo']} facturas/s",
+        extra=request_info,
+    )
+    return resultado
+
+
 # Ruta para crear una nota de crédito
 @router.post("/create/nota-credito")
 def create_nota_credito_endpoint(
@@ -1,12 +1,16 @@
 # region Imports
 from datetime import datetime
 import os
+import time
 from decimal import Decimal
 import traceback
+from typing import List
 
-from sqlalchemy.orm import Session
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy.exc import IntegrityError
 
+from src.cliente.cliModel import Cliente
 from src.cliente.clienteService import get_cliente_by_id
 from src.documento.factura.detalleFactura.detalleFacturaModel import DetalleFactura
 from src.documento.factura.facModel import Factura
@@ -17,15 +21,18 @@ from src.documento.notas.notaSchema import NotaCreditoSchema, NotaDebitoSchema
 
 # from src.documento.orden_entrega.ordenEntregaModel import OrdenEntrega
 # from src.documento.orden_entrega.ordenEntregaSchema import OrdenEntregaSchema
+from src.empresa.empModel import Empresa
 from src.empresa.empresaService import get_empresa_by_id
 from src.monedas.dolar.dolarService import obtener_dolar_bcv
 from src.pedidos.pedidoModel import Pedido
+from src.pedidos.detallePedido.detallePedidoModel import DetallePedido
 
 from src.documento.documentoService.smartService import (
     generar_json_imprenta,
     generar_json_imprenta_notas,  # Importar la nueva función para notas
-    enviar_a_imprenta,
 )
+from src.documento.imprenta.imprentaService import encolar_envio_imprenta
+from src.documento.documentoService.numeracionService import reservar_ids
 from src.documento.documentoService.helperService import (
     rollback_manual,
     rollback_manual_nota_credito,
@@ -53,6 +60,29 @@ def decimal_to_float(data):
     return data
 
 
+def valores_iva(factura_id: int, totales: dict) -> dict:
+    """Columnas de la tabla iva a partir de los totales calculados."""
+    return {
+        "factura_id": factura_id,
+        "subtotal_productos": totales["subtotal_productos"],
+        "base": totales["monto_base"],  # Asignar el valor calculado de 'base'
+        "monto_exento": totales["monto_exento"],
+        "monto_base_general": totales["monto_base_general"],
+        "monto_base_reducida": totales["monto_base_reducida"],
+        "monto_base_adicional": totales["monto_base_adicional"],
+        "iva_general": totales["iva_general"],
+        "iva_general_monto": totales["iva_general_monto"],
+        "iva_reducida": totales["iva_reducida"],
+        "iva_reducida_monto": totales["iva_reducida_monto"],
+        "iva_adicional": totales["iva_adicional"],
+        "iva_adicional_monto": totales["iva_adicional_monto"],
+        "base_igtf": totales["base_igtf"],
+        "igtf": totales["igtf"],
+        "monto_igtf": totales["monto_igtf"],
+        "monto": totales["monto_total"],
+    }
+
+
 # endregion
 
 POST_SMART = os.getenv("POST_SMART")
@@ -68,8 +98,15 @@ def get_or_create_factura(db: Session, documento_data: FacturaSchema):
             documento_id = obtener_siguiente_id_documento(db)
             factura_id = obtener_siguiente_id_factura(db)            
 
-            # Validar existencia del pedido
-            pedido = validar_existencia(db, Pedido, documento_data.pedido_id, "Pedido")
+            # Validar existencia del pedido, con sus detalles y productos (una
+            # consulta por relación en lugar de una por línea al calcular impuestos)
+            pedido = validar_existencia(
+                db,
+                Pedido,
+                documento_data.pedido_id,
+                "Pedido",
+                selectinload(Pedido.detalles).selectinload(DetallePedido.producto),
+            )
 
             if pedido.estado != "pendiente":
                 raise ValueError(
@@ -116,29 +153,12 @@ def get_or_create_factura(db: Session, documento_data: FacturaSchema):
                 db.add(detalle_factura)
 
             # Crear impuestos con el valor calculado de 'base'
-            impuesto = iva(
-                factura_id=factura.factura_id,
-                subtotal_productos=totales["subtotal_productos"],
-                base=totales["monto_base"],  # Asignar el valor calculado de 'base'
-                monto_exento=totales["monto_exento"],
-                monto_base_general=totales["monto_base_general"],
-                monto_base_reducida=totales["monto_base_reducida"],
-                monto_base_adicional=totales["monto_base_adicional"],
-                iva_general=totales["iva_general"],
-                iva_general_monto=totales["iva_general_monto"],
-                iva_reducida=totales["iva_reducida"],
-                iva_reducida_monto=totales["iva_reducida_monto"],
-                iva_adicional=totales["iva_adicional"],
-                iva_adicional_monto=totales["iva_adicional_monto"],
-                base_igtf=totales["base_igtf"],
-                igtf=totales["igtf"],
-                monto_igtf=totales["monto_igtf"],
-                monto=totales["monto_total"],
-            )
+            impuesto = iva(**valores_iva(factura.factura_id, totales))
             db.add(impuesto)
 
             if POST_SMART == "true":
-                # Enviar a imprenta digital
+                # Encolar el envío a imprenta digital en la misma transacción;
+                # los trabajadores de imprenta completan el número de control
                 cliente = get_cliente_by_id(db, factura.cliente_id)
                 empresa = get_empresa_by_id(db, factura.empresa_id)
                 json_imprenta = generar_json_imprenta(
@@ -150,37 +170,10 @@ def get_or_create_factura(db: Session, documento_data: FacturaSchema):
                     precio_bcv,
                     pedido.id,
                 )
-                print(f"JSON para imprenta: {json_imprenta}")
-                url_facturacion = f"{SMART_URL}/facturacion"
-                respuesta_imprenta = enviar_a_imprenta(
-                    json_imprenta, url_facturacion, factura.id
+                encolar_envio_imprenta(
+                    db, factura.id, json_imprenta, f"{SMART_URL}/facturacion"
                 )
 
-                if "success" in respuesta_imprenta and respuesta_imprenta["success"]:
-                    # Actualizar los campos con los datos de la respuesta
-                    factura.numero_control = respuesta_imprenta["data"][
-                        "numerodocumento"
-                    ]
-                    factura.fecha_numero_control = datetime.strptime(
-                        respuesta_imprenta["data"]["fecha"], "%Y%m%d"
-                    ).date()
-                    factura.hora_numero_control = datetime.strptime(
-                        respuesta_imprenta["data"]["hora"], "%H:%M:%S"
-                    ).time()
-                    factura.url_pdf = respuesta_imprenta["data"]["urlpdf"]
-                    factura.estado = "Procesado a imprenta"
-                else:
-                    error_message = respuesta_imprenta.get("error", {}).get(
-                        "message", "Desconocido"
-                    )
-                    print(
-                        f"Error al enviar a imprenta: {error_message}, {respuesta_imprenta.get('data', {})}"
-                    )
-                    rollback_manual(
-                        db, factura.factura_id
-                    )  # Realizar rollback en caso de error
-                    raise ValueError(f"Error al enviar a imprenta: {error_message}")
-
             # Actualizamos factura con mas datos
             factura.total = totales.get("monto_total", 0)
             factura.descuento_total = totales.get("descuento_total", 0)
@@ -215,6 +208,206 @@ def get_or_create_factura(db: Session, documento_data: FacturaSchema):
 # endregion
 
 
+# region Creación de documentos - Facturas en lote
+def create_facturas_batch(db: Session, facturas_data: List[FacturaSchema]):
+    """
+    Convierte varios pedidos en facturas dentro de una sola transacción.
+
+    Los pedidos, sus detalles y productos se cargan con unas pocas consultas IN,
+    los totales de todos los pedidos se calculan juntos (impuestoLoteService),
+    los IDs de documento y factura se reservan como un bloque contiguo y los
+    detalles e impuestos se insertan en bloque. Los pedidos que no pasan la
+    validación se reportan por ítem sin detener el resto del lote.
+
+    Returns:
+        dict: Resultados por ítem (en el orden recibido), conteos y facturas por segundo.
+    """
+    inicio = time.perf_counter()
+    resultados = [None] * len(facturas_data)
+
+    try:
+        with db.begin():  # Transacción atómica para todo el lote
+            pedido_ids = {item.pedido_id for item in facturas_data}
+            pedidos = {
+                pedido.id: pedido
+                for pedido in db.query(Pedido)
+                .options(selectinload(Pedido.detalles).selectinload(DetallePedido.producto))
+                .filter(Pedido.id.in_(pedido_ids))
+                .all()
+            }
+
+            # Validar cada ítem
+            candidatos = []
+            for indice, item in enumerate(facturas_data):
+                pedido = pedidos.get(item.pedido_id)
+                try:
+                    if pedido is None:
+                        raise ValueError(f"Pedido con ID {item.pedido_id} no encontrado.")
+                    if pedido.estado != "pendiente":
+                        raise ValueError(
+                            "El pedido no está en un estado válido para facturación."
+                        )
+                    precio_bcv = pedido.tasa_cambio
+                    if not isinstance(precio_bcv, (int, float, Decimal)) or precio_bcv <= 0:
+                        raise ValueError("El precio del BCV no es válido.")
+                except ValueError as e:
+                    resultados[indice] = {
+                        "indice": indice,
+                        "pedido_id": item.pedido_id,
+                        "error": f"Error de validación: {str(e)}",
+                    }
+                    continue
+                candidatos.append((indice, item, pedido))
+
+            # Totales de todo el lote en un solo cálculo; si una línea es inválida
+            # se calculan por pedido para reportar el error en su ítem. NumPy se
+            # importa aquí para no cargarlo al arrancar la aplicación.
+            from src.documento.documentoService.impuestoLoteService import (
+                calcular_totales_pedidos,
+            )
+
+            try:
+                totales_lote = calcular_totales_pedidos(
+                    [pedido for _, _, pedido in candidatos],
+                    [item.aplica_igtf for _, item, _ in candidatos],
+                )
+            except ValueError:
+                totales_lote = None
+
+            validos = []
+            vistos = set()
+            for posicion, (indice, item, pedido) in enumerate(candidatos):
+                try:
+                    if item.pedido_id in vistos:
+                        raise ValueError("El pedido está repetido en el lote.")
+                    if totales_lote is not None:
+                        totales = totales_lote[posicion]
+                    else:
+                        totales = calcular_totales(
+                            pedido.detalles, item.aplica_igtf, pedido.tasa_cambio
+                        )
+                except ValueError as e:
+                    resultados[indice] = {
+                        "indice": indice,
+                        "pedido_id": item.pedido_id,
+                        "error": f"Error de validación: {str(e)}",
+                    }
+                    continue
+                vistos.add(item.pedido_id)
+                validos.append((indice, item, pedido, totales))
+
+            if validos:
+                # Reservar un bloque contiguo de IDs para el lote
+                primer_documento_id = reservar_ids(db, "documento", len(validos))
+                primer_factura_id = reservar_ids(db, "factura", len(validos))
+
+                if POST_SMART == "true":
+                    clientes = {
+                        c.id: c
+                        for c in db.query(Cliente).filter(
+                            Cliente.id.in_({p.cliente_id for _, _, p, _ in validos})
+                        )
+                    }
+                    empresas = {
+                        e.id: e
+                        for e in db.query(Empresa).filter(
+                            Empresa.id.in_({p.empresa_id for _, _, p, _ in validos})
+                        )
+                    }
+
+                hoy = datetime.today().date()
+                ahora = datetime.now().time()
+                facturas = []
+                filas_detalle = []
+                filas_iva = []
+                for posicion, (indice, item, pedido, totales) in enumerate(validos):
+                    factura = Factura(
+                        id=primer_documento_id + posicion,
+                        factura_id=primer_factura_id + posicion,
+                        tipo_documento="Factura",
+                        estado="En espera",
+                        empresa_id=pedido.empresa_id,
+                        cliente_id=pedido.cliente_id,
+                        pedido_id=pedido.id,
+                        fecha_emision=hoy,
+                        hora_emision=ahora,
+                        aplica_igtf=item.aplica_igtf,
+                        tasa_cambio=pedido.tasa_cambio,
+                        total=totales.get("monto_total", 0),
+                        descuento_total=totales.get("descuento_total", 0),
+                        monto_dolares=totales.get("monto_dolares", 0),
+                    )
+                    facturas.append(factura)
+                    filas_detalle.extend(
+                        {
+                            "factura_id": factura.factura_id,
+                            "producto_id": detalle.producto_id,
+                            "cantidad": detalle.cantidad,
+                            "alicuota_iva": detalle.alicuota_iva,
+                            "descuento": detalle.descuento,
+                            "precio_unitario": detalle.precio_unitario,
+                            "total": detalle.total,
+                        }
+                        for detalle in pedido.detalles
+                    )
+                    filas_iva.append(valores_iva(factura.factura_id, totales))
+                    pedido.estado = "procesado"
+
+                db.add_all(facturas)
+                db.flush()  # Insertar documentos y facturas antes de sus dependencias
+                if filas_detalle:
+                    db.execute(insert(DetalleFactura), filas_detalle)
+                db.execute(insert(iva), filas_iva)
+
+                for factura, fila_iva, (indice, item, pedido, totales) in zip(
+                    facturas, filas_iva, validos
+                ):
+                    if POST_SMART == "true":
+                        json_imprenta = generar_json_imprenta(
+                            factura,
+                            pedido.detalles,
+                            clientes[pedido.cliente_id],
+                            empresas[pedido.empresa_id],
+                            iva(**fila_iva),
+                            pedido.tasa_cambio,
+                            pedido.id,
+                        )
+                        encolar_envio_imprenta(
+                            db, factura.id, json_imprenta, f"{SMART_URL}/facturacion"
+                        )
+                    resultados[indice] = {
+                        "indice": indice,
+                        "pedido_id": pedido.id,
+                        "factura": parse_factura(factura, totales),
+                    }
+
+    except Exception as e:
+        # Si la transacción falla, ninguna factura del lote queda creada
+        error_trace = traceback.format_exc()
+        print(f"Error inesperado en el lote de facturas: {str(e)}")
+        print(f"Traceback del error: {error_trace}")
+        for indice, resultado in enumerate(resultados):
+            if resultado is None or "factura" in resultado:
+                resultados[indice] = {
+                    "indice": indice,
+                    "pedido_id": facturas_data[indice].pedido_id,
+                    "error": f"Error inesperado: {str(e)}",
+                }
+
+    duracion = time.perf_counter() - inicio
+    creadas = sum(1 for resultado in resultados if "factura" in resultado)
+    return {
+        "resultados": resultados,
+        "creadas": creadas,
+        "fallidas": len(resultados) - creadas,
+        "duracion_segundos": round(duracion, 4),
+        "facturas_por_segundo": round(creadas / duracion, 2) if duracion > 0 else None,
+    }
+
+
+# endregion
+
+
 # region Notas de crédito
 # Función para crear una nota de crédito
 def get_or_create_nota_credito(db: Session, documento_data: NotaCreditoSchema):
@@ -292,8 +485,8 @@ def get_or_create_nota_credito(db: Session, documento_data: NotaCreditoSchema):
             db.add(nota_credito)
 
             if POST_SMART == "true":
-                print("POST_SMART is true")
-                # Enviar a imprenta digital para notas
+                # Encolar el envío a imprenta digital en la misma transacción. Si
+                # la factura sigue en la cola, la nota espera a su número de control
                 cliente = get_cliente_by_id(db, factura.cliente_id)
                 empresa = get_empresa_by_id(db, factura.empresa_id)
                 json_imprenta = generar_json_imprenta_notas(
@@ -303,42 +496,16 @@ def get_or_create_nota_credito(db: Session, documento_data: NotaCreditoSchema):
                     empresa,
                     precio_bcv=obtener_dolar_bcv(db),
                     tipo_documento=3,  # Tipo de documento para nota de crédito
-                    factura_nro_control=factura.numero_control,  # ID de la factura relacionada
-                )
-                print(f"JSON para imprenta de nota de crédito: {json_imprenta}")
-                url_imprenta = (
-                    f"{SMART_URL}/facturacion"  # Usar variable de entorno para la URL
+                    factura_nro_control=factura.numero_control or "",  # ID de la factura relacionada
                 )
-                respuesta_imprenta = enviar_a_imprenta(
-                    json_imprenta, url_imprenta, nota_credito.id
+                encolar_envio_imprenta(
+                    db,
+                    nota_credito.id,
+                    json_imprenta,
+                    f"{SMART_URL}/facturacion",
+                    depende_de=None if factura.numero_control else factura.id,
                 )
 
-                print(f"Respuesta de imprenta: {respuesta_imprenta}")
-                if "success" in respuesta_imprenta and respuesta_imprenta["success"]:
-                    # Actualizar los campos con los datos de la respuesta
-                    nota_credito.numero_control = respuesta_imprenta["data"][
-                        "numerodocumento"
-                    ]
-                    nota_credito.fecha_numero_control = datetime.strptime(
-                        respuesta_imprenta["data"]["fecha"], "%Y%m%d"
-                    ).date()
-                    nota_credito.hora_numero_control = datetime.strptime(
-                        respuesta_imprenta["data"]["hora"], "%H:%M:%S"
-                    ).time()
-                    nota_credito.url_pdf = respuesta_imprenta["data"]["urlpdf"]
-                    nota_credito.estado = "Procesado a imprenta"
-                else:
-                    error_message = respuesta_imprenta.get("error", {}).get(
-                        "message", "Desconocido"
-                    )
-                    print(
-                        f"Error al enviar a imprenta: {error_message}, {respuesta_imprenta.get('data', {})}"
-                    )
-                    rollback_manual_nota_credito(
-                        db, nota_credito.nota_credito_id
-                    )  # Realizar rollback en caso de error
-                    raise ValueError(f"Error al enviar a imprenta: {error_message}")
-
             parsed_nota_credito = parse_nota_credito(nota_credito)
             return {"nota_credito": parsed_nota_credito, "factura_id": factura.id}
 
@@ -441,7 +608,8 @@ def get_or_create_nota_debito(db: Session, documento_data: NotaDebitoSchema):
             db.add(nota_debito)
 
             if POST_SMART == "true":
-                # Enviar a imprenta digital para notas
+                # Encolar el envío a imprenta digital en la misma transacción. Si
+                # la factura sigue en la cola, la nota espera a su número de control
                 cliente = get_cliente_by_id(db, factura.cliente_id)
                 empresa = get_empresa_by_id(db, factura.empresa_id)
                 json_imprenta = generar_json_imprenta_notas(
@@ -451,39 +619,15 @@ def get_or_create_nota_debito(db: Session, documento_data: NotaDebitoSchema):
                     empresa,
                     precio_bcv=obtener_dolar_bcv(db),
                     tipo_documento=2,  # Tipo de documento para nota de débito
-                    factura_nro_control=factura.numero_control,  # ID de la factura relacionada
+                    factura_nro_control=factura.numero_control or "",  # ID de la factura relacionada
                 )
-                url_imprenta = (
-                    f"{SMART_URL}/facturacion"  # Usar variable de entorno para la URL
+                encolar_envio_imprenta(
+                    db,
+                    nota_debito.id,
+                    json_imprenta,
+                    f"{SMART_URL}/facturacion",
+                    depende_de=None if factura.numero_control else factura.id,
                 )
-                respuesta_imprenta = enviar_a_imprenta(
-                    json_imprenta, url_imprenta, nota_debito.id
-                )
-
-                if "success" in respuesta_imprenta and respuesta_imprenta["success"]:
-                    # Actualizar los campos con los datos de la respuesta
-                    nota_debito.numero_control = respuesta_imprenta["data"][
-                        "numerodocumento"
-                    ]
-                    nota_debito.fecha_numero_control = datetime.strptime(
-                        respuesta_imprenta["data"]["fecha"], "%Y%m%d"
-                    ).date()
-                    nota_debito.hora_numero_control = datetime.strptime(
-                        respuesta_imprenta["data"]["hora"], "%H:%M:%S"
-                    ).time()
-                    nota_debito.url_pdf = respuesta_imprenta["data"]["urlpdf"]
-                    nota_debito.estado = "Procesado a imprenta"
-                else:
-                    error_message = respuesta_imprenta.get("error", {}).get(
-                        "message", "Desconocido"
-                    )
-                    print(
-                        f"Error al enviar a imprenta: {error_message}, {respuesta_imprenta.get('data', {})}"
-                    )
-                    rollback_manual_nota_debito(
-                        db, nota_debito.nota_debito_id
-                    )  # Realizar rollback en caso de error
-                    raise ValueError(f"Error al enviar a imprenta: {error_message}")
 
             parsed_nota_debito = parse_nota_debito(nota_debito)
             return {"nota_debito": parsed_nota_debito, "factura_id": factura.id}
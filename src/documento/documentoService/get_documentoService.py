@@ -1,178 +1,176 @@
-from sqlalchemy.orm import Session
+import datetime
+from functools import lru_cache
+from decimal import Decimal
+from typing import List, Optional, TypedDict
+
+from sqlalchemy.orm import Session, with_polymorphic
 from src.documento.docModel import Documento
 from src.documento.factura.facModel import Factura
 from src.documento.notas.notaModel import NotaCredito, NotaDebito
 from src.documento.factura.iva.ivaModel import iva
+from src.utils.pagination import Pagina, paginar
+
+
+@lru_cache(maxsize=None)
+def _documento_poly():
+    """
+    Documento con las columnas de sus subtipos unidas por LEFT OUTER JOIN.
+    Se construye al primer uso porque `with_polymorphic` configura los mappers
+    y todos los modelos deben estar importados.
+    """
+    return with_polymorphic(Documento, [Factura, NotaCredito, NotaDebito])
+
+
+def _columnas_documento(poly):
+    # Columnas seleccionadas para los listados (una sola consulta, sin objetos ORM)
+    return (
+        poly.id,
+        poly.tipo_documento,
+        poly.numero_control,
+        poly.fecha_emision,
+        poly.hora_emision,
+        poly.empresa_id,
+        poly.cliente_id,
+        poly.estado,
+        poly.tasa_cambio,
+        poly.fecha_numero_control,
+        poly.hora_numero_control,
+        poly.url_pdf,
+        poly.Factura.factura_id,
+        poly.NotaCredito.nota_credito_id,
+        poly.NotaDebito.nota_debito_id,
+    )
 
 
-# Función para obtener todos los documentos con el ID relacionado
-def get_all_documentos(db: Session, limit: int = 10, offset: int = 0):
-    documentos = db.query(Documento).offset(offset).limit(limit).all()
-    documentos_enriquecidos = []
-
-    for documento in documentos:
-        documento_dict = documento.__dict__.copy()
-
-        if documento.tipo_documento == "Factura":
-            factura = db.query(Factura).filter(Factura.id == documento.id).first()
-            documento_dict["factura_id"] = factura.factura_id if factura else None
-
-        elif documento.tipo_documento == "NotaCredito":
-            nota_credito = (
-                db.query(NotaCredito).filter(NotaCredito.id == documento.id).first()
-            )
-            documento_dict["nota_credito_id"] = (
-                nota_credito.nota_credito_id if nota_credito else None
-            )
-
-        elif documento.tipo_documento == "NotaDebito":
-            nota_debito = (
-                db.query(NotaDebito).filter(NotaDebito.id == documento.id).first()
-            )
-            documento_dict["nota_debito_id"] = (
-                nota_debito.nota_debito_id if nota_debito else None
-            )
+# Orden estable de los listados (clave de la paginación por cursor)
+ORDEN_DOCUMENTOS = (Documento.fecha_emision, Documento.id)
+
+# ID propio de cada subtipo de documento
+ID_POR_TIPO = {
+    "Factura": "factura_id",
+    "NotaCredito": "nota_credito_id",
+    "NotaDebito": "nota_debito_id",
+}
+
+
+class DocumentoRow(TypedDict, total=False):
+    id: int
+    tipo_documento: str
+    numero_control: Optional[str]
+    fecha_emision: datetime.date
+    hora_emision: datetime.time
+    empresa_id: int
+    cliente_id: int
+    estado: str
+    tasa_cambio: Optional[Decimal]
+    fecha_numero_control: Optional[datetime.date]
+    hora_numero_control: Optional[datetime.time]
+    url_pdf: Optional[str]
+    factura_id: Optional[int]
+    nota_credito_id: Optional[int]
+    nota_debito_id: Optional[int]
+    impuestos: List[dict]
+
+
+def _iva_a_dict(impuesto: iva) -> dict:
+    return {columna.name: getattr(impuesto, columna.name) for columna in iva.__table__.columns}
+
+
+def _construir_filas(db: Session, registros, incluir_impuestos: bool) -> List[DocumentoRow]:
+    """
+    Convierte las filas de la consulta en DocumentoRow. Solo se incluye el ID del
+    subtipo que corresponde al documento, igual que la respuesta anterior.
+    Los impuestos de todas las facturas de la página se cargan en una sola consulta.
+    """
+    filas = []
+    for registro in registros:
+        fila = DocumentoRow(
+            id=registro.id,
+            tipo_documento=registro.tipo_documento,
+            numero_control=registro.numero_control,
+            fecha_emision=registro.fecha_emision,
+            hora_emision=registro.hora_emision,
+            empresa_id=registro.empresa_id,
+            cliente_id=registro.cliente_id,
+            estado=registro.estado,
+            tasa_cambio=registro.tasa_cambio,
+            fecha_numero_control=registro.fecha_numero_control,
+            hora_numero_control=registro.hora_numero_control,
+            url_pdf=registro.url_pdf,
+        )
+        campo_id = ID_POR_TIPO.get(registro.tipo_documento)
+        if campo_id:
+            fila[campo_id] = getattr(registro, campo_id)
+        filas.append(fila)
+
+    if incluir_impuestos:
+        factura_ids = [fila["factura_id"] for fila in filas if fila.get("factura_id") is not None]
+        impuestos_por_factura = {}
+        if factura_ids:
+            for impuesto in db.query(iva).filter(iva.factura_id.in_(factura_ids)):
+                impuestos_por_factura.setdefault(impuesto.factura_id, []).append(
+                    _iva_a_dict(impuesto)
+                )
+        for fila in filas:
+            if fila["tipo_documento"] == "Factura":
+                fila["impuestos"] = impuestos_por_factura.get(fila.get("factura_id"), [])
+
+    return filas
+
+
+def _consultar_documentos(db: Session, *filtros):
+    return db.query(*_columnas_documento(_documento_poly())).filter(*filtros)
 
-        documentos_enriquecidos.append(documento_dict)
 
-    return documentos_enriquecidos
+# Función para obtener todos los documentos con el ID relacionado
+def get_all_documentos(db: Session, limit: int = 10, offset: int = 0, cursor: str = None) -> List[DocumentoRow]:
+    registros = paginar(_consultar_documentos(db), ORDEN_DOCUMENTOS, limit, cursor, offset)
+    return Pagina(
+        _construir_filas(db, registros, incluir_impuestos=False), registros.next_cursor
+    )
 
 
 # Función para obtener un documento por ID
-def get_documento_by_id(db: Session, documento_id: int):
-    documento = db.query(Documento).filter(Documento.id == documento_id).first()
-    if documento:
-        documento_dict = documento.__dict__.copy()
-
-        if documento.tipo_documento == "Factura":
-            factura = db.query(Factura).filter(Factura.id == documento.id).first()
-            documento_dict["factura_id"] = factura.factura_id if factura else None
-            documento_dict["impuestos"] = (
-                db.query(iva).filter(iva.factura_id == documento.id).all()
-            )
-
-        elif documento.tipo_documento == "NotaCredito":
-            nota_credito = (
-                db.query(NotaCredito).filter(NotaCredito.id == documento.id).first()
-            )
-            documento_dict["nota_credito_id"] = (
-                nota_credito.nota_credito_id if nota_credito else None
-            )
-
-        elif documento.tipo_documento == "NotaDebito":
-            nota_debito = (
-                db.query(NotaDebito).filter(NotaDebito.id == documento.id).first()
-            )
-            documento_dict["nota_debito_id"] = (
-                nota_debito.nota_debito_id if nota_debito else None
-            )
-
-        return documento_dict
+def get_documento_by_id(db: Session, documento_id: int) -> Optional[DocumentoRow]:
+    registro = _consultar_documentos(db, Documento.id == documento_id).first()
+    if registro:
+        return _construir_filas(db, [registro], incluir_impuestos=True)[0]
     return None
 
 
 # Función para obtener un documento por número de control
-def get_documento_by_numero_control(db: Session, numero_control: str):
-    documento = (
-        db.query(Documento).filter(Documento.numero_control == numero_control).first()
-    )
-    if documento:
-        documento_dict = documento.__dict__.copy()
-
-        if documento.tipo_documento == "Factura":
-            factura = db.query(Factura).filter(Factura.id == documento.id).first()
-            documento_dict["factura_id"] = factura.factura_id if factura else None
-            documento_dict["impuestos"] = (
-                db.query(iva).filter(iva.factura_id == documento.id).all()
-            )
-
-        elif documento.tipo_documento == "NotaCredito":
-            nota_credito = (
-                db.query(NotaCredito).filter(NotaCredito.id == documento.id).first()
-            )
-            documento_dict["nota_credito_id"] = (
-                nota_credito.nota_credito_id if nota_credito else None
-            )
-
-        elif documento.tipo_documento == "NotaDebito":
-            nota_debito = (
-                db.query(NotaDebito).filter(NotaDebito.id == documento.id).first()
-            )
-            documento_dict["nota_debito_id"] = (
-                nota_debito.nota_debito_id if nota_debito else None
-            )
-
-        return documento_dict
+def get_documento_by_numero_control(db: Session, numero_control: str) -> Optional[DocumentoRow]:
+    registro = _consultar_documentos(
+        db, Documento.numero_control == numero_control
+    ).first()
+    if registro:
+        return _construir_filas(db, [registro], incluir_impuestos=True)[0]
     return None
 
 
 # Función para obtener documentos por ID de empresa
-def get_documentos_by_empresa_id(db: Session, empresa_id: int, limit: int = 10, offset: int = 0):
-    documentos = db.query(Documento).filter(Documento.empresa_id == empresa_id).offset(offset).limit(limit).all()
-    documentos_enriquecidos = []
-
-    for documento in documentos:
-        documento_dict = documento.__dict__.copy()
-
-        if documento.tipo_documento == "Factura":
-            factura = db.query(Factura).filter(Factura.id == documento.id).first()
-            documento_dict["factura_id"] = factura.factura_id if factura else None
-            documento_dict["impuestos"] = (
-                db.query(iva).filter(iva.factura_id == documento.id).all()
-            )
-
-        elif documento.tipo_documento == "NotaCredito":
-            nota_credito = (
-                db.query(NotaCredito).filter(NotaCredito.id == documento.id).first()
-            )
-            documento_dict["nota_credito_id"] = (
-                nota_credito.nota_credito_id if nota_credito else None
-            )
-
-        elif documento.tipo_documento == "NotaDebito":
-            nota_debito = (
-                db.query(NotaDebito).filter(NotaDebito.id == documento.id).first()
-            )
-            documento_dict["nota_debito_id"] = (
-                nota_debito.nota_debito_id if nota_debito else None
-            )
-
-        documentos_enriquecidos.append(documento_dict)
-
-    return documentos_enriquecidos
+def get_documentos_by_empresa_id(db: Session, empresa_id: int, limit: int = 10, offset: int = 0, cursor: str = None) -> List[DocumentoRow]:
+    registros = paginar(
+        _consultar_documentos(db, Documento.empresa_id == empresa_id),
+        ORDEN_DOCUMENTOS,
+        limit,
+        cursor,
+        offset,
+    )
+    return Pagina(
+        _construir_filas(db, registros, incluir_impuestos=True), registros.next_cursor
+    )
 
 
 # Función para obtener documentos por ID de cliente
-def get_documentos_by_cliente_id(db: Session, cliente_id: int, limit: int = 10, offset: int = 0):
-    documentos = db.query(Documento).filter(Documento.cliente_id == cliente_id).offset(offset).limit(limit).all()
-    documentos_enriquecidos = []
-
-    for documento in documentos:
-        documento_dict = documento.__dict__.copy()
-
-        if documento.tipo_documento == "Factura":
-            factura = db.query(Factura).filter(Factura.id == documento.id).first()
-            documento_dict["factura_id"] = factura.factura_id if factura else None
-            documento_dict["impuestos"] = (
-                db.query(iva).filter(iva.factura_id == documento.id).all()
-            )
-
-        elif documento.tipo_documento == "NotaCredito":
-            nota_credito = (
-                db.query(NotaCredito).filter(NotaCredito.id == documento.id).first()
-            )
-            documento_dict["nota_credito_id"] = (
-                nota_credito.nota_credito_id if nota_credito else None
-            )
-
-        elif documento.tipo_documento == "NotaDebito":
-            nota_debito = (
-                db.query(NotaDebito).filter(NotaDebito.id == documento.id).first()
-            )
-            documento_dict["nota_debito_id"] = (
-                nota_debito.nota_debito_id if nota_debito else None
-            )
-
-        documentos_enriquecidos.append(documento_dict)
-
-    return documentos_enriquecidos
+def get_documentos_by_cliente_id(db: Session, cliente_id: int, limit: int = 10, offset: int = 0, cursor: str = None) -> List[DocumentoRow]:
+    registros = paginar(
+        _consultar_documentos(db, Documento.cliente_id == cliente_id),
+        ORDEN_DOCUMENTOS,
+        limit,
+        cursor,
+        offset,
+    )
+    return Pagina(
+        _construir_filas(db, registros, incluir_impuestos=True), registros.next_cursor
+    )
@@ -1,13 +1,16 @@
 # Función para manejar rollback manual
 from decimal import Decimal
 from sqlalchemy.orm import Session
-from sqlalchemy.sql import text
-import os
 
 from src.documento.factura.detalleFactura.detalleFacturaModel import DetalleFactura
 from src.documento.factura.facModel import Factura
 from src.documento.factura.iva.ivaModel import iva
 from src.documento.notas.notaModel import NotaCredito, NotaDebito
+from src.documento.documentoService.numeracionService import siguiente_id
+from src.documento.documentoService.impuestoService import (
+    calcular_impuestos,
+    lineas_de_detalles,
+)
 
 
 def rollback_manual(db: Session, factura_id: int):
@@ -43,99 +46,17 @@ def rollback_manual_nota_debito(db: Session, nota_debito_id: int):
 
 
 # Función para validar existencia de entidades
-def validar_existencia(db: Session, modelo, id, nombre_entidad):
-    entidad = db.query(modelo).filter(modelo.id == id).first()
+def validar_existencia(db: Session, modelo, id, nombre_entidad, *opciones):
+    # `opciones`: carga anticipada de relaciones (selectinload, joinedload)
+    entidad = db.query(modelo).options(*opciones).filter(modelo.id == id).first()
     if not entidad:
         raise ValueError(f"{nombre_entidad} con ID {id} no existe.")
     return entidad
 
 
-# Función para calcular totales e impuestos
+# Función para calcular totales e impuestos (ver impuestoService)
 def calcular_totales(detalles, aplica_igtf, precio_bcv):
-    subtotal_total_sin_descuento = 0
-    monto_exento = 0
-    monto_base_general = 0
-    monto_base_reducida = 0
-    monto_base_adicional = 0
-    descuento_total = 0
-    iva_general_monto = 0
-    iva_reducida_monto = 0
-    iva_adicional_monto = 0
-
-    # Revisar y ajustar la lógica de cálculo en calcular_totales
-    # Ajustar la lógica para calcular el IVA correctamente
-    for detalle in detalles:
-        if not (0 <= (detalle.descuento or 0) <= 1):
-            raise ValueError(
-                f"El descuento del producto con ID {detalle.producto_id} es inválido: {detalle.descuento}"
-            )
-
-        total_producto = Decimal(detalle.cantidad) * Decimal(detalle.precio_unitario)
-        # Calcular el subtotal del producto sin descuento
-        subtotal_total_sin_descuento += total_producto
-
-        # Calcular IVA sobre el total del producto sin descuento
-        if detalle.producto.exento:
-            monto_exento += total_producto
-        elif detalle.alicuota_iva == 16:
-            monto_base_general += total_producto  # Base sin descuento
-            iva_general_monto += round(total_producto * Decimal("0.16"), 4)
-        elif detalle.alicuota_iva == 8:
-            monto_base_reducida += total_producto  # Base sin descuento
-            iva_reducida_monto += round(total_producto * Decimal("0.08"), 4)
-        elif detalle.alicuota_iva == 31:
-            monto_base_adicional += total_producto  # Base sin descuento
-            iva_adicional_monto += round(total_producto * Decimal("0.31"), 4)
-
-        # Aplicar descuento al total del producto
-        descuento_producto = total_producto * Decimal(detalle.descuento or 0)
-        descuento_total += descuento_producto
-
-    # Calcular el monto total sumando las bases, IVA, restando descuentos y considerando exentos
-    monto_total = (
-        monto_base_general
-        + iva_general_monto
-        + monto_base_reducida
-        + iva_reducida_monto
-        + monto_base_adicional
-        + iva_adicional_monto
-        + monto_exento
-    )
-
-    # Calcular IGTF si aplica
-    monto_igtf = 0
-    if aplica_igtf and monto_total > 0:
-        monto_igtf = round(monto_total * Decimal("0.03"), 2)
-
-    return {
-        "subtotal_productos": round(float(max(subtotal_total_sin_descuento, 0)), 4),
-        "monto_base": round(
-            float(
-                max(monto_base_general + monto_base_reducida + monto_base_adicional, 0)
-            ),
-            4,
-        ),
-        "monto_exento": round(float(max(monto_exento, 0)), 4),
-        "monto_base_general": round(float(max(monto_base_general, 0)), 4),
-        "monto_base_reducida": round(float(max(monto_base_reducida, 0)), 4),
-        "monto_base_adicional": round(float(max(monto_base_adicional, 0)), 4),
-        "descuento_total": round(float(max(descuento_total, 0)), 4),
-        "iva_general": 16,  # Porcentaje de IVA general
-        "iva_reducida": 8,  # Porcentaje de IVA reducida
-        "iva_adicional": 31,  # Porcentaje de IVA adicional, Se cambio de 15% a 31%, ya que es la suma de iva general mas 15%.
-        "iva_general_monto": round(float(max(iva_general_monto, 0)), 4),
-        "iva_reducida_monto": round(float(max(iva_reducida_monto, 0)), 4),
-        "iva_adicional_monto": round(float(max(iva_adicional_monto, 0)), 4),
-        "igtf": 3,
-        "base_igtf": round(float(max(monto_total, 0)), 4),  # Base para calculo del igtf
-        "monto_igtf": round(float(max(monto_igtf, 0)), 4),
-        "monto_dolares": (
-            round(float(max((monto_total + monto_igtf) / precio_bcv, 0)), 4)
-            if precio_bcv
-            else 0
-        ),
-        "monto_total": round(float(max(monto_total + monto_igtf, 0)), 4),
-    }
+    return calcular_impuestos(lineas_de_detalles(detalles), aplica_igtf, precio_bcv)
 
 
 # Función para parsear factura
@@ -210,33 +131,13 @@ def parse_nota_debito(nota_debito: NotaDebito) -> dict:
     }
 
 
-# Agregar soporte para manejar IDs consecutivos con una variable de entorno
-# Ajustar para que el siguiente número consecutivo sea el siguiente al ID manual
-
-# Ajustar para que el ID manual solo se use una vez por reinicio
-
-# Variable auxiliar para controlar el uso del ID manual
-id_manual_usado = {
-    "documento": False,
-    "factura": False,
-    "nota_credito": False,
-    "nota_debito": False,
-}
+# Los IDs consecutivos se asignan desde la tabla contador_documento (ver numeracionService),
+# incluida la semilla manual MANUAL_*_ID.
 
 # Función para obtener el siguiente ID disponible en la tabla documento
 def obtener_siguiente_id_documento(db: Session):
-    global id_manual_usado
     try:
-        # Leer variable de entorno para ID manual
-        id_manual = os.getenv("MANUAL_DOCUMENT_ID")
-        if id_manual and id_manual.lower() != "false" and not id_manual_usado["documento"]:
-            id_manual_usado["documento"] = True  # Marcar como usado
-            return f"{int(id_manual) + 1:08d}"  # Formatear con 8 dígitos y sumar 1
-
-        # Consultar el último ID utilizado en la tabla documento usando text
-        ultimo_documento_id = db.execute(text("SELECT MAX(id) FROM documento")).scalar()
-        siguiente_id = (ultimo_documento_id + 1) if ultimo_documento_id else 1
-        return f"{siguiente_id:08d}"  # Formatear con 8 dígitos
+        return siguiente_id(db, "documento")
     except Exception as e:
         print(f"Error al obtener el siguiente ID de documento: {str(e)}")
         raise
@@ -244,19 +145,8 @@ def obtener_siguiente_id_documento(db: Session):
 
 # Función para obtener el siguiente ID disponible en la tabla factura
 def obtener_siguiente_id_factura(db: Session):
-    global id_manual_usado
     try:
-        # Leer variable de entorno para ID manual
-        id_manual = os.getenv("MANUAL_FACTURA_ID")
-        if id_manual and id_manual.lower() != "false" and not id_manual_usado["factura"]:
-            id_manual_usado["factura"] = True  # Marcar como usado
-            return f"{int(id_manual) + 1:08d}"  # Formatear con 8 dígitos y sumar 1
-
-        ultimo_factura_id = (
-            db.query(Factura.factura_id).order_by(Factura.factura_id.desc()).first()
-        )
-        siguiente_id = (ultimo_factura_id[0] + 1) if ultimo_factura_id else 1
-        return f"{siguiente_id:08d}"  # Formatear con 8 dígitos
+        return siguiente_id(db, "factura")
     except Exception as e:
         print(f"Error al obtener el siguiente ID de factura: {str(e)}")
         raise
@@ -264,21 +154,8 @@ def obtener_siguiente_id_factura(db: Session):
 
 # Función para obtener el siguiente ID disponible en la tabla nota_credito
 def obtener_siguiente_id_nota_credito(db: Session):
-    global id_manual_usado
     try:
-        # Leer variable de entorno para ID manual
-        id_manual = os.getenv("MANUAL_NOTA_CREDITO_ID")
-        if id_manual and id_manual.lower() != "false" and not id_manual_usado["nota_credito"]:
-            id_manual_usado["nota_credito"] = True  # Marcar como usado
-            return f"{int(id_manual) + 1:08d}"  # Formatear con 8 dígitos y sumar 1
-
-        ultimo_nota_credito_id = (
-            db.query(NotaCredito.nota_credito_id)
-            .order_by(NotaCredito.nota_credito_id.desc())
-            .first()
-        )
-        siguiente_id = (ultimo_nota_credito_id[0] + 1) if ultimo_nota_credito_id else 1
-        return f"{siguiente_id:08d}"  # Formatear con 8 dígitos
+        return siguiente_id(db, "nota_credito")
     except Exception as e:
         print(f"Error al obtener el siguiente ID de nota de crédito: {str(e)}")
         raise
@@ -286,21 +163,8 @@ def obtener_siguiente_id_nota_credito(db: Session):
 
 # Función para obtener el siguiente ID disponible en la tabla nota_debito
 def obtener_siguiente_id_nota_debito(db: Session):
-    global id_manual_usado
     try:
-        # Leer variable de entorno para ID manual
-        id_manual = os.getenv("MANUAL_NOTA_DEBITO_ID")
-        if id_manual and id_manual.lower() != "false" and not id_manual_usado["nota_debito"]:
-            id_manual_usado["nota_debito"] = True  # Marcar como usado
-            return f"{int(id_manual) + 1:08d}"  # Formatear con 8 dígitos y sumar 1
-
-        ultimo_nota_debito_id = (
-            db.query(NotaDebito.nota_debito_id)
-            .order_by(NotaDebito.nota_debito_id.desc())
-            .first()
-        )
-        siguiente_id = (ultimo_nota_debito_id[0] + 1) if ultimo_nota_debito_id else 1
-        return f"{siguiente_id:08d}"  # Formatear con 8 dígitos
+        return siguiente_id(db, "nota_debito")
     except Exception as e:
         print(f"Error al obtener el siguiente ID de nota de débito: {str(e)}")
         raise
@@ -314,8 +178,13 @@ def calcular_totales_nota(
     Calcula los totales e impuestos para notas de crédito o débito basados en las modificaciones.
     Si es una nota de débito, no se valida que el producto exista en los detalles de la factura,
     pero sí se valida que el producto exista en la tabla Producto.
+
+    Los productos se cargan en una sola consulta y los detalles de la factura se
+    indexan por producto_id, de modo que cada modificación se valida y acumula en
+    una sola pasada. En una nota de crédito, la cantidad acreditada de cada
+    producto no puede superar la cantidad facturada.
     """
-    from src.producto.prodModel import Producto  # Importar el modelo Producto
+    from src.producto.productoService import resolver_productos
 
     monto_exento = 0
     monto_base_general = 0
@@ -334,28 +203,40 @@ def calcular_totales_nota(
     subtotal_no_exento = 0  # Subtotal de productos no exentos
     subtotal_exento = 0  # Subtotal de productos exentos
 
+    # Validar en una sola consulta que todos los productos existan en la tabla Producto
+    productos = resolver_productos(
+        db, (mod_detalle["id_producto"] for mod_detalle in modif_detalles)
+    )
+
+    # Cantidad facturada por producto (un producto puede ocupar varias líneas)
+    cantidad_facturada = {}
+    if not es_nota_debito:
+        for detalle in detalles_factura:
+            cantidad_facturada[detalle.producto_id] = cantidad_facturada.get(
+                detalle.producto_id, 0
+            ) + Decimal(detalle.cantidad)
+    cantidad_acreditada = {}
+
     for mod_detalle in modif_detalles:
-        # Validar que el producto exista en la tabla Producto
-        producto = validar_existencia(
-            db, Producto, mod_detalle["id_producto"], "Producto"
-        )
+        producto_id = mod_detalle["id_producto"]
+        producto = productos[producto_id]
+        cantidad = Decimal(mod_detalle.get("cantidad", 0))
 
         if not es_nota_debito:
             # Validar que el producto exista en los detalles de la factura
-            detalle_existente = next(
-                (
-                    d
-                    for d in detalles_factura
-                    if d.producto_id == mod_detalle["id_producto"]
-                ),
-                None,
-            )
-            if not detalle_existente:
+            facturada = cantidad_facturada.get(producto_id)
+            if facturada is None:
                 raise ValueError(
-                    f"Producto con ID {mod_detalle['id_producto']} no existe en los detalles de la factura."
+                    f"Producto con ID {producto_id} no existe en los detalles de la factura."
                 )
+            acreditada = cantidad_acreditada.get(producto_id, 0) + cantidad
+            if acreditada > facturada:
+                raise ValueError(
+                    f"La cantidad a acreditar del producto con ID {producto_id} ({acreditada}) "
+                    f"supera la cantidad facturada ({facturada})."
+                )
+            cantidad_acreditada[producto_id] = acreditada
 
-        cantidad = Decimal(mod_detalle.get("cantidad", 0))
         precio_unitario = Decimal(mod_detalle.get("precio_unitario", 0))
         descuento = Decimal(mod_detalle.get("descuento", 0))
 
@@ -409,7 +290,7 @@ def calcular_totales_nota(
 
         modificaciones_detalles.append(
             {
-                "producto_id": mod_detalle["id_producto"],
+                "producto_id": producto_id,
                 "descripcion": producto.descripcion,
                 "cantidad": cantidad,
                 "precio_unitario": precio_unitario,
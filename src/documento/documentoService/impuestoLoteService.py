@@ -0,0 +1,306 @@
+"""
+impuestoLoteService.py
+Cálculo de totales e impuestos de muchas facturas a la vez con NumPy.
+
+Recibe las líneas de todas las facturas en columnas (índice de factura,
+cantidad, precio unitario, descuento, alícuota y exento) y obtiene los totales
+de cada factura (subtotal, exento, descuento, bases e IVA por alícuota, IGTF y
+monto en dólares) con reducciones agrupadas sobre enteros int64 en unidades de
+1e-4, sin un bucle de Python por línea. Cada diccionario es idéntico al que
+devuelve calcular_totales para esa factura: mismo redondeo, mismas claves.
+
+Las columnas pueden ser listas de Decimal (como las devuelve SQLAlchemy) o
+arreglos numéricos; un float se acepta si es el float más cercano a un valor
+con a lo sumo 4 decimales. Un valor con más decimales o un descuento fuera de
+[0, 1] lanza ValueError, igual que calcular_totales. Las facturas cuyos montos
+podrían desbordar int64 se calculan con el motor por factura (impuestoService).
+"""
+
+from fractions import Fraction
+
+import numpy as np
+
+from src.documento.documentoService.impuestoService import (
+    ESCALA,
+    GRUPOS_IVA,
+    IGTF,
+    TASAS_IVA,
+    _INDICE_GRUPO,
+    _TASA_GRUPO,
+    _a_float,
+    _a_unidades,
+    armar_totales,
+    calcular_impuestos,
+    monto_dolares,
+)
+
+# Cota de los acumuladores int64 (el descuento se acumula en 1e-8); por encima la
+# factura se calcula por factura. Por debajo, los montos en 1e-4 son menores que
+# 2**52 y la división en float64 da el mismo float que round(monto / ESCALA, 4)
+LIMITE_INT64 = 2**62
+
+# Alícuota (en 1e-4 puntos porcentuales) de cada grupo, indexada por grupo
+_TASAS = np.array([_TASA_GRUPO[grupo] for grupo in GRUPOS_IVA], dtype=np.int64)
+# Alícuota de referencia de cada grupo para el cálculo por factura
+_ALICUOTA_GRUPO = {_INDICE_GRUPO[grupo]: tasa for tasa, grupo in TASAS_IVA.items()}
+_MAX_INT64 = np.iinfo(np.int64).max
+
+# Claves del diccionario de totales, en el orden de calcular_totales
+_CLAVES = list(
+    armar_totales(0, 0, 0, [0] * len(GRUPOS_IVA), [0] * len(GRUPOS_IVA), False, None)
+)
+
+
+# region Conversión de columnas
+def _fuera_de_rango():
+    return ValueError("Un valor de la factura está fuera del rango admitido.")
+
+
+def _a_columna(valores, escala: int = ESCALA):
+    """Columna de enteros int64 en unidades de 1/escala, sin pérdida."""
+    arreglo = np.asarray(valores)
+    if arreglo.dtype.kind in "biu":
+        if arreglo.size and np.abs(arreglo).max() > _MAX_INT64 // escala:
+            raise _fuera_de_rango()
+        return arreglo.astype(np.int64) * escala
+    if arreglo.dtype.kind == "f":
+        unidades = np.rint(arreglo * escala)
+        inexactos = np.flatnonzero(unidades / escala != arreglo)
+        if len(inexactos):
+            raise ValueError(
+                f"El valor {arreglo[inexactos[0]]} tiene más decimales de los admitidos."
+            )
+        if unidades.size and np.abs(unidades).max() >= 2**63:
+            raise _fuera_de_rango()
+        return unidades.astype(np.int64)
+    # Decimal: producto y conversión elemento a elemento en el bucle de NumPy
+    # (None cuenta como 0); si algún valor no es exacto se convierte uno a uno
+    # como en calcular_totales, que da el mismo resultado o el mismo error
+    try:
+        try:
+            escalados = arreglo * escala
+        except TypeError:
+            escalados = np.where(np.equal(arreglo, None), 0, arreglo) * escala
+        unidades = escalados.astype(np.int64)
+        if not (escalados != unidades.astype(object)).any():
+            return unidades
+    except (TypeError, ValueError, OverflowError, ArithmeticError):
+        pass
+    try:
+        return np.array([_a_unidades(valor, escala) for valor in valores], dtype=np.int64)
+    except OverflowError:
+        raise _fuera_de_rango()
+
+
+def _a_grupos(alicuotas):
+    """Índice de grupo de IVA de cada línea (-1 si la alícuota no es reconocida)."""
+    try:
+        unidades = _a_columna(alicuotas)
+    except ValueError:
+        # Alícuotas con más decimales o fuera de rango: no coinciden con ningún grupo
+        return np.array(
+            [_INDICE_GRUPO.get(TASAS_IVA.get(alicuota), -1) for alicuota in alicuotas],
+            dtype=np.int64,
+        )
+    grupos = np.full(len(unidades), -1, dtype=np.int64)
+    for tasa, grupo in TASAS_IVA.items():
+        grupos[unidades == _a_unidades(tasa)] = _INDICE_GRUPO[grupo]
+    return grupos
+
+
+def _validar_descuentos(fracciones, descuentos, producto_ids):
+    invalidos = np.flatnonzero((fracciones < 0) | (fracciones > ESCALA))
+    if len(invalidos):
+        i = invalidos[0]
+        producto_id = producto_ids[i] if producto_ids is not None else None
+        raise ValueError(
+            f"El descuento del producto con ID {producto_id} es inválido: {descuentos[i]}"
+        )
+
+
+# endregion
+
+
+# region Cálculo
+def _dividir_redondeando_lote(numerador, divisor: int):
+    """Versión vectorizada de _dividir_redondeando (ROUND_HALF_EVEN)."""
+    cociente, resto = np.divmod(numerador, divisor)
+    doble = 2 * resto
+    return cociente + ((doble > divisor) | ((doble == divisor) & (cociente % 2 == 1)))
+
+
+def _sumar(indices, valores, n):
+    """Suma agrupada exacta en int64 (np.bincount solo acumula en float)."""
+    suma = np.zeros(n, dtype=np.int64)
+    np.add.at(suma, indices, valores)
+    return suma
+
+
+def _a_floats(unidades):
+    # Igual que _a_float para montos menores que 2**52
+    return (np.maximum(unidades, 0) / ESCALA).tolist()
+
+
+def _lineas_de_factura(indices, cantidades, precios, descuentos, grupos, exentos):
+    """Líneas de una factura como entrada de calcular_impuestos (valores exactos)."""
+    for i in indices.tolist():
+        yield (
+            None,
+            int(cantidades[i]),
+            Fraction(int(precios[i]), ESCALA),
+            Fraction(int(descuentos[i]), ESCALA),
+            _ALICUOTA_GRUPO.get(int(grupos[i])),
+            bool(exentos[i]),
+        )
+
+
+def _calcular_lote(
+    facturas, cantidades, precios, descuentos, grupos, exentos, aplica_igtf, precios_bcv
+):
+    """Totales de cada factura a partir de columnas ya convertidas a unidades enteras."""
+    n_facturas = len(aplica_igtf)
+    if len(precios_bcv) != n_facturas:
+        raise ValueError("aplica_igtf y precios_bcv deben tener un valor por factura.")
+    if len(facturas) and (facturas.min() < 0 or facturas.max() >= n_facturas):
+        raise ValueError("El índice de factura de una línea está fuera de rango.")
+
+    # Cota del monto de cada factura (estimada en float, con margen)
+    suma_aprox = np.bincount(
+        facturas,
+        weights=np.abs(cantidades.astype(np.float64) * precios.astype(np.float64)),
+        minlength=n_facturas,
+    )
+    grandes = suma_aprox * ESCALA >= LIMITE_INT64
+    if grandes.any():
+        normales = ~grandes[facturas]
+        lineas_grandes = (cantidades, precios)
+        cantidades = np.where(normales, cantidades, 0)
+        precios = np.where(normales, precios, 0)
+
+    n_grupos = len(GRUPOS_IVA)
+    totales = cantidades * precios
+    subtotal = _sumar(facturas, totales, n_facturas)
+    exento = _sumar(facturas[exentos], totales[exentos], n_facturas)
+    # Descuento en unidades de 1e-8, igual que en calcular_impuestos
+    descuento = _sumar(facturas, totales * descuentos, n_facturas)
+
+    gravadas = ~exentos & (grupos >= 0)
+    celdas = facturas[gravadas] * n_grupos + grupos[gravadas]
+    totales_gravados = totales[gravadas]
+    iva_lineas = _dividir_redondeando_lote(
+        totales_gravados * _TASAS[grupos[gravadas]], 10_000
+    )
+    bases = _sumar(celdas, totales_gravados, n_facturas * n_grupos).reshape(-1, n_grupos)
+    ivas = _sumar(celdas, iva_lineas, n_facturas * n_grupos).reshape(-1, n_grupos)
+
+    base = bases.sum(axis=1)
+    monto_total = base + ivas.sum(axis=1) + exento
+    # round(monto_total * 0.03, 2): se redondea a céntimos y se vuelve a 1e-4
+    con_igtf = np.asarray(aplica_igtf, dtype=bool) & (monto_total > 0)
+    monto_igtf = np.where(
+        con_igtf, _dividir_redondeando_lote(monto_total * IGTF, 10_000) * 100, 0
+    )
+    monto_final = monto_total + monto_igtf
+
+    columnas = [_a_floats(subtotal), _a_floats(base), _a_floats(exento)]
+    columnas += [_a_floats(bases[:, i]) for i in range(n_grupos)]
+    columnas.append([_a_float(valor, ESCALA * ESCALA) for valor in descuento.tolist()])
+    columnas += [[tasa] * n_facturas for tasa in TASAS_IVA]
+    columnas += [_a_floats(ivas[:, i]) for i in range(n_grupos)]
+    columnas += [
+        [IGTF] * n_facturas,
+        _a_floats(monto_total),
+        _a_floats(monto_igtf),
+        [
+            monto_dolares(monto, precio_bcv)
+            for monto, precio_bcv in zip(monto_final.tolist(), precios_bcv)
+        ],
+        _a_floats(monto_final),
+    ]
+    resultados = [dict(zip(_CLAVES, fila)) for fila in zip(*columnas)]
+
+    # Montos que desbordarían int64: se calculan por factura
+    for i in np.flatnonzero(grandes).tolist():
+        resultados[i] = calcular_impuestos(
+            _lineas_de_factura(
+                np.flatnonzero(facturas == i), *lineas_grandes, descuentos, grupos, exentos
+            ),
+            aplica_igtf[i],
+            precios_bcv[i],
+        )
+    return resultados
+
+
+def calcular_impuestos_lote(
+    facturas,
+    cantidades,
+    precios_unitarios,
+    descuentos,
+    alicuotas_iva,
+    exentos,
+    aplica_igtf,
+    precios_bcv,
+    producto_ids=None,
+) -> list:
+    """
+    Calcula los totales de varias facturas a partir de sus líneas en columnas.
+
+    Args:
+        facturas: Índice (0..n-1) de la factura de cada línea.
+        cantidades, precios_unitarios, descuentos, alicuotas_iva, exentos:
+            Columnas de las líneas, con los mismos valores que recibe calcular_totales.
+        aplica_igtf: Por factura, si se cobra el IGTF.
+        precios_bcv: Por factura, la tasa de cambio (Decimal).
+        producto_ids: Opcional, solo para el mensaje de un descuento inválido.
+
+    Returns:
+        list: Un diccionario por factura, idéntico al de calcular_totales.
+    """
+    fracciones = _a_columna(descuentos)
+    _validar_descuentos(fracciones, descuentos, producto_ids)
+    return _calcular_lote(
+        np.asarray(facturas, dtype=np.int64),
+        _a_columna(cantidades, 1),
+        _a_columna(precios_unitarios),
+        fracciones,
+        _a_grupos(alicuotas_iva),
+        np.asarray(exentos, dtype=bool),
+        aplica_igtf,
+        precios_bcv,
+    )
+
+
+# endregion
+
+
+def calcular_totales_pedidos(pedidos, aplica_igtf) -> list:
+    """
+    Totales de varios pedidos (con detalles y productos cargados) en un solo cálculo.
+
+    Args:
+        pedidos: Pedidos a facturar; la tasa de cambio es la de cada pedido.
+        aplica_igtf: Por pedido, si se cobra el IGTF.
+    """
+    columnas = {
+        "facturas": [],
+        "cantidades": [],
+        "precios_unitarios": [],
+        "descuentos": [],
+        "alicuotas_iva": [],
+        "exentos": [],
+        "producto_ids": [],
+    }
+    for indice, pedido in enumerate(pedidos):
+        for detalle in pedido.detalles:
+            columnas["facturas"].append(indice)
+            columnas["cantidades"].append(detalle.cantidad)
+            columnas["precios_unitarios"].append(detalle.precio_unitario)
+            columnas["descuentos"].append(detalle.descuento)
+            columnas["alicuotas_iva"].append(detalle.alicuota_iva)
+            columnas["exentos"].append(bool(detalle.producto.exento))
+            columnas["producto_ids"].append(detalle.producto_id)
+    return calcular_impuestos_lote(
+        aplica_igtf=aplica_igtf,
+        precios_bcv=[pedido.tasa_cambio for pedido in pedidos],
+        **columnas,
+    )
@@ -0,0 +1,186 @@
+"""
+impuestoService.py
+Motor de cálculo de totales e impuestos de facturas en aritmética entera.
+
+Los montos se acumulan como enteros en unidades de 1e-4 (la precisión con la
+que se guardan los totales) en una sola pasada por las líneas, sin crear
+objetos Decimal por línea ni ramas por alícuota: la alícuota de cada línea se
+busca en TASAS_IVA. El resultado es idéntico al cálculo anterior con Decimal:
+mismo redondeo (ROUND_HALF_EVEN, el que usa round() en Decimal), mismas reglas
+y el mismo diccionario de salida que consume la tabla iva.
+
+Requisito de entrada: cantidad entera y precio unitario, descuento y alícuota
+con a lo sumo 4 decimales, como los guardan las columnas Numeric de pedidos y
+productos. Un valor con más decimales lanza ValueError en lugar de redondearse
+en silencio.
+"""
+
+from decimal import Decimal
+
+# Unidades por bolívar en los acumuladores (1e-4)
+ESCALA = 10_000
+
+# Alícuotas de IVA reconocidas: alícuota (%) -> grupo de la tabla iva.
+# Una línea no exenta con otra alícuota no suma a ninguna base (igual que antes).
+TASAS_IVA = {
+    16: "general",
+    8: "reducida",
+    31: "adicional",  # Se cambió de 15% a 31%, ya que es la suma del IVA general más 15%
+}
+GRUPOS_IVA = tuple(TASAS_IVA.values())
+_INDICE_GRUPO = {grupo: i for i, grupo in enumerate(GRUPOS_IVA)}
+IGTF = 3  # Porcentaje del IGTF sobre el monto total
+
+
+def _a_unidades(valor, escala: int = ESCALA) -> int:
+    """Convierte un valor numérico a un entero en unidades de 1/escala, sin pérdida."""
+    if not valor:
+        return 0
+    numerador, denominador = valor.as_integer_ratio()
+    unidades, resto = divmod(numerador * escala, denominador)
+    if resto:
+        raise ValueError(f"El valor {valor} tiene más decimales de los admitidos.")
+    return unidades
+
+
+def _dividir_redondeando(numerador: int, divisor: int) -> int:
+    """División entera con redondeo al par más cercano (ROUND_HALF_EVEN)."""
+    cociente, resto = divmod(numerador, divisor)
+    doble = 2 * resto
+    if doble > divisor or (doble == divisor and cociente % 2):
+        cociente += 1
+    return cociente
+
+
+def _a_float(unidades: int, escala: int = ESCALA) -> float:
+    # int / int da el float correctamente redondeado, igual que float(Decimal)
+    return round(max(unidades, 0) / escala, 4)
+
+
+def _tasa_por_grupo() -> dict:
+    return {grupo: _a_unidades(tasa, 100) for tasa, grupo in TASAS_IVA.items()}
+
+
+# Alícuota de cada grupo en centésimas de punto porcentual (16% -> 1600)
+_TASA_GRUPO = _tasa_por_grupo()
+
+
+def _preparar_linea(precio_unitario, descuento, alicuota_iva, exento, producto_id):
+    """Convierte una combinación de precio, descuento y alícuota a enteros (una vez por factura)."""
+    if not (0 <= (descuento or 0) <= 1):
+        raise ValueError(
+            f"El descuento del producto con ID {producto_id} es inválido: {descuento}"
+        )
+    grupo = None if exento else TASAS_IVA.get(alicuota_iva)
+    if grupo is None:
+        return _a_unidades(precio_unitario), _a_unidades(descuento), -1, 0
+    return (
+        _a_unidades(precio_unitario),
+        _a_unidades(descuento),
+        _INDICE_GRUPO[grupo],
+        _TASA_GRUPO[grupo],
+    )
+
+
+def calcular_impuestos(lineas, aplica_igtf, precio_bcv) -> dict:
+    """
+    Calcula bases, IVA por alícuota, IGTF y monto en dólares de una factura.
+
+    Args:
+        lineas: Iterable de tuplas (producto_id, cantidad, precio_unitario,
+            descuento, alicuota_iva, exento). El descuento es una fracción entre 0 y 1.
+        aplica_igtf: Si se cobra el IGTF sobre el monto total.
+        precio_bcv: Tasa de cambio (Decimal) para el monto en dólares.
+    """
+    subtotal = 0
+    exento = 0
+    descuento = 0  # En unidades de 1e-8: total (1e-4) por descuento (1e-4), sin redondeo
+    bases = [0] * len(GRUPOS_IVA)
+    ivas = [0] * len(GRUPOS_IVA)
+    # Las líneas de un mismo producto comparten precio, descuento y alícuota;
+    # cada combinación se valida y se convierte a enteros una sola vez
+    preparadas = {}
+
+    for producto_id, cantidad, precio_unitario, descuento_linea, alicuota_iva, es_exento in lineas:
+        clave = (precio_unitario, descuento_linea, alicuota_iva, es_exento)
+        linea = preparadas.get(clave)
+        if linea is None:
+            linea = preparadas[clave] = _preparar_linea(
+                precio_unitario, descuento_linea, alicuota_iva, es_exento, producto_id
+            )
+        precio, fraccion, grupo, tasa = linea
+        if type(cantidad) is not int:
+            cantidad = _a_unidades(cantidad, 1)
+
+        total = cantidad * precio
+        subtotal += total
+        if es_exento:
+            exento += total
+        elif grupo >= 0:
+            bases[grupo] += total
+            iva, resto = divmod(total * tasa, 10_000)
+            if resto:
+                iva = _dividir_redondeando(total * tasa, 10_000)
+            ivas[grupo] += iva
+        if fraccion:
+            descuento += total * fraccion
+
+    return armar_totales(subtotal, exento, descuento, bases, ivas, aplica_igtf, precio_bcv)
+
+
+def monto_dolares(unidades: int, precio_bcv):
+    """Monto en dólares de un total en unidades de 1e-4."""
+    if not precio_bcv:
+        return 0
+    # Única operación en Decimal: la división por la tasa, con la misma precisión que antes
+    return round(float(max(Decimal(unidades).scaleb(-4) / precio_bcv, 0)), 4)
+
+
+def armar_totales(subtotal, exento, descuento, bases, ivas, aplica_igtf, precio_bcv) -> dict:
+    """
+    Diccionario de totales de una factura a partir de sus acumuladores enteros
+    (1e-4; el descuento en 1e-8). Lo comparten el cálculo por factura y el de lotes.
+    """
+    base = sum(bases)
+    monto_total = base + sum(ivas) + exento
+
+    monto_igtf = 0
+    if aplica_igtf and monto_total > 0:
+        # round(monto_total * 0.03, 2): se redondea a céntimos y se vuelve a 1e-4
+        monto_igtf = _dividir_redondeando(monto_total * IGTF, 10_000) * 100
+
+    totales = {
+        "subtotal_productos": _a_float(subtotal),
+        "monto_base": _a_float(base),
+        "monto_exento": _a_float(exento),
+    }
+    for i, grupo in enumerate(GRUPOS_IVA):
+        totales[f"monto_base_{grupo}"] = _a_float(bases[i])
+    totales["descuento_total"] = _a_float(descuento, ESCALA * ESCALA)
+    for tasa, grupo in TASAS_IVA.items():
+        totales[f"iva_{grupo}"] = tasa
+    for i, grupo in enumerate(GRUPOS_IVA):
+        totales[f"iva_{grupo}_monto"] = _a_float(ivas[i])
+    totales.update(
+        {
+            "igtf": IGTF,
+            "base_igtf": _a_float(monto_total),
+            "monto_igtf": _a_float(monto_igtf),
+            "monto_dolares": monto_dolares(monto_total + monto_igtf, precio_bcv),
+            "monto_total": _a_float(monto_total + monto_igtf),
+        }
+    )
+    return totales
+
+
+def lineas_de_detalles(detalles):
+    """Tuplas de entrada de calcular_impuestos a partir de DetallePedido (con su producto)."""
+    for detalle in detalles:
+        yield (
+            detalle.producto_id,
+            detalle.cantidad,
+            detalle.precio_unitario,
+            detalle.descuento,
+            detalle.alicuota_iva,
+            detalle.producto.exento,
+        )
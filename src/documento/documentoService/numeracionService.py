@@ -0,0 +1,158 @@
+"""
+numeracionService.py
+Asignación de números consecutivos para documentos, facturas y notas.
+
+Cada numeración tiene una fila en `contador_documento` que se incrementa con un
+UPDATE dentro de la transacción del llamador. El UPDATE bloquea la fila hasta
+el commit, así que dos solicitudes concurrentes nunca obtienen el mismo número,
+y si la transacción se revierte el número vuelve a quedar libre (sin huecos).
+Funciona igual en Postgres y en SQLite.
+
+La fila se crea a partir del MAX de la tabla correspondiente (al arrancar, con
+`sembrar_contadores` desde src.utils.esquema, o al pedir el primer número), de
+modo que una base existente continúa su numeración.
+
+Environment Variables:
+- MANUAL_DOCUMENT_ID, MANUAL_FACTURA_ID, MANUAL_NOTA_CREDITO_ID, MANUAL_NOTA_DEBITO_ID:
+  Semilla manual; el siguiente número asignado será semilla + 1. Se aplica una
+  sola vez (queda registrada en el contador), sin importar la cantidad de workers.
+- NUMERACION_BLOQUE: Si es mayor que 1, cada proceso reserva bloques de ese
+  tamaño en una transacción propia y los entrega desde memoria. Reduce la
+  contención bajo carga alta a cambio de huecos si el proceso se detiene con
+  números sin usar y de que el orden entre workers no sea estrictamente creciente.
+"""
+
+import os
+import threading
+
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from src.documento.contadorModel import ContadorDocumento
+from src.documento.docModel import Documento
+from src.documento.factura.facModel import Factura
+from src.documento.notas.notaModel import NotaCredito, NotaDebito
+
+NUMERACION_BLOQUE = int(os.getenv("NUMERACION_BLOQUE", "1"))
+
+# Columna de la que se toma el valor inicial y variable de la semilla manual
+NUMERACIONES = {
+    "documento": (Documento.id, "MANUAL_DOCUMENT_ID"),
+    "factura": (Factura.factura_id, "MANUAL_FACTURA_ID"),
+    "nota_credito": (NotaCredito.nota_credito_id, "MANUAL_NOTA_CREDITO_ID"),
+    "nota_debito": (NotaDebito.nota_debito_id, "MANUAL_NOTA_DEBITO_ID"),
+}
+
+# Bloques reservados por este proceso: {nombre: [siguiente, limite]}
+_bloques = {}
+_bloques_lock = threading.Lock()
+
+
+def _semilla_manual(variable: str):
+    valor = os.getenv(variable)
+    if not valor or valor.lower() == "false":
+        return None
+    return int(valor)
+
+
+def _crear_contador(db: Session, nombre: str):
+    """Crea la fila del contador a partir del MAX actual, si todavía no existe."""
+    columna, _ = NUMERACIONES[nombre]
+    maximo = db.query(func.max(columna)).scalar() or 0
+    dialecto = db.get_bind().dialect.name
+    if dialecto == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as insert_dialecto
+    elif dialecto == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as insert_dialecto
+    else:
+        insert_dialecto = None
+
+    if insert_dialecto is not None:
+        stmt = (
+            insert_dialecto(ContadorDocumento)
+            .values(nombre=nombre, ultimo_valor=maximo)
+            .on_conflict_do_nothing(index_elements=["nombre"])
+        )
+    else:
+        stmt = insert(ContadorDocumento).values(nombre=nombre, ultimo_valor=maximo)
+    db.execute(stmt)
+
+
+def sembrar_contadores(db: Session):
+    """Crea las filas de contador que falten a partir del MAX actual de cada tabla."""
+    for nombre in NUMERACIONES:
+        _crear_contador(db, nombre)
+
+
+def _incrementar(db: Session, nombre: str, cantidad: int) -> int:
+    """Incrementa el contador en la transacción de `db` y devuelve el primer número reservado."""
+    if nombre not in NUMERACIONES:
+        raise ValueError(f"Numeración desconocida: {nombre}")
+
+    stmt = (
+        update(ContadorDocumento)
+        .where(ContadorDocumento.nombre == nombre)
+        .values(ultimo_valor=ContadorDocumento.ultimo_valor + cantidad)
+    )
+    if db.execute(stmt).rowcount == 0:
+        _crear_contador(db, nombre)
+        db.execute(stmt)
+
+    contador = (
+        db.query(ContadorDocumento.ultimo_valor, ContadorDocumento.semilla_manual)
+        .filter(ContadorDocumento.nombre == nombre)
+        .one()
+    )
+    ultimo_valor = contador.ultimo_valor
+
+    # Aplicar la semilla manual una sola vez; la fila ya está bloqueada por el UPDATE
+    semilla = _semilla_manual(NUMERACIONES[nombre][1])
+    if semilla is not None and semilla != contador.semilla_manual:
+        anterior = ultimo_valor - cantidad
+        if semilla < anterior:
+            print(
+                f"Semilla manual {semilla} para {nombre} es menor que el último número asignado "
+                f"({anterior}); se ignora para no duplicar números."
+            )
+            valores = {"semilla_manual": semilla}
+        else:
+            ultimo_valor = semilla + cantidad
+            valores = {"semilla_manual": semilla, "ultimo_valor": ultimo_valor}
+        db.execute(
+            update(ContadorDocumento)
+            .where(ContadorDocumento.nombre == nombre)
+            .values(**valores)
+        )
+
+    return ultimo_valor - cantidad + 1
+
+
+def _desde_bloque(nombre: str) -> int:
+    """Entrega el siguiente número del bloque del proceso, reservando uno nuevo si se agotó."""
+    with _bloques_lock:
+        bloque = _bloques.get(nombre)
+        if bloque is None or bloque[0] >= bloque[1]:
+            with SessionLocal() as db_bloque, db_bloque.begin():
+                primero = _incrementar(db_bloque, nombre, NUMERACION_BLOQUE)
+            bloque = _bloques[nombre] = [primero, primero + NUMERACION_BLOQUE]
+        siguiente = bloque[0]
+        bloque[0] += 1
+        return siguiente
+
+
+def reservar_ids(db: Session, nombre: str, cantidad: int = 1) -> int:
+    """
+    Reserva `cantidad` números consecutivos de la numeración `nombre` y devuelve
+    el primero. Debe llamarse dentro de la transacción que usará los números.
+    """
+    if cantidad < 1:
+        raise ValueError("La cantidad de números a reservar debe ser mayor que cero.")
+    if NUMERACION_BLOQUE > 1 and cantidad == 1:
+        return _desde_bloque(nombre)
+    return _incrementar(db, nombre, cantidad)
+
+
+def siguiente_id(db: Session, nombre: str) -> str:
+    """Siguiente número de la numeración, formateado con 8 dígitos."""
+    return f"{reservar_ids(db, nombre):08d}"
@@ -0,0 +1,271 @@
+"""
+smartClient.py
+Cliente HTTP para la API de imprenta digital SMART.
+
+Características:
+- Pool de conexiones httpx compartido (keep-alive).
+- Timeouts de conexión y lectura configurables.
+- Reintentos con backoff exponencial y jitter ante errores de red, 429 y 5xx. Son
+  seguros porque SMART identifica cada documento por su `numerointerno`.
+- Circuit breaker: tras SMART_CB_THRESHOLD fallos consecutivos se rechazan las
+  llamadas durante SMART_CB_COOLDOWN segundos sin tocar la red.
+- Métricas de latencia por llamada.
+- Entrada síncrona (`enviar`) y asíncrona (`enviar_async`, que usa el threadpool).
+
+Environment Variables:
+- SMART_API_TOKEN: Token para la autenticación en SMART.
+- SMART_CONNECT_TIMEOUT, SMART_READ_TIMEOUT: Timeouts en segundos.
+- SMART_MAX_RETRIES, SMART_BACKOFF_BASE: Reintentos y backoff base en segundos.
+- SMART_CB_THRESHOLD, SMART_CB_COOLDOWN: Configuración del circuit breaker.
+- SMART_POOL_SIZE: Conexiones máximas del pool.
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import httpx
+from starlette.concurrency import run_in_threadpool
+
+from src.loggers.loggerService import get_logger
+
+SMART_CONNECT_TIMEOUT = float(os.getenv("SMART_CONNECT_TIMEOUT", "5"))
+SMART_READ_TIMEOUT = float(os.getenv("SMART_READ_TIMEOUT", "30"))
+SMART_MAX_RETRIES = int(os.getenv("SMART_MAX_RETRIES", "2"))
+SMART_BACKOFF_BASE = float(os.getenv("SMART_BACKOFF_BASE", "0.5"))
+SMART_CB_THRESHOLD = int(os.getenv("SMART_CB_THRESHOLD", "5"))
+SMART_CB_COOLDOWN = float(os.getenv("SMART_CB_COOLDOWN", "30"))
+SMART_POOL_SIZE = int(os.getenv("SMART_POOL_SIZE", "10"))
+
+# Códigos HTTP que se consideran transitorios y se reintentan
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+logger = get_logger("smart_client")
+
+
+class CircuitBreaker:
+    """Circuit breaker simple: cerrado -> abierto -> semiabierto (una llamada de prueba)."""
+
+    def __init__(self, threshold: int = SMART_CB_THRESHOLD, cooldown: float = SMART_CB_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+
+
+class SmartMetrics:
+    """Métricas de latencia y resultado de las llamadas a SMART."""
+
+    def __init__(self, window: int = 500):
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.counters = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "retries": 0,
+            "circuit_rejections": 0,
+        }
+        self.max_ms = 0.0
+        self.total_ms = 0.0
+
+    def record(self, elapsed_ms: float, ok: bool, attempts: int):
+        with self._lock:
+            self.counters["calls"] += 1
+            self.counters["successes" if ok else "failures"] += 1
+            self.counters["retries"] += max(attempts - 1, 0)
+            self._latencies.append(elapsed_ms)
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def record_rejection(self):
+        with self._lock:
+            self.counters["circuit_rejections"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            calls = self.counters["calls"]
+
+            def percentile(p):
+                if not latencies:
+                    return None
+                return round(latencies[min(int(len(latencies) * p), len(latencies) - 1)], 2)
+
+            return {
+                **self.counters,
+                "avg_ms": round(self.total_ms / calls, 2) if calls else None,
+                "p50_ms": percentile(0.50),
+                "p95_ms": percentile(0.95),
+                "max_ms": round(self.max_ms, 2),
+            }
+
+
+class SmartClient:
+    """Cliente compartido para enviar documentos a SMART (síncrono y asíncrono)."""
+
+    def __init__(
+        self,
+        connect_timeout: float = SMART_CONNECT_TIMEOUT,
+        read_timeout: float = SMART_READ_TIMEOUT,
+        max_retries: int = SMART_MAX_RETRIES,
+        backoff_base: float = SMART_BACKOFF_BASE,
+        pool_size: int = SMART_POOL_SIZE,
+    ):
+        self.timeout = httpx.Timeout(
+            connect=connect_timeout, read=read_timeout, write=read_timeout, pool=connect_timeout
+        )
+        self.limits = httpx.Limits(
+            max_connections=pool_size, max_keepalive_connections=pool_size
+        )
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.breaker = CircuitBreaker()
+        self.metrics = SmartMetrics()
+        self._client = None
+        self._lock = threading.Lock()
+
+    # region Clientes httpx
+    def _get_client(self) -> httpx.Client:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = httpx.Client(timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    # endregion
+
+    @staticmethod
+    def _headers() -> dict:
+        return {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {os.getenv('SMART_API_TOKEN')}",
+        }
+
+    def _backoff(self, attempt: int) -> float:
+        # Backoff exponencial con "full jitter"
+        return random.uniform(0, self.backoff_base * (2 ** attempt))
+
+    @staticmethod
+    def _error(message: str) -> dict:
+        return {"success": False, "error": {"message": message}}
+
+    def _should_retry(self, exc: Exception = None, response: httpx.Response = None) -> bool:
+        if exc is not None:
+            return isinstance(exc, (httpx.TransportError, httpx.TimeoutException))
+        return response is not None and response.status_code in RETRYABLE_STATUS
+
+    def enviar(self, json_data: dict, url: str, document_id: int) -> dict:
+        """Envía un documento a SMART y devuelve la respuesta JSON o un dict de error."""
+        if not self.breaker.allow():
+            self.metrics.record_rejection()
+            logger.error(f"Circuito SMART abierto, documento {document_id} no enviado.")
+            return self._error("El servicio de imprenta no está disponible (circuito abierto).")
+
+        logger.info(f"Enviando documento {document_id} a la URL: {url}")
+        start = time.perf_counter()
+        attempt = 0
+        try:
+            while True:
+                attempt += 1
+                exc, response = None, None
+                try:
+                    response = self._get_client().post(url, json=json_data, headers=self._headers())
+                except httpx.HTTPError as e:
+                    exc = e
+                if attempt <= self.max_retries and self._should_retry(exc, response):
+                    time.sleep(self._backoff(attempt))
+                    continue
+                return self._finish(response, exc, document_id, start, attempt)
+        except Exception as e:
+            # Un error inesperado (p. ej. un payload no serializable) también cierra
+            # la llamada de prueba del circuito; si no, quedaría abierto para siempre
+            self.breaker.record_failure()
+            self.metrics.record((time.perf_counter() - start) * 1000, False, attempt)
+            logger.exception(f"Error inesperado al enviar el documento {document_id} a imprenta: {e}")
+            return self._error(f"Error inesperado al enviar a la API de imprenta: {str(e)}")
+
+    async def enviar_async(self, json_data: dict, url: str, document_id: int) -> dict:
+        """
+        Versión para rutas `async def`: ejecuta `enviar` en un hilo del threadpool,
+        así comparte el pool de conexiones y no depende del event loop que la llama.
+        """
+        return await run_in_threadpool(self.enviar, json_data, url, document_id)
+
+    def _finish(self, response, exc, document_id, start, attempts) -> dict:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if exc is not None:
+            self.breaker.record_failure()
+            self.metrics.record(elapsed_ms, False, attempts)
+            if isinstance(exc, httpx.TimeoutException):
+                message = "La solicitud a la API de imprenta excedió el tiempo de espera."
+            else:
+                message = f"Error en la solicitud a la API de imprenta: {str(exc)}"
+            logger.error(f"{message} Documento {document_id}, intentos: {attempts}.")
+            return self._error(message)
+
+        if response.status_code >= 500 or response.status_code == 429:
+            self.breaker.record_failure()
+        else:
+            # Un 4xx es un rechazo del documento, no una falla del servicio
+            self.breaker.record_success()
+
+        if response.is_error:
+            self.metrics.record(elapsed_ms, False, attempts)
+            message = f"Error en la solicitud a la API de imprenta: HTTP {response.status_code}"
+            logger.error(f"{message} Documento {document_id}, intentos: {attempts}.")
+            try:
+                body = response.json()
+            except ValueError:
+                return self._error(message)
+            return body if isinstance(body, dict) and "error" in body else self._error(message)
+
+        self.metrics.record(elapsed_ms, True, attempts)
+        try:
+            return response.json()
+        except ValueError:
+            return self._error("La API de imprenta devolvió una respuesta no válida.")
+
+
+# Instancia global compartida por el proceso
+smart_client = SmartClient()
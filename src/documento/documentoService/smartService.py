@@ -1,23 +1,25 @@
 # Función para generar el JSON para la API de imprenta digital
 import os
-import requests
 from src.cliente.clienteSchema import ClienteSchema
 from src.documento.factura.facModel import Factura
 from src.documento.factura.iva.ivaModel import iva
 from src.empresa.empresaSchema import EmpresaSchema
+from src.documento.documentoService.smartClient import smart_client
 from src.loggers.loggerService import get_logger, get_request_info
 
 SEND_EMAIL_SMART = os.getenv("SEND_EMAIL_SMART")
 
-if SEND_EMAIL_SMART is None:
-    exception = ValueError(
-        "La variable de entorno SEND_EMAIL_SMART no está configurada."
-    )
-    raise exception
-
 logger = get_logger("smart_service")
 
 
+def validar_configuracion_smart():
+    """Falla si falta SEND_EMAIL_SMART (se valida al arrancar con POST_SMART y al armar cada JSON)."""
+    if SEND_EMAIL_SMART is None:
+        raise ValueError(
+            "La variable de entorno SEND_EMAIL_SMART no está configurada."
+        )
+
+
 def to_float(name, value):  # Convertir a float y manejar excepciones
     try:
         # print(f"Convirtiendo a float {name}: {value} ({type(value)})")
@@ -36,6 +38,7 @@ def generar_json_imprenta(
     precio_bcv: float,
     pedido_id: int,
 ):
+    validar_configuracion_smart()
     # Convertir a minúsculas para evitar problemas de escritura
     tipo_documento_lower = factura.tipo_documento.lower()
     tipo_cedula_lower = cliente.tipo_documento.lower()
@@ -134,6 +137,7 @@ def generar_json_imprenta_notas(
     tipo_documento: int,
     factura_nro_control: str,
 ):
+    validar_configuracion_smart()
     # Convertir a minúsculas para evitar problemas de escritura
     tipo_cedula_lower = cliente.tipo_documento.lower()
 
@@ -211,27 +215,14 @@ def generar_json_imprenta_notas(
 
 
 def enviar_a_imprenta(json_data: dict, url: str, document_id: int):
-    try:
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {os.getenv('SMART_API_TOKEN')}",
-        }
-        # Agregar un tiempo de espera de 10 segundos
-        logger.info(
-            f"Enviando documento {document_id} a la URL: {url}"
-        )  # Loggear la petición
-        response = requests.post(url, json=json_data, headers=headers)
-        response.raise_for_status()  # Lanza una excepción si la respuesta no es 2xx
-        return response.json()
-    except requests.exceptions.Timeout:
-        logger.error(
-            "La solicitud a la API de imprenta excedió el tiempo de espera.",
-        )
-        return {
-            "error": "La solicitud a la API de imprenta excedió el tiempo de espera."
-        }
-    except requests.exceptions.RequestException as e:
-        logger.error(
-            f"Error en la solicitud a la API de imprenta: {str(e)}",
-        )
-        return {"error": str(e)}
+    """
+    Envía un documento a SMART usando el cliente compartido (pool, timeouts,
+    reintentos y circuit breaker). Devuelve la respuesta JSON de SMART o un
+    dict con la clave "error".
+    """
+    return smart_client.enviar(json_data, url, document_id)
+
+
+async def enviar_a_imprenta_async(json_data: dict, url: str, document_id: int):
+    """Versión asíncrona de `enviar_a_imprenta` para rutas `async def`."""
+    return await smart_client.enviar_async(json_data, url, document_id)
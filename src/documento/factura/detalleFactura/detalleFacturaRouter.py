@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, Query
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Query, Response
 from sqlalchemy.orm import Session
 from database import get_db
 from src.documento.factura.detalleFactura.detalleFacturaService import (
@@ -6,6 +7,7 @@ from src.documento.factura.detalleFactura.detalleFacturaService import (
     get_all_detalles_factura,
 )
 from src.loggers.loggerService import get_logger, get_request_info
+from src.utils.pagination import CURSOR_DESCRIPTION, OFFSET_DESCRIPTION, agregar_cursor
 
 logger = get_logger("DetalleFacturaRouter")
 
@@ -15,16 +17,19 @@ router = APIRouter(prefix="/detalle_factura", tags=["DetalleFactura"])
 @router.get("/")
 def get_detalles_factura(
     request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     limit: int = Query(10, ge=1),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    offset: int = Query(0, ge=0, deprecated=True, description=OFFSET_DESCRIPTION),
 ):
     request_info = get_request_info(request)
     logger.info("Obteniendo todos los detalles de factura", extra=request_info)
-    detalles_factura = get_all_detalles_factura(db, limit=limit, offset=offset)
+    detalles_factura = get_all_detalles_factura(db, limit=limit, cursor=cursor, offset=offset)
     if not detalles_factura:
         logger.warning("No se encontraron detalles de factura", extra=request_info)
         raise HTTPException(status_code=404, detail="No se encontraron detalles de factura")
+    agregar_cursor(response, detalles_factura)
     return detalles_factura
 
 
@@ -1,9 +1,10 @@
 from sqlalchemy.orm import Session
+from src.utils.pagination import paginar
 from src.documento.factura.detalleFactura.detalleFacturaModel import DetalleFactura
 
 
-def get_all_detalles_factura(db: Session, limit: int = 10, offset: int = 0):
-    return db.query(DetalleFactura).offset(offset).limit(limit).all()
+def get_all_detalles_factura(db: Session, limit: int = 10, offset: int = 0, cursor: str = None):
+    return paginar(db.query(DetalleFactura), [DetalleFactura.id], limit, cursor, offset)
 
 
 def get_detalle_factura_by_id(db: Session, detalle_factura_id: int):
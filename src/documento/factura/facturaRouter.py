@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
-from sqlalchemy.orm import Session
-from database import get_db
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
 from src.documento.factura.facturaService import (
     get_facturas_by_cliente_id,
     get_facturas_by_empresa_id,
@@ -12,29 +13,36 @@ from src.documento.factura.facturaService import (
     get_pedido_by_factura_id,
 )
 from src.loggers.loggerService import get_logger, get_request_info
+from src.utils.pagination import CURSOR_DESCRIPTION, OFFSET_DESCRIPTION, agregar_cursor
 
 logger = get_logger("FacturaRouter")
 router = APIRouter(prefix="/factura", tags=["Factura"])
 
 
 @router.get("/")
-def get_facturas(
-    request: Request, db: Session = Depends(get_db), limit: int = Query(10, ge=1), offset: int = Query(0, ge=0)
+async def get_facturas(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    limit: int = Query(10, ge=1),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    offset: int = Query(0, ge=0, deprecated=True, description=OFFSET_DESCRIPTION),
 ):
     request_info = get_request_info(request)
     logger.info("Obteniendo todas las facturas", extra=request_info)
-    facturas = get_all_facturas(db, limit=limit, offset=offset)
+    facturas = await db.run_sync(get_all_facturas, limit=limit, cursor=cursor, offset=offset)
     if not facturas:
         logger.warning("No se encontraron facturas", extra=request_info)
         raise HTTPException(status_code=404, detail="No se encontraron facturas")
+    agregar_cursor(response, facturas)
     return facturas
 
 
 @router.get("/{factura_id}")
-def get_factura(factura_id: int, request: Request, db: Session = Depends(get_db)):
+async def get_factura(factura_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
     request_info = get_request_info(request)
     logger.info(f"Obteniendo factura con ID: {factura_id}", extra=request_info)
-    factura = get_factura_by_id(db, factura_id)
+    factura = await db.run_sync(get_factura_by_id, factura_id)
     if not factura:
         logger.warning(
             f"Factura con ID: {factura_id} no encontrada", extra=request_info
@@ -44,15 +52,15 @@ def get_factura(factura_id: int, request: Request, db: Session = Depends(get_db)
 
 
 @router.get("/numero-control/{numero_control}")
-def get_factura_by_numero_control_route(
-    numero_control: str, request: Request, db: Session = Depends(get_db)
+async def get_factura_by_numero_control_route(
+    numero_control: str, request: Request, db: AsyncSession = Depends(get_async_db)
 ):
     request_info = get_request_info(request)
     logger.info(
         f"Obteniendo factura con número de control: {numero_control}",
         extra=request_info,
     )
-    factura = get_factura_by_numero_control(db, numero_control)
+    factura = await db.run_sync(get_factura_by_numero_control, numero_control)
     if not factura:
         logger.warning(
             f"Factura con número de control: {numero_control} no encontrada",
@@ -63,53 +71,59 @@ def get_factura_by_numero_control_route(
 
 
 @router.get("/empresa/{empresa_id}")
-def get_facturas_by_empresa(
+async def get_facturas_by_empresa(
     empresa_id: int,
     request: Request,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     limit: int = Query(10, ge=1),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    offset: int = Query(0, ge=0, deprecated=True, description=OFFSET_DESCRIPTION),
 ):
     request_info = get_request_info(request)
     logger.info(f"Obteniendo facturas para la empresa con ID: {empresa_id}", extra=request_info)
-    facturas = get_facturas_by_empresa_id(db, empresa_id, limit=limit, offset=offset)
+    facturas = await db.run_sync(get_facturas_by_empresa_id, empresa_id, limit=limit, cursor=cursor, offset=offset)
     if not facturas:
         logger.warning(f"No se encontraron facturas para la empresa con ID: {empresa_id}", extra=request_info)
         raise HTTPException(
             status_code=404, detail="No se encontraron facturas para la empresa especificada"
         )
+    agregar_cursor(response, facturas)
     return facturas
 
 
 @router.get("/cliente/{cliente_id}")
-def get_facturas_by_cliente(
+async def get_facturas_by_cliente(
     cliente_id: int,
     request: Request,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     limit: int = Query(10, ge=1),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    offset: int = Query(0, ge=0, deprecated=True, description=OFFSET_DESCRIPTION),
 ):
     request_info = get_request_info(request)
     logger.info(f"Obteniendo facturas para el cliente con ID: {cliente_id}", extra=request_info)
-    facturas = get_facturas_by_cliente_id(db, cliente_id, limit=limit, offset=offset)
+    facturas = await db.run_sync(get_facturas_by_cliente_id, cliente_id, limit=limit, cursor=cursor, offset=offset)
     if not facturas:
         logger.warning(f"No se encontraron facturas para el cliente con ID: {cliente_id}", extra=request_info)
         raise HTTPException(
             status_code=404, detail="No se encontraron facturas para el cliente especificado"
         )
+    agregar_cursor(response, facturas)
     return facturas
 
 
 # Endnpoints para obtener IVA y operaciones asociadas a una factura
 @router.get("/{factura_id}/iva")
-def fetch_iva_by_factura_id(
-    factura_id: int, request: Request, db: Session = Depends(get_db)
+async def fetch_iva_by_factura_id(
+    factura_id: int, request: Request, db: AsyncSession = Depends(get_async_db)
 ):
     request_info = get_request_info(request)
     logger.info(
         f"Obteniendo IVA para la factura con ID: {factura_id}", extra=request_info
     )
-    iva = get_iva_by_factura_id(db, factura_id)
+    iva = await db.run_sync(get_iva_by_factura_id, factura_id)
     if not iva:
         logger.warning(
             f"IVA no encontrado para la factura con ID: {factura_id}",
@@ -120,14 +134,14 @@ def fetch_iva_by_factura_id(
 
 
 @router.get("/{factura_id}/detalles")
-def fetch_detalles_factura_by_factura_id(
-    factura_id: int, request: Request, db: Session = Depends(get_db)
+async def fetch_detalles_factura_by_factura_id(
+    factura_id: int, request: Request, db: AsyncSession = Depends(get_async_db)
 ):
     request_info = get_request_info(request)
     logger.info(
         f"Obteniendo detalles de la factura con ID: {factura_id}", extra=request_info
     )
-    detalles_factura = get_detalles_factura_by_factura_id(db, factura_id)
+    detalles_factura = await db.run_sync(get_detalles_factura_by_factura_id, factura_id)
     if not detalles_factura:
         logger.warning(
             f"Detalles de factura no encontrados para la factura con ID: {factura_id}",
@@ -140,15 +154,15 @@ def fetch_detalles_factura_by_factura_id(
 
 
 @router.get("/{factura_id}/pedido")
-def fetch_pedido_by_factura_id(
-    factura_id: int, request: Request, db: Session = Depends(get_db)
+async def fetch_pedido_by_factura_id(
+    factura_id: int, request: Request, db: AsyncSession = Depends(get_async_db)
 ):
     request_info = get_request_info(request)
     logger.info(
         f"Obteniendo pedido asociado a la factura con ID: {factura_id}",
         extra=request_info,
     )
-    pedido = get_pedido_by_factura_id(db, factura_id)
+    pedido = await db.run_sync(get_pedido_by_factura_id, factura_id)
     if not pedido:
         logger.warning(
             f"Pedido no encontrado para la factura con ID: {factura_id}",
@@ -1,12 +1,17 @@
 from sqlalchemy.orm import Session, joinedload
+from src.utils.pagination import paginar
 from src.pedidos.pedidoModel import Pedido
 from src.documento.factura.facModel import Factura
 from src.documento.factura.iva.ivaModel import iva
 from src.documento.factura.detalleFactura.detalleFacturaModel import DetalleFactura
 
 
-def get_all_facturas(db: Session, limit: int = 10, offset: int = 0):
-    return db.query(Factura).offset(offset).limit(limit).all()
+# Orden estable de los listados de facturas (clave de la paginación por cursor)
+ORDEN_FACTURAS = (Factura.fecha_emision, Factura.id)
+
+
+def get_all_facturas(db: Session, limit: int = 10, offset: int = 0, cursor: str = None):
+    return paginar(db.query(Factura), ORDEN_FACTURAS, limit, cursor, offset)
 
 
 def get_factura_by_id(db: Session, factura_id: int):
@@ -33,12 +38,14 @@ def get_factura_by_numero_control(db: Session, numero_control: str):
     return db.query(Factura).filter(Factura.numero_control == numero_control).first()
 
 
-def get_facturas_by_empresa_id(db: Session, empresa_id: int, limit: int = 10, offset: int = 0):
-    return db.query(Factura).filter(Factura.empresa_id == empresa_id).offset(offset).limit(limit).all()
+def get_facturas_by_empresa_id(db: Session, empresa_id: int, limit: int = 10, offset: int = 0, cursor: str = None):
+    query = db.query(Factura).filter(Factura.empresa_id == empresa_id)
+    return paginar(query, ORDEN_FACTURAS, limit, cursor, offset)
 
 
-def get_facturas_by_cliente_id(db: Session, cliente_id: int, limit: int = 10, offset: int = 0):
-    return db.query(Factura).filter(Factura.cliente_id == cliente_id).offset(offset).limit(limit).all()
+def get_facturas_by_cliente_id(db: Session, cliente_id: int, limit: int = 10, offset: int = 0, cursor: str = None):
+    query = db.query(Factura).filter(Factura.cliente_id == cliente_id)
+    return paginar(query, ORDEN_FACTURAS, limit, cursor, offset)
 
 
 def get_iva_by_factura_id(db: Session, factura_id: int):
@@ -0,0 +1,39 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, ForeignKey, Index
+from database import Base
+
+
+class SmartJob(Base):
+    """
+    Bandeja de salida (outbox) de envíos a la imprenta digital SMART.
+
+    El trabajo se inserta en la misma transacción que el documento, de modo que
+    un documento confirmado siempre tiene su envío pendiente registrado.
+    """
+
+    __tablename__ = "smart_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    documento_id = Column(Integer, ForeignKey("documento.id"), nullable=False, index=True)
+    # Documento que debe tener número de control antes de enviar este (la factura de una nota)
+    depende_de = Column(Integer, ForeignKey("documento.id"), nullable=True)
+    url = Column(String(255), nullable=False)
+    payload = Column(JSON, nullable=False)  # JSON generado para SMART al crear el documento
+    estado = Column(String(20), nullable=False, default="pendiente")  # pendiente, procesando, completado, error
+    intentos = Column(Integer, nullable=False, default=0)
+    proximo_intento = Column(DateTime, nullable=False)
+    ultimo_error = Column(Text, nullable=True)
+    fecha_creacion = Column(DateTime, nullable=False)
+    fecha_actualizacion = Column(DateTime, nullable=False)
+
+    __table_args__ = (Index("ix_smart_outbox_estado_proximo", "estado", "proximo_intento"),)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "documento_id": self.documento_id,
+            "depende_de": self.depende_de,
+            "estado": self.estado,
+            "intentos": self.intentos,
+            "proximo_intento": self.proximo_intento.isoformat() if self.proximo_intento else None,
+            "ultimo_error": self.ultimo_error,
+        }
@@ -0,0 +1,302 @@
+"""
+imprentaService.py
+Cola persistente (outbox) de envíos a la imprenta digital SMART.
+
+Los servicios de creación de documentos llaman a `encolar_envio_imprenta` dentro
+de su transacción: el documento queda confirmado en estado de espera junto con
+su trabajo pendiente. Un grupo de hilos trabajadores toma los trabajos, los
+envía a SMART fuera de cualquier transacción y escribe de vuelta el número de
+control, la fecha, la hora y la URL del PDF.
+
+La toma de trabajos usa `SELECT ... FOR UPDATE SKIP LOCKED` en Postgres y una
+actualización condicional del estado, por lo que varios procesos pueden drenar
+la misma cola sin enviar dos veces un documento (en SQLite solo aplica la
+actualización condicional).
+
+Una nota cuya factura todavía no tiene número de control se encola con
+`depende_de` apuntando a la factura: no se toma hasta que la factura se procesa,
+y entonces se completa su campo "relacionado" con el número de control. Si la
+factura termina en error, sus notas pendientes también: las que ya esperaban al
+fallar la factura, las que se encolan después y, con un barrido de los
+trabajadores, las que se confirmaron mientras la factura fallaba.
+
+Environment Variables:
+- SMART_WORKERS: Cantidad de hilos trabajadores por proceso.
+- SMART_OUTBOX_POLL: Segundos de espera cuando la cola está vacía.
+- SMART_JOB_MAX_INTENTOS: Intentos antes de marcar el documento con error.
+- SMART_JOB_BACKOFF: Segundos base del backoff exponencial entre intentos.
+- SMART_JOB_LEASE: Segundos tras los cuales un trabajo "procesando" abandonado se vuelve a tomar.
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, event, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from src.documento.docModel import Documento
+from src.documento.documentoService.smartService import enviar_a_imprenta
+from src.documento.imprenta.imprentaModel import SmartJob
+from src.loggers.loggerService import get_logger
+
+SMART_WORKERS = int(os.getenv("SMART_WORKERS", "2"))
+SMART_OUTBOX_POLL = float(os.getenv("SMART_OUTBOX_POLL", "1"))
+SMART_JOB_MAX_INTENTOS = int(os.getenv("SMART_JOB_MAX_INTENTOS", "5"))
+SMART_JOB_BACKOFF = float(os.getenv("SMART_JOB_BACKOFF", "10"))
+SMART_JOB_LEASE = float(os.getenv("SMART_JOB_LEASE", "300"))
+
+ESTADO_PROCESADO = "Procesado a imprenta"
+ESTADO_ERROR = "Error imprenta"
+
+logger = get_logger("imprenta_outbox")
+
+_detener = threading.Event()
+_despertar = threading.Event()
+_hilos = []
+
+
+# region Encolado
+def encolar_envio_imprenta(
+    db: Session, documento_id: int, payload: dict, url: str, depende_de: int = None
+):
+    """
+    Registra el envío de un documento a SMART en la transacción actual de `db`.
+    Los trabajadores se despiertan en cuanto la transacción se confirma.
+
+    Con `depende_de` (ID de documento de la factura), el envío espera a que esa
+    factura tenga número de control, que se copia en el campo "relacionado". Si
+    la factura ya terminó en error, el envío se registra con error de inmediato.
+    """
+    ahora = datetime.now()
+    job = SmartJob(
+        documento_id=documento_id,
+        depende_de=depende_de,
+        url=url,
+        payload=payload,
+        estado="pendiente",
+        intentos=0,
+        proximo_intento=ahora,
+        fecha_creacion=ahora,
+        fecha_actualizacion=ahora,
+    )
+    db.add(job)
+    if depende_de is not None:
+        factura = db.get(Documento, depende_de)
+        if factura is not None and factura.estado == ESTADO_ERROR:
+            db.flush()  # El documento de la nota debe existir para marcarlo
+            _fallar_dependiente(db, job, ahora)
+            return
+    event.listen(db, "after_commit", _al_confirmar, once=True)
+
+
+def _al_confirmar(session):
+    _despertar.set()
+
+
+# endregion
+
+
+# region Procesamiento
+def _reclamar_job():
+    """Toma el siguiente trabajo disponible y lo marca como "procesando"."""
+    ahora = datetime.now()
+    abandonado = ahora - timedelta(seconds=SMART_JOB_LEASE)
+    # Documentos que ya tienen número de control (las notas esperan a su factura)
+    procesados = select(Documento.id).where(Documento.numero_control.isnot(None))
+    with SessionLocal() as db, db.begin():
+        job = (
+            db.query(SmartJob)
+            .filter(
+                or_(
+                    and_(SmartJob.estado == "pendiente", SmartJob.proximo_intento <= ahora),
+                    and_(SmartJob.estado == "procesando", SmartJob.fecha_actualizacion < abandonado),
+                ),
+                or_(SmartJob.depende_de.is_(None), SmartJob.depende_de.in_(procesados)),
+            )
+            .order_by(SmartJob.id)
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if job is None:
+            return None
+
+        datos = {
+            "id": job.id,
+            "documento_id": job.documento_id,
+            "url": job.url,
+            "payload": job.payload,
+            "intentos": job.intentos + 1,
+        }
+        if job.depende_de is not None:
+            factura = db.get(Documento, job.depende_de)
+            datos["payload"] = {**job.payload, "relacionado": factura.numero_control}
+        # Actualización condicional: si otro trabajador lo tomó primero, no se afecta ninguna fila
+        tomado = db.execute(
+            update(SmartJob)
+            .where(
+                SmartJob.id == job.id,
+                SmartJob.estado == job.estado,
+                SmartJob.intentos == job.intentos,
+            )
+            .values(estado="procesando", intentos=datos["intentos"], fecha_actualizacion=ahora)
+        ).rowcount
+        return datos if tomado else None
+
+
+def _mensaje_error(respuesta: dict) -> str:
+    error = respuesta.get("error")
+    if isinstance(error, dict):
+        return error.get("message", "Desconocido")
+    return str(error or "Desconocido")
+
+
+def procesar_job(job: dict):
+    """Envía un trabajo a SMART y registra el resultado en el documento y en la cola."""
+    respuesta = enviar_a_imprenta(job["payload"], job["url"], job["documento_id"])
+
+    with SessionLocal() as db, db.begin():
+        registro = db.get(SmartJob, job["id"])
+        documento = db.get(Documento, job["documento_id"])
+        ahora = datetime.now()
+        registro.fecha_actualizacion = ahora
+
+        error = None
+        if respuesta.get("success"):
+            try:
+                data = respuesta["data"]
+                documento.numero_control = data["numerodocumento"]
+                documento.fecha_numero_control = datetime.strptime(data["fecha"], "%Y%m%d").date()
+                documento.hora_numero_control = datetime.strptime(data["hora"], "%H:%M:%S").time()
+                documento.url_pdf = data["urlpdf"]
+                documento.estado = ESTADO_PROCESADO
+            except (KeyError, TypeError, ValueError) as e:
+                error = f"Respuesta de imprenta no válida: {str(e)}"
+        else:
+            error = _mensaje_error(respuesta)
+
+        if error is None:
+            registro.estado = "completado"
+            registro.ultimo_error = None
+            logger.info(f"Documento {documento.id} procesado a imprenta: {documento.numero_control}")
+            return
+
+        registro.ultimo_error = error
+        if registro.intentos >= SMART_JOB_MAX_INTENTOS:
+            registro.estado = "error"
+            documento.estado = ESTADO_ERROR
+            logger.error(
+                f"Documento {job['documento_id']} no pudo enviarse a imprenta tras {registro.intentos} intentos: {error}"
+            )
+            _fallar_dependientes(db, job["documento_id"], ahora)
+        else:
+            registro.estado = "pendiente"
+            registro.proximo_intento = ahora + timedelta(
+                seconds=SMART_JOB_BACKOFF * (2 ** (registro.intentos - 1))
+            )
+            logger.warning(
+                f"Error al enviar documento {job['documento_id']} a imprenta (intento {registro.intentos}): {error}"
+            )
+
+
+def _fallar_dependiente(db: Session, job: SmartJob, ahora: datetime):
+    """Marca con error una nota (y su trabajo) cuya factura no pudo procesarse."""
+    job.estado = "error"
+    job.ultimo_error = f"La factura relacionada (documento {job.depende_de}) no pudo procesarse."
+    job.fecha_actualizacion = ahora
+    db.get(Documento, job.documento_id).estado = ESTADO_ERROR
+    logger.error(f"Documento {job.documento_id} no se envía a imprenta: {job.ultimo_error}")
+
+
+def _fallar_dependientes(db: Session, documento_id: int, ahora: datetime):
+    """Marca con error las notas que esperaban a un documento que no pudo procesarse."""
+    dependientes = (
+        db.query(SmartJob)
+        .filter(SmartJob.depende_de == documento_id, SmartJob.estado == "pendiente")
+        .all()
+    )
+    for dependiente in dependientes:
+        _fallar_dependiente(db, dependiente, ahora)
+
+
+def _fallar_huerfanos():
+    """
+    Marca con error las notas pendientes cuya factura ya terminó en error. Cubre
+    las que se confirmaron mientras la factura fallaba, que ni el encolado ni
+    `_fallar_dependientes` llegan a ver.
+    """
+    fallidos = select(Documento.id).where(Documento.estado == ESTADO_ERROR)
+    with SessionLocal() as db, db.begin():
+        huerfanos = (
+            db.query(SmartJob)
+            .filter(SmartJob.estado == "pendiente", SmartJob.depende_de.in_(fallidos))
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        ahora = datetime.now()
+        for job in huerfanos:
+            _fallar_dependiente(db, job, ahora)
+
+
+def _bucle_trabajador():
+    while not _detener.is_set():
+        try:
+            job = _reclamar_job()
+            if job is not None:
+                procesar_job(job)
+                continue
+            # Cola vacía para este trabajador: revisar notas sin factura posible
+            _fallar_huerfanos()
+        except Exception as e:
+            logger.error(f"Error en el trabajador de imprenta: {str(e)}")
+        _despertar.wait(SMART_OUTBOX_POLL)
+        _despertar.clear()
+
+
+# endregion
+
+
+# region Ciclo de vida
+def iniciar_workers_imprenta(cantidad: int = SMART_WORKERS):
+    """Arranca los hilos trabajadores de la cola de imprenta."""
+    if _hilos:
+        return
+    _detener.clear()
+    for i in range(cantidad):
+        hilo = threading.Thread(
+            target=_bucle_trabajador, name=f"imprenta-worker-{i}", daemon=True
+        )
+        hilo.start()
+        _hilos.append(hilo)
+    logger.info(f"Trabajadores de imprenta iniciados: {cantidad}")
+
+
+def detener_workers_imprenta(timeout: float = 10):
+    """Detiene los hilos trabajadores; los trabajos en curso terminan su envío."""
+    _detener.set()
+    _despertar.set()
+    for hilo in _hilos:
+        hilo.join(timeout)
+    _hilos.clear()
+    logger.info("Trabajadores de imprenta detenidos.")
+
+
+def get_outbox_stats(db: Session) -> dict:
+    """Cantidad de trabajos por estado y antigüedad del pendiente más viejo."""
+    conteos = dict(
+        db.query(SmartJob.estado, func.count(SmartJob.id)).group_by(SmartJob.estado).all()
+    )
+    mas_antiguo = (
+        db.query(func.min(SmartJob.fecha_creacion))
+        .filter(SmartJob.estado.in_(["pendiente", "procesando"]))
+        .scalar()
+    )
+    return {
+        "workers": len(_hilos),
+        "por_estado": conteos,
+        "pendiente_mas_antiguo": mas_antiguo.isoformat() if mas_antiguo else None,
+    }
+
+
+# endregion
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, Request, Query
+from typing import Optional
+from fastapi import APIRouter, Depends, Request, Query, Response
 from sqlalchemy.orm import Session
 from database import get_db
 from src.documento.notas.notaService import (
@@ -10,6 +11,7 @@ from src.documento.notas.notaService import (
     get_all_notas_credito,
 )
 from src.loggers.loggerService import get_logger, get_request_info
+from src.utils.pagination import CURSOR_DESCRIPTION, OFFSET_DESCRIPTION, agregar_cursor
 
 router = APIRouter(prefix="/notas", tags=["Notas"])
 logger = get_logger("notaRouter")
@@ -19,16 +21,19 @@ logger = get_logger("notaRouter")
 @router.get("/nota_debito")
 def route_get_notas_debito(
     request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     limit: int = Query(10, ge=1),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    offset: int = Query(0, ge=0, deprecated=True, description=OFFSET_DESCRIPTION),
 ):
     request_info = get_request_info(request)
     logger.info("Solicitud para obtener todas las notas de débito", extra=request_info)
-    notas_debito = get_all_notas_debito(db, limit=limit, offset=offset)
+    notas_debito = get_all_notas_debito(db, limit=limit, cursor=cursor, offset=offset)
     if not notas_debito:
         logger.warning("No se encontraron notas de débito", extra=request_info)
         return {"error": "No se encontraron notas de débito"}
+    agregar_cursor(response, notas_debito)
     return notas_debito
 
 
@@ -75,16 +80,19 @@ def route_get_nota_debito_by_factura(
 @router.get("/nota_credito")
 def route_get_notas_credito(
     request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     limit: int = Query(10, ge=1),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    offset: int = Query(0, ge=0, deprecated=True, description=OFFSET_DESCRIPTION),
 ):
     request_info = get_request_info(request)
     logger.info("Solicitud para obtener todas las notas de crédito", extra=request_info)
-    notas_credito = get_all_notas_credito(db, limit=limit, offset=offset)
+    notas_credito = get_all_notas_credito(db, limit=limit, cursor=cursor, offset=offset)
     if not notas_credito:
         logger.warning("No se encontraron notas de crédito", extra=request_info)
         return {"error": "No se encontraron notas de crédito"}
+    agregar_cursor(response, notas_credito)
     return notas_credito
 
 
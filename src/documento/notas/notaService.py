@@ -1,10 +1,13 @@
 from sqlalchemy.orm import Session
+from src.utils.pagination import paginar
 from src.documento.notas.notaModel import NotaDebito, NotaCredito
 
 
 # Servicio Nota de Débito
-def get_all_notas_debito(db: Session, limit: int = 10, offset: int = 0):
-    return db.query(NotaDebito).offset(offset).limit(limit).all()
+def get_all_notas_debito(db: Session, limit: int = 10, offset: int = 0, cursor: str = None):
+    return paginar(
+        db.query(NotaDebito), [NotaDebito.fecha_emision, NotaDebito.id], limit, cursor, offset
+    )
 
 
 def get_nota_debito_by_id(db: Session, nota_debito_id: int):
@@ -15,8 +18,10 @@ def get_nota_debito_by_factura(db: Session, factura_id: int):
 
 
 # Servicio Nota de Crédito
-def get_all_notas_credito(db: Session, limit: int = 10, offset: int = 0):
-    return db.query(NotaCredito).offset(offset).limit(limit).all()
+def get_all_notas_credito(db: Session, limit: int = 10, offset: int = 0, cursor: str = None):
+    return paginar(
+        db.query(NotaCredito), [NotaCredito.fecha_emision, NotaCredito.id], limit, cursor, offset
+    )
 
 
 def get_nota_credito_by_id(db: Session, nota_credito_id: int):
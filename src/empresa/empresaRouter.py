@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, Query
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Query, Response
 from sqlalchemy.orm import Session
 from database import get_db
 from src.empresa.empresaService import (
@@ -10,6 +11,7 @@ from src.empresa.empresaService import (
 )
 from src.empresa.empresaSchema import EmpresaSchema, EmpresaUpdateSchema
 from src.loggers.loggerService import get_logger, get_request_info
+from src.utils.pagination import CURSOR_DESCRIPTION, OFFSET_DESCRIPTION, agregar_cursor
 
 # Crear una instancia del logger para el módulo de empresa
 logger = get_logger("EmpresaRouter")
@@ -20,13 +22,17 @@ router = APIRouter(prefix="/empresa", tags=["Empresa"])
 @router.get("/")
 def get_empresas(
     request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     limit: int = Query(10, ge=1),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    offset: int = Query(0, ge=0, deprecated=True, description=OFFSET_DESCRIPTION),
 ):
     request_info = get_request_info(request)
     logger.info("Obteniendo todas las empresas", extra=request_info)
-    return get_all_empresas(db, limit=limit, offset=offset)
+    resultado = get_all_empresas(db, limit=limit, cursor=cursor, offset=offset)
+    agregar_cursor(response, resultado)
+    return resultado
 
 
 @router.get("/{empresa_id}")
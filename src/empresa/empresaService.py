@@ -1,11 +1,12 @@
 from datetime import datetime
 from sqlalchemy.orm import Session
+from src.utils.pagination import paginar
 from src.empresa.empModel import Empresa
 from src.empresa.empresaSchema import EmpresaSchema, EmpresaUpdateSchema
 
 
-def get_all_empresas(db: Session, limit: int = 10, offset: int = 0):
-    return db.query(Empresa).offset(offset).limit(limit).all()
+def get_all_empresas(db: Session, limit: int = 10, offset: int = 0, cursor: str = None):
+    return paginar(db.query(Empresa), [Empresa.id], limit, cursor, offset)
 
 
 def get_empresa_by_id(db: Session, empresa_id: int):
@@ -26,8 +26,6 @@ from zoneinfo import ZoneInfo
 
 from fastapi import Request
 
-from src.auth.jwt_middleware import decode_access_token_with_jwks
-
 
 # Cambiar la zona horaria a UTC
 TIMEZONE = "UTC"
@@ -144,7 +142,9 @@ def get_request_info(request: Request, token: str = None):
 
     Args:
         request (Request): La solicitud HTTP entrante.
-        token (str, optional): El token JWT para decodificar. Si no se proporciona, se usa el token de las cookies.
+        token (str, optional): El token JWT para decodificar. Si no se proporciona, se usa
+            el payload ya verificado por el middleware (request.state.user_payload) o, en
+            su defecto, el token del encabezado Authorization o de las cookies.
 
     Returns:
         dict: Un diccionario con la información del dispositivo y la IP.
@@ -152,12 +152,21 @@ def get_request_info(request: Request, token: str = None):
     ip = request.headers.get("X-Forwarded-For", request.client.host)
     device = request.headers.get("User-Agent", "UnknownDevice")
 
+    # Reutilizar la identidad verificada por GroupMembershipMiddleware
+    user_payload = getattr(request.state, "user_payload", None)
+    if not token and user_payload:
+        user = user_payload.get("nickname", "UnknownUser")
+        return {"device": device, "user": user, "ip": ip}
+
     try:
         if not token:
             token = request.headers.get("Authorization", "").replace("Bearer ", "")
             if not token:
                 token = request.cookies.get("token", "")
         if token:
+            # Importación diferida: jwt_middleware usa get_logger de este módulo
+            from src.auth.jwt_middleware import decode_access_token_with_jwks
+
             token_body = decode_access_token_with_jwks(token)
             user = (
                 token_body.get("nickname", "UnknownUser")
@@ -0,0 +1,227 @@
+"""
+dolarCache.py
+Caché en memoria de la tasa del dólar BCV.
+
+La tasa solo cambia cuando el cron job (updateDolar) la actualiza, cada 12
+horas; mientras tanto, pedidos, notas y `/moneda/dolar/obtener` la leen de
+memoria en lugar de consultar la fila de `dolar` en cada llamada. La entrada
+vence después de DOLAR_CACHE_TTL segundos.
+
+También guarda los últimos DOLAR_HISTORIAL_DIAS días de `dolar_historial`
+como dos listas ordenadas (fechas de vigencia y precios) para responder "qué
+tasa regía en tal momento" con bisect; los momentos anteriores a esa ventana
+se consultan en la base por el índice de fecha_vigencia.
+
+`actualizar_dolar_unico` reemplaza la entrada después del commit y publica el
+cambio en `cache_stamp`; los demás workers vacían su copia en la siguiente
+consulta del sello (CACHE_STAMP_INTERVAL) o, si el sello está desactivado,
+al vencer el TTL.
+
+Environment Variables:
+- DOLAR_CACHE_TTL: Segundos que la tasa permanece en caché (default 300).
+- DOLAR_HISTORIAL_DIAS: Días de historial de tasas que se mantienen en memoria (default 90).
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from src.monedas.dolar.dolarModel import Dolar, DolarHistorial
+from src.utils.cache_stamp import SelloCache
+
+DOLAR_CACHE_TTL = float(os.getenv("DOLAR_CACHE_TTL", "300"))
+DOLAR_HISTORIAL_DIAS = float(os.getenv("DOLAR_HISTORIAL_DIAS", "90"))
+
+
+def cargar_historial(db: Session, desde: datetime, hasta: datetime = None):
+    """
+    Tasas con vigencia en [desde, hasta) más la última anterior a `desde`
+    (la que regía al inicio del rango), como listas ordenadas (fechas, precios).
+    """
+    anterior = (
+        db.query(DolarHistorial.fecha_vigencia, DolarHistorial.precio)
+        .filter(DolarHistorial.fecha_vigencia < desde)
+        .order_by(DolarHistorial.fecha_vigencia.desc(), DolarHistorial.id.desc())
+        .first()
+    )
+    consulta = db.query(DolarHistorial.fecha_vigencia, DolarHistorial.precio).filter(
+        DolarHistorial.fecha_vigencia >= desde
+    )
+    if hasta is not None:
+        consulta = consulta.filter(DolarHistorial.fecha_vigencia < hasta)
+    filas = ([anterior] if anterior else []) + consulta.order_by(
+        DolarHistorial.fecha_vigencia, DolarHistorial.id
+    ).all()
+    return [fila[0] for fila in filas], [fila[1] for fila in filas]
+
+
+def _tasa_en(fechas: list, precios: list, momento: datetime):
+    # Última tasa con vigencia <= momento; None si el momento es anterior al historial
+    i = bisect_right(fechas, momento)
+    return precios[i - 1] if i else None
+
+
+class DolarCache:
+    def __init__(
+        self,
+        ttl: float = DOLAR_CACHE_TTL,
+        sello: SelloCache = None,
+        historial_dias: float = DOLAR_HISTORIAL_DIAS,
+    ):
+        self.ttl = ttl
+        self.sello = sello or SelloCache("dolar")
+        self._lock = threading.Lock()
+        self._precio = None
+        self._fecha_actualizacion = None
+        self._expira = 0.0
+        # Historial reciente: fechas de vigencia ordenadas y sus precios
+        self.ventana = timedelta(days=historial_dias)
+        self._fechas = None
+        self._precios = None
+        self._historial_desde = None
+        self._historial_expira = 0.0
+        # Se incrementa en cada invalidación; una carga iniciada antes no se guarda
+        self._generacion = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidaciones = 0
+
+    def obtener(self, db: Session):
+        """Devuelve la tasa vigente, o None si no hay registro de dólar."""
+        if self.sello.cambio(db):
+            self.limpiar()
+        ahora = time.monotonic()
+        with self._lock:
+            if self._precio is not None and self._expira > ahora:
+                self.hits += 1
+                return self._precio
+            self.misses += 1
+            generacion = self._generacion
+
+        registro = db.query(Dolar).first()
+        if registro is None:
+            return None
+        with self._lock:
+            if generacion == self._generacion:
+                self._guardar(registro.precio, registro.fecha_actualizacion, ahora)
+        return registro.precio
+
+    # region Historial
+    def tasa_a_fecha(self, db: Session, momento: datetime):
+        """Tasa vigente en `momento`, o None si es anterior al historial."""
+        return self.tasas_a_fechas(db, [momento])[0]
+
+    def tasas_a_fechas(self, db: Session, momentos) -> list:
+        """
+        Tasa vigente en cada momento (None si es anterior al historial). Los
+        momentos dentro de la ventana en memoria se resuelven con bisect; los
+        anteriores, con una sola consulta por rango para todo el lote.
+        """
+        momentos = list(momentos)
+        fechas, precios, desde = self._historial(db)
+        tasas = [None] * len(momentos)
+        antiguos = []
+        for i, momento in enumerate(momentos):
+            if momento >= desde:
+                tasas[i] = _tasa_en(fechas, precios, momento)
+            else:
+                antiguos.append(i)
+        if antiguos:
+            fechas, precios = cargar_historial(
+                db, min(momentos[i] for i in antiguos), desde
+            )
+            for i in antiguos:
+                tasas[i] = _tasa_en(fechas, precios, momentos[i])
+        return tasas
+
+    def _historial(self, db: Session):
+        """Listas del historial en memoria (se cargan o renuevan al vencer el TTL)."""
+        if self.sello.cambio(db):
+            self.limpiar()
+        ahora = time.monotonic()
+        with self._lock:
+            if self._fechas is not None and self._historial_expira > ahora:
+                self.hits += 1
+                return self._fechas, self._precios, self._historial_desde
+            self.misses += 1
+            generacion = self._generacion
+
+        desde = datetime.now() - self.ventana
+        fechas, precios = cargar_historial(db, desde)
+        with self._lock:
+            if generacion == self._generacion:
+                self._fechas, self._precios = fechas, precios
+                self._historial_desde = desde
+                self._historial_expira = ahora + self.ttl
+        return fechas, precios, desde
+
+    # endregion
+
+    def _guardar(self, precio, fecha_actualizacion, ahora: float):
+        self._precio = precio
+        self._fecha_actualizacion = fecha_actualizacion
+        self._expira = ahora + self.ttl
+
+    def actualizar(self, precio, fecha_actualizacion):
+        """
+        Reemplaza la tasa después de que el cron job confirma la actualización
+        y la agrega al final del historial en memoria.
+        """
+        with self._lock:
+            self._generacion += 1
+            self.invalidaciones += 1
+            self._guardar(precio, fecha_actualizacion, time.monotonic())
+            if self._fechas is not None:
+                if not self._fechas or fecha_actualizacion >= self._fechas[-1]:
+                    # Listas nuevas: un lector concurrente conserva las anteriores
+                    self._fechas = self._fechas + [fecha_actualizacion]
+                    self._precios = self._precios + [precio]
+                else:
+                    self._fechas = self._precios = None
+
+    def publicar_cambio(self, db: Session):
+        """Avisa a los demás workers dentro de la transacción que actualiza la tasa."""
+        self.sello.incrementar(db)
+
+    def limpiar(self):
+        with self._lock:
+            self._generacion += 1
+            self.invalidaciones += 1
+            self._precio = None
+            self._fecha_actualizacion = None
+            self._expira = 0.0
+            self._fechas = self._precios = None
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            consultas = self.hits + self.misses
+            vigente = self._precio is not None and self._expira > time.monotonic()
+            return {
+                "precio": self._precio if vigente else None,
+                "fecha_actualizacion": (
+                    self._fecha_actualizacion.isoformat()
+                    if vigente and self._fecha_actualizacion
+                    else None
+                ),
+                "expira_en_segundos": (
+                    round(self._expira - time.monotonic(), 1) if vigente else None
+                ),
+                "historial_en_memoria": (
+                    len(self._fechas) if self._fechas is not None else None
+                ),
+                "historial_dias": self.ventana.days,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / consultas, 4) if consultas else None,
+                "invalidaciones": self.invalidaciones,
+                "ttl_segundos": self.ttl,
+                "sello_activo": self.sello.activo,
+                "version_sello": self.sello.version,
+            }
+
+
+dolar_cache = DolarCache()
@@ -10,3 +10,13 @@ class Dolar(Base):
     fecha = Column(Date, default=datetime.today().date, nullable=False)
     precio = Column(Float, nullable=False)
     fecha_actualizacion = Column(DateTime, nullable=False)
+
+
+class DolarHistorial(Base):
+    """Historial de tasas (solo se agregan filas): cada tasa rige desde fecha_vigencia."""
+
+    __tablename__ = "dolar_historial"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    precio = Column(Float, nullable=False)
+    fecha_vigencia = Column(DateTime, nullable=False, index=True)
@@ -1,41 +1,63 @@
 from sqlalchemy.orm import Session
-from src.monedas.dolar.dolarModel import Dolar
+from src.monedas.dolar.dolarCache import dolar_cache
+from src.monedas.dolar.dolarModel import Dolar, DolarHistorial
 from src.utils.custom_request import obtener_precio_bcv
 from datetime import datetime
 
 
-def actualizar_dolar_unico(db: Session):
+def actualizar_dolar_unico(db: Session, obtenedor=None):
     try:
-        # Iniciar una transacción explícita
-        db.begin()
+        # Última tasa conocida, para descartar fuentes con valores fuera de rango
+        tasa_anterior = dolar_cache.obtener(db)
+        # No mantener una transacción abierta mientras se consultan las fuentes
+        db.rollback()
 
-        # Obtener el precio del BCV y la fecha de actualización
-        precio_bcv = obtener_precio_bcv()
+        # Obtener el precio del BCV desde las fuentes configuradas
+        precio_bcv = obtener_precio_bcv(tasa_anterior, obtenedor)
         if not precio_bcv:
-            db.rollback()  # Rollback explícito en caso de error
             return {"error": "No se pudo obtener el precio del BCV."}
 
+        # Iniciar una transacción explícita
+        db.begin()
+
         # Verificar si ya existe un registro único
         registro_existente = db.query(Dolar).first()
+        ahora = datetime.now()
+
+        # Al estrenar el historial, conservar la tasa que regía hasta ahora
+        if registro_existente and not db.query(DolarHistorial.id).first():
+            db.add(
+                DolarHistorial(
+                    precio=registro_existente.precio,
+                    fecha_vigencia=registro_existente.fecha_actualizacion,
+                )
+            )
 
         if registro_existente:
             # Actualizar el registro existente
             registro_existente.precio = precio_bcv
-            registro_existente.fecha_actualizacion = datetime.now()
+            registro_existente.fecha_actualizacion = ahora
             db.add(registro_existente)
         else:
             # Crear un nuevo registro si no existe
             nuevo_dolar = Dolar(
                 fecha=datetime.today().date(),
                 precio=precio_bcv,
-                fecha_actualizacion=datetime.now(),
+                fecha_actualizacion=ahora,
             )
             db.add(nuevo_dolar)
 
+        # Agregar la tasa al historial (nunca se modifican filas anteriores)
+        db.add(DolarHistorial(precio=precio_bcv, fecha_vigencia=ahora))
+
+        # Avisar a los demás workers en la misma transacción
+        dolar_cache.publicar_cambio(db)
+
         # Confirmar la transacción
         db.commit()
 
         # Refrescar el registro actualizado o creado
+        dolar_cache.actualizar(precio_bcv, ahora)
         return registro_existente if registro_existente else nuevo_dolar
     except Exception as e:
         db.rollback()  # Rollback explícito en caso de excepción
@@ -46,13 +68,22 @@ def actualizar_dolar_unico(db: Session):
 
 def obtener_dolar_bcv(db: Session):
     try:
-        # Consultar el registro único del dólar
-        registro = db.query(Dolar).first()
-        if not registro:
+        # Consultar el registro único del dólar (desde la caché si está vigente)
+        precio = dolar_cache.obtener(db)
+        if precio is None:
             # Retornar un diccionario con un mensaje claro
             return {"error": "No se encontró un registro de dólar."}
-        # Retornar el registro directamente si existe
-        return registro.precio
+        return precio
     except Exception as e:
         # Registrar el error para facilitar la depuración
         return {"error": f"Ocurrió un error al obtener el registro: {str(e)}"}
+
+
+def obtener_tasa_a_fecha(db: Session, momento: datetime):
+    """Tasa del dólar vigente en `momento` según el historial (None si es anterior)."""
+    return dolar_cache.tasa_a_fecha(db, momento)
+
+
+def obtener_tasas_a_fechas(db: Session, momentos) -> list:
+    """Tasas vigentes en varios momentos, para reportes que convierten muchos documentos."""
+    return dolar_cache.tasas_a_fechas(db, momentos)
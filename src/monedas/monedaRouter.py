@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from database import get_db
-from src.monedas.dolar.dolarService import obtener_dolar_bcv
+from src.monedas.dolar.dolarService import obtener_dolar_bcv, obtener_tasa_a_fecha
 from src.loggers.loggerService import get_logger, get_request_info
 
 logger = get_logger("MonedaRouter")
@@ -13,10 +15,27 @@ router = APIRouter(prefix="/moneda", tags=["Moneda"])
 def obtener_dolar(request: Request, db: Session = Depends(get_db)):
     request_info = get_request_info(request)
     logger.info("Obteniendo el registro único del dólar", extra=request_info)
-    try:
-        registro = obtener_dolar_bcv(db)
-        if "error" in registro:
-            raise HTTPException(status_code=400, detail=registro["error"])
-        return registro
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    # La tasa se responde desde la caché en memoria (dolarCache)
+    registro = obtener_dolar_bcv(db)
+    if isinstance(registro, dict):
+        logger.warning(registro["error"], extra=request_info)
+        raise HTTPException(status_code=400, detail=registro["error"])
+    return registro
+
+
+@router.get("/dolar/historico")
+def obtener_dolar_historico(
+    request: Request,
+    fecha: datetime = Query(..., description="Momento (ISO 8601) cuya tasa vigente se consulta"),
+    db: Session = Depends(get_db),
+):
+    request_info = get_request_info(request)
+    logger.info(f"Obteniendo la tasa del dólar vigente en {fecha}", extra=request_info)
+    # El historial guarda fechas locales sin zona horaria
+    if fecha.tzinfo is not None:
+        fecha = fecha.astimezone().replace(tzinfo=None)
+    precio = obtener_tasa_a_fecha(db, fecha)
+    if precio is None:
+        logger.warning(f"No hay tasa del dólar registrada en {fecha}", extra=request_info)
+        raise HTTPException(status_code=404, detail="No hay tasa registrada para esa fecha.")
+    return precio
@@ -0,0 +1,90 @@
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.orm import Session
+from database import engine, enrutador_lecturas, get_async_engine, get_db
+from src.auth.jwt_middleware import jwks_store, token_cache
+from src.documento.documentoService.smartClient import smart_client
+from src.documento.imprenta.imprentaService import get_outbox_stats
+from src.loggers.loggerService import get_logger, get_request_info
+from src.monedas.dolar.dolarCache import dolar_cache
+from src.producto.productoCache import producto_cache
+from src.utils.cron.planificador import get_planificador_stats
+from src.utils.db_pool import get_pool_stats
+from src.utils.tasa_proveedores import obtenedor_tasa
+
+logger = get_logger("MonitoreoRouter")
+
+router = APIRouter(prefix="/monitoreo", tags=["Monitoreo"])
+
+
+@router.get("/jwks")
+def get_jwks_stats(request: Request):
+    request_info = get_request_info(request)
+    logger.info("Obteniendo métricas del almacén de claves JWKS", extra=request_info)
+    return jwks_store.get_stats()
+
+
+@router.get("/tokens")
+def get_token_cache_stats(request: Request):
+    request_info = get_request_info(request)
+    logger.info("Obteniendo métricas de la caché de tokens verificados", extra=request_info)
+    return token_cache.get_stats()
+
+
+@router.get("/smart")
+def get_smart_stats(request: Request):
+    request_info = get_request_info(request)
+    logger.info("Obteniendo métricas del cliente SMART", extra=request_info)
+    return {"circuit": smart_client.breaker.state, **smart_client.metrics.snapshot()}
+
+
+@router.get("/imprenta")
+def get_imprenta_stats(request: Request, db: Session = Depends(get_db)):
+    request_info = get_request_info(request)
+    logger.info("Obteniendo métricas de la cola de imprenta", extra=request_info)
+    return get_outbox_stats(db)
+
+
+@router.get("/productos")
+def get_producto_cache_stats(request: Request):
+    request_info = get_request_info(request)
+    logger.info("Obteniendo métricas de la caché de productos", extra=request_info)
+    return producto_cache.get_stats()
+
+
+@router.get("/dolar")
+def get_dolar_cache_stats(request: Request):
+    request_info = get_request_info(request)
+    logger.info("Obteniendo métricas de la caché de la tasa del dólar", extra=request_info)
+    return dolar_cache.get_stats()
+
+
+@router.get("/tasas")
+def get_tasa_proveedores_stats(request: Request):
+    request_info = get_request_info(request)
+    logger.info("Obteniendo métricas de las fuentes de la tasa del dólar", extra=request_info)
+    return obtenedor_tasa.get_stats()
+
+
+@router.get("/planificador")
+def get_planificador(request: Request):
+    request_info = get_request_info(request)
+    logger.info("Obteniendo estado del planificador de tareas", extra=request_info)
+    return get_planificador_stats()
+
+
+@router.get("/db")
+def get_db_pool_stats(request: Request):
+    request_info = get_request_info(request)
+    logger.info("Obteniendo métricas del pool de conexiones", extra=request_info)
+    # Pool síncrono (escrituras y rutas def) y asíncrono (rutas GET async)
+    return {
+        **get_pool_stats(engine),
+        "async": get_pool_stats(get_async_engine().sync_engine),
+    }
+
+
+@router.get("/replicas")
+def get_replicas_stats(request: Request):
+    request_info = get_request_info(request)
+    logger.info("Obteniendo el estado de las réplicas de lectura", extra=request_info)
+    return enrutador_lecturas.get_stats()
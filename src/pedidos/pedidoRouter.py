@@ -1,4 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, Query
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from src.pedidos.pedidoService import (
     create_pedido,
@@ -9,8 +11,9 @@ from src.pedidos.pedidoService import (
     get_pedidos_by_cliente_id,
 )
 from src.pedidos.pedidoSchema import PedidoSchema, PedidoUpdateSchema
-from database import get_db
+from database import get_async_db, get_db
 from src.loggers.loggerService import get_logger, get_request_info
+from src.utils.pagination import CURSOR_DESCRIPTION, OFFSET_DESCRIPTION, agregar_cursor
 
 logger = get_logger("PedidoRouter")
 router = APIRouter(prefix="/pedidos", tags=["Pedidos"])
@@ -32,12 +35,12 @@ def create_pedido_endpoint(
 
 # Get a Pedido by ID
 @router.get("/{pedido_id}", response_model=dict)
-def get_pedido_endpoint(
-    pedido_id: int, request: Request, db: Session = Depends(get_db)
+async def get_pedido_endpoint(
+    pedido_id: int, request: Request, db: AsyncSession = Depends(get_async_db)
 ):
     request_info = get_request_info(request)
     logger.info(f"Obteniendo pedido con ID: {pedido_id}", extra=request_info)
-    pedido = get_pedido_by_id(db, pedido_id)
+    pedido = await db.run_sync(get_pedido_by_id, pedido_id)
     if not pedido:
         logger.warning(f"Pedido con ID: {pedido_id} no encontrado", extra=request_info)
         raise HTTPException(status_code=404, detail="Pedido no encontrado")
@@ -65,58 +68,67 @@ def update_pedido_endpoint(
 
 # Get all Pedidos with pagination
 @router.get("/", response_model=list)
-def get_all_pedidos_endpoint(
+async def get_all_pedidos_endpoint(
     request: Request,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     limit: int = Query(10, ge=1),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    offset: int = Query(0, ge=0, deprecated=True, description=OFFSET_DESCRIPTION),
 ):
     request_info = get_request_info(request)
     logger.info("Obteniendo todos los pedidos", extra=request_info)
-    pedidos = get_all_pedidos(db, limit=limit, offset=offset)
+    pedidos = await db.run_sync(get_all_pedidos, limit=limit, cursor=cursor, offset=offset)
     if not pedidos:
         logger.warning("No se encontraron pedidos", extra=request_info)
         raise HTTPException(status_code=404, detail="No se encontraron pedidos")
+    agregar_cursor(response, pedidos)
     return pedidos
 
 
 # Get Pedidos by Empresa ID with pagination
 @router.get("/empresa/{empresa_id}", response_model=list)
-def get_pedidos_by_empresa_id_endpoint(
+async def get_pedidos_by_empresa_id_endpoint(
     empresa_id: int,
     request: Request,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     limit: int = Query(10, ge=1),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    offset: int = Query(0, ge=0, deprecated=True, description=OFFSET_DESCRIPTION),
 ):
     request_info = get_request_info(request)
     logger.info(f"Obteniendo pedidos para la empresa con ID: {empresa_id}", extra=request_info)
-    pedidos = get_pedidos_by_empresa_id(db, empresa_id, limit=limit, offset=offset)
+    pedidos = await db.run_sync(get_pedidos_by_empresa_id, empresa_id, limit=limit, cursor=cursor, offset=offset)
     if not pedidos:
         logger.warning(f"No se encontraron pedidos para la empresa con ID: {empresa_id}", extra=request_info)
         raise HTTPException(
             status_code=404, detail="No se encontraron pedidos para la empresa especificada"
         )
+    agregar_cursor(response, pedidos)
     return pedidos
 
 
 # Get Pedidos by Cliente ID with pagination
 @router.get("/cliente/{cliente_id}", response_model=list)
-def get_pedidos_by_cliente_id_endpoint(
+async def get_pedidos_by_cliente_id_endpoint(
     cliente_id: int,
     request: Request,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     limit: int = Query(10, ge=1),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    offset: int = Query(0, ge=0, deprecated=True, description=OFFSET_DESCRIPTION),
 ):
     request_info = get_request_info(request)
     logger.info(f"Obteniendo pedidos para el cliente con ID: {cliente_id}", extra=request_info)
-    pedidos = get_pedidos_by_cliente_id(db, cliente_id, limit=limit, offset=offset)
+    pedidos = await db.run_sync(get_pedidos_by_cliente_id, cliente_id, limit=limit, cursor=cursor, offset=offset)
     if not pedidos:
         logger.warning(f"No se encontraron pedidos para el cliente con ID: {cliente_id}", extra=request_info)
         raise HTTPException(
             status_code=404, detail="No se encontraron pedidos para el cliente especificado"
         )
+    agregar_cursor(response, pedidos)
     return pedidos
 
 
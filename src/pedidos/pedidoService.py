@@ -4,8 +4,9 @@ from src.pedidos.pedidoSchema import PedidoSchema, PedidoUpdateSchema
 from src.cliente.clienteService import get_cliente_by_id
 from src.empresa.empresaService import get_empresa_by_id
 from src.pedidos.detallePedido.detallePedidoModel import DetallePedido
-from src.producto.prodModel import Producto
+from src.producto.productoService import resolver_productos
 from src.monedas.dolar.dolarService import obtener_dolar_bcv
+from src.utils.pagination import Pagina, paginar
 
 
 # Create a new Pedido
@@ -28,19 +29,17 @@ def create_pedido(db: Session, pedido_data: PedidoSchema):
         total_pedido = 0
         detalles_pedido = []
 
+        # Resolve every product of the pedido in a single query
+        productos = resolver_productos(
+            db, [detalle_data["producto_id"] for detalle_data in pedido_data.detalles_pedido]
+        )
+
         # Process each detalle in the pedido
         for detalle_data in pedido_data.detalles_pedido:
-            producto = (
-                db.query(Producto)
-                .filter(Producto.id == detalle_data["producto_id"])
-                .first()
-            )
-            if not producto:
-                raise ValueError(
-                    f"El producto con ID {detalle_data['producto_id']} no existe."
-                )
+            producto = productos[detalle_data["producto_id"]]
             # Get the unit price of the product discount if applicable
             precio_unitario = producto.precio
+            descuento = 0
             if producto.descuento:
                 descuento = detalle_data['cantidad'] * precio_unitario * producto.descuento / 100 # Convert from % to bs
             total_detalle = (detalle_data["cantidad"] * precio_unitario) - descuento
@@ -56,7 +55,7 @@ def create_pedido(db: Session, pedido_data: PedidoSchema):
             )
             detalles_pedido.append(detalle_pedido)
 
-        # Create the pedido
+        # Create the pedido with its detalles; a single flush inserts everything
         pedido = Pedido(
             cliente_id=pedido_data.cliente_id,
             empresa_id=pedido_data.empresa_id,
@@ -64,17 +63,10 @@ def create_pedido(db: Session, pedido_data: PedidoSchema):
             tasa_cambio=tasa_cambio,
             total=total_pedido,
             observaciones=pedido_data.observaciones,
+            detalles=detalles_pedido,
         )
         db.add(pedido)
-        db.commit()
-        db.refresh(pedido)
-
-        # Add detalles to the pedido
-        for detalle in detalles_pedido:
-            detalle.pedido_id = pedido.id
-            db.add(detalle)
-
-        db.commit()
+        db.flush()
 
         # Convert Pedido object to dictionary
         pedido_dict = {
@@ -109,6 +101,8 @@ def create_pedido(db: Session, pedido_data: PedidoSchema):
         # Include detalles_pedido in the response
         pedido_dict["detalles_pedido"] = detalles_dict
 
+        # The response is built before the commit so no attribute has to be reloaded
+        db.commit()
         return pedido_dict
 
     except Exception as e:
@@ -205,17 +199,11 @@ def update_pedido(db: Session, pedido_id: int, pedido_data: PedidoUpdateSchema):
                 DetallePedido.pedido_id == pedido_id
             ).delete()
 
+            productos = resolver_productos(
+                db, [detalle_data.producto_id for detalle_data in pedido_data.detalles_pedido]
+            )
             for detalle_data in pedido_data.detalles_pedido:
-                producto = (
-                    db.query(Producto)
-                    .filter(Producto.id == detalle_data.producto_id)
-                    .first()
-                )
-                if not producto:
-                    raise ValueError(
-                        f"El producto con ID {detalle_data.producto_id} no existe."
-                    )
-
+                producto = productos[detalle_data.producto_id]
                 precio_unitario = producto.precio
                 total_detalle = detalle_data.cantidad * precio_unitario
                 total_pedido += total_detalle
@@ -253,145 +241,100 @@ def update_pedido(db: Session, pedido_id: int, pedido_data: PedidoUpdateSchema):
         raise ValueError(f"Error al actualizar el pedido: {str(e)}")
 
 
-# Get all Pedidos with pagination
-def get_all_pedidos(db: Session, limit: int = 10, offset: int = 0):
-    pedidos = db.query(Pedido).offset(offset).limit(limit).all()
-    pedidos_list = []
-
-    for pedido in pedidos:
-        detalles_pedido = (
-            db.query(DetallePedido).filter(DetallePedido.pedido_id == pedido.id).all()
-        )
-
-        pedido_dict = {
-            "id": pedido.id,
-            "cliente_id": pedido.cliente_id,
-            "empresa_id": pedido.empresa_id,
-            "estado": pedido.estado,
-            "fecha_creacion": pedido.fecha_creacion,
-            "fecha_actualizacion": pedido.fecha_actualizacion,
-            "fecha_vencimiento": pedido.fecha_vencimiento,
-            "total": float(pedido.total) if pedido.total else None,
-            "observaciones": pedido.observaciones,
-        }
-
-        detalles_dict = [
-            {
-                "id": detalle.id,
-                "producto_id": detalle.producto_id,
-                "cantidad": detalle.cantidad,
-                "precio_unitario": float(detalle.precio_unitario),
-                "alicuota_iva": (
-                    float(detalle.alicuota_iva) if detalle.alicuota_iva else None
-                ),
-                "descuento": float(detalle.descuento) if detalle.descuento else None,
-                "total": float(detalle.total),
-            }
-            for detalle in detalles_pedido
-        ]
+# Columns read by the listings (tuples, no ORM objects)
+COLUMNAS_PEDIDO = (
+    Pedido.id,
+    Pedido.cliente_id,
+    Pedido.empresa_id,
+    Pedido.estado,
+    Pedido.fecha_creacion,
+    Pedido.fecha_actualizacion,
+    Pedido.fecha_vencimiento,
+    Pedido.total,
+    Pedido.observaciones,
+)
+COLUMNAS_DETALLE = (
+    DetallePedido.pedido_id,
+    DetallePedido.id,
+    DetallePedido.producto_id,
+    DetallePedido.cantidad,
+    DetallePedido.precio_unitario,
+    DetallePedido.alicuota_iva,
+    DetallePedido.descuento,
+    DetallePedido.total,
+)
+
+
+def _serializar_detalle(fila) -> dict:
+    return {
+        "id": fila.id,
+        "producto_id": fila.producto_id,
+        "cantidad": fila.cantidad,
+        "precio_unitario": float(fila.precio_unitario),
+        "alicuota_iva": float(fila.alicuota_iva) if fila.alicuota_iva else None,
+        "descuento": float(fila.descuento) if fila.descuento else None,
+        "total": float(fila.total),
+    }
 
-        pedido_dict["detalles_pedido"] = detalles_dict
-        pedidos_list.append(pedido_dict)
 
-    return pedidos_list
+def _serializar_pedido(fila, detalles: list) -> dict:
+    return {
+        "id": fila.id,
+        "cliente_id": fila.cliente_id,
+        "empresa_id": fila.empresa_id,
+        "estado": fila.estado,
+        "fecha_creacion": fila.fecha_creacion,
+        "fecha_actualizacion": fila.fecha_actualizacion,
+        "fecha_vencimiento": fila.fecha_vencimiento,
+        "total": float(fila.total) if fila.total else None,
+        "observaciones": fila.observaciones,
+        "detalles_pedido": detalles,
+    }
 
 
-# Get Pedidos by Empresa ID with pagination
-def get_pedidos_by_empresa_id(db: Session, empresa_id: int, limit: int = 10, offset: int = 0):
-    pedidos = (
-        db.query(Pedido)
-        .filter(Pedido.empresa_id == empresa_id)
-        .offset(offset)
-        .limit(limit)
-        .all()
+def _listar_pedidos(db: Session, *filtros, limit: int, offset: int, cursor: str):
+    """
+    One query for the page of pedidos and one for all of their detalles,
+    regardless of the page size.
+    """
+    pedidos = paginar(
+        db.query(*COLUMNAS_PEDIDO).filter(*filtros), [Pedido.id], limit, cursor, offset
     )
-    pedidos_list = []
-
-    for pedido in pedidos:
-        detalles_pedido = (
-            db.query(DetallePedido).filter(DetallePedido.pedido_id == pedido.id).all()
+    detalles_por_pedido = {}
+    if pedidos:
+        detalles = (
+            db.query(*COLUMNAS_DETALLE)
+            .filter(DetallePedido.pedido_id.in_([pedido.id for pedido in pedidos]))
+            .order_by(DetallePedido.pedido_id, DetallePedido.id)
         )
+        for detalle in detalles:
+            detalles_por_pedido.setdefault(detalle.pedido_id, []).append(
+                _serializar_detalle(detalle)
+            )
 
-        pedido_dict = {
-            "id": pedido.id,
-            "cliente_id": pedido.cliente_id,
-            "empresa_id": pedido.empresa_id,
-            "estado": pedido.estado,
-            "fecha_creacion": pedido.fecha_creacion,
-            "fecha_actualizacion": pedido.fecha_actualizacion,
-            "fecha_vencimiento": pedido.fecha_vencimiento,
-            "total": float(pedido.total) if pedido.total else None,
-            "observaciones": pedido.observaciones,
-        }
-
-        detalles_dict = [
-            {
-                "id": detalle.id,
-                "producto_id": detalle.producto_id,
-                "cantidad": detalle.cantidad,
-                "precio_unitario": float(detalle.precio_unitario),
-                "alicuota_iva": (
-                    float(detalle.alicuota_iva) if detalle.alicuota_iva else None
-                ),
-                "descuento": float(detalle.descuento) if detalle.descuento else None,
-                "total": float(detalle.total),
-            }
-            for detalle in detalles_pedido
-        ]
+    return Pagina(
+        [_serializar_pedido(pedido, detalles_por_pedido.get(pedido.id, [])) for pedido in pedidos],
+        pedidos.next_cursor,
+    )
 
-        pedido_dict["detalles_pedido"] = detalles_dict
-        pedidos_list.append(pedido_dict)
 
-    return pedidos_list
+# Get all Pedidos with pagination
+def get_all_pedidos(db: Session, limit: int = 10, offset: int = 0, cursor: str = None):
+    return _listar_pedidos(db, limit=limit, offset=offset, cursor=cursor)
 
 
-# Get Pedidos by Cliente ID with pagination
-def get_pedidos_by_cliente_id(db: Session, cliente_id: int, limit: int = 10, offset: int = 0):
-    pedidos = (
-        db.query(Pedido)
-        .filter(Pedido.cliente_id == cliente_id)
-        .offset(offset)
-        .limit(limit)
-        .all()
+# Get Pedidos by Empresa ID with pagination
+def get_pedidos_by_empresa_id(db: Session, empresa_id: int, limit: int = 10, offset: int = 0, cursor: str = None):
+    return _listar_pedidos(
+        db, Pedido.empresa_id == empresa_id, limit=limit, offset=offset, cursor=cursor
     )
-    pedidos_list = []
-
-    for pedido in pedidos:
-        detalles_pedido = (
-            db.query(DetallePedido).filter(DetallePedido.pedido_id == pedido.id).all()
-        )
-
-        pedido_dict = {
-            "id": pedido.id,
-            "cliente_id": pedido.cliente_id,
-            "empresa_id": pedido.empresa_id,
-            "estado": pedido.estado,
-            "fecha_creacion": pedido.fecha_creacion,
-            "fecha_actualizacion": pedido.fecha_actualizacion,
-            "fecha_vencimiento": pedido.fecha_vencimiento,
-            "total": float(pedido.total) if pedido.total else None,
-            "observaciones": pedido.observaciones,
-        }
-
-        detalles_dict = [
-            {
-                "id": detalle.id,
-                "producto_id": detalle.producto_id,
-                "cantidad": detalle.cantidad,
-                "precio_unitario": float(detalle.precio_unitario),
-                "alicuota_iva": (
-                    float(detalle.alicuota_iva) if detalle.alicuota_iva else None
-                ),
-                "descuento": float(detalle.descuento) if detalle.descuento else None,
-                "total": float(detalle.total),
-            }
-            for detalle in detalles_pedido
-        ]
 
-        pedido_dict["detalles_pedido"] = detalles_dict
-        pedidos_list.append(pedido_dict)
 
-    return pedidos_list
+# Get Pedidos by Cliente ID with pagination
+def get_pedidos_by_cliente_id(db: Session, cliente_id: int, limit: int = 10, offset: int = 0, cursor: str = None):
+    return _listar_pedidos(
+        db, Pedido.cliente_id == cliente_id, limit=limit, offset=offset, cursor=cursor
+    )
 
 
 # # Delete a Pedido
@@ -0,0 +1,188 @@
+"""
+productoCache.py
+Caché en memoria del catálogo de productos (lectura a través de la caché).
+
+Cada producto se guarda una sola vez como diccionario y se indexa por id,
+codigo, codigo_barras y codigo_QR; la primera búsqueda por cualquiera de esas
+claves consulta la base de datos y las siguientes se responden desde memoria.
+Las claves que no existen también se recuerdan durante el TTL para que un
+código desconocido escaneado varias veces no consulte la base cada vez.
+El conjunto de productos exentos se carga una vez y se mantiene al crear o
+actualizar productos.
+
+`get_or_create_producto` y `update_producto` actualizan la caché después del
+commit. Los demás workers se enteran por el TTL o, si está activo, por el sello
+de `cache_stamp`.
+
+Environment Variables:
+- PRODUCTO_CACHE_TTL: Segundos que un producto permanece en caché (default 300).
+"""
+
+import os
+import threading
+import time
+
+from sqlalchemy.orm import Session
+
+from src.producto.prodModel import Producto
+from src.utils.cache_stamp import SelloCache
+
+PRODUCTO_CACHE_TTL = float(os.getenv("PRODUCTO_CACHE_TTL", "300"))
+
+CAMPOS_INDICE = ("codigo", "codigo_barras", "codigo_QR")
+# Límite de claves inexistentes recordadas (se vacía al alcanzarlo)
+MAX_AUSENTES = 10000
+
+
+class ProductoCache:
+    def __init__(self, ttl: float = PRODUCTO_CACHE_TTL, sello: SelloCache = None):
+        self.ttl = ttl
+        self.sello = sello or SelloCache("producto")
+        self._lock = threading.RLock()
+        self._productos = {}  # id -> (datos, expira)
+        self._indices = {campo: {} for campo in CAMPOS_INDICE}  # valor -> id
+        self._ausentes = {}  # (campo, valor) -> expira
+        self._exentos = None  # ids exentos, None si aún no se cargaron
+        self._exentos_expira = 0.0
+        # Se incrementa en cada invalidación; una carga iniciada antes no se guarda
+        self._generacion = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidaciones = 0
+
+    # region Lectura
+    def obtener(self, db: Session, campo: str, valor):
+        """Devuelve el producto con `campo == valor` como diccionario, o None."""
+        self._sincronizar(db)
+        ahora = time.monotonic()
+        with self._lock:
+            datos = self._buscar(campo, valor, ahora)
+            if datos is not None or self._ausentes.get((campo, valor), 0) > ahora:
+                self.hits += 1
+                return dict(datos) if datos is not None else None
+            self.misses += 1
+            generacion = self._generacion
+
+        producto = db.query(Producto).filter(getattr(Producto, campo) == valor).first()
+        with self._lock:
+            if generacion != self._generacion:
+                return producto.to_dict() if producto else None
+            if producto is None:
+                if len(self._ausentes) >= MAX_AUSENTES:
+                    self._ausentes.clear()
+                self._ausentes[(campo, valor)] = ahora + self.ttl
+                return None
+            datos = producto.to_dict()
+            self._guardar(datos, ahora)
+            return dict(datos)
+
+    def exentos(self, db: Session) -> list:
+        """Lista de productos exentos; se consulta la base solo si el conjunto no está cargado."""
+        self._sincronizar(db)
+        ahora = time.monotonic()
+        with self._lock:
+            if self._exentos is not None and self._exentos_expira > ahora:
+                ids = sorted(self._exentos)
+                filas = [self._vigente(i, ahora) for i in ids]
+                if all(fila is not None for fila in filas):
+                    self.hits += 1
+                    return [dict(fila) for fila in filas]
+            self.misses += 1
+            generacion = self._generacion
+
+        productos = db.query(Producto).filter(Producto.exento).order_by(Producto.id).all()
+        filas = [producto.to_dict() for producto in productos]
+        with self._lock:
+            if generacion == self._generacion:
+                for datos in filas:
+                    self._guardar(datos, ahora)
+                self._exentos = {datos["id"] for datos in filas}
+                self._exentos_expira = ahora + self.ttl
+        return [dict(datos) for datos in filas]
+
+    def _vigente(self, producto_id, ahora):
+        entrada = self._productos.get(producto_id)
+        if entrada is None or entrada[1] <= ahora:
+            return None
+        return entrada[0]
+
+    def _buscar(self, campo, valor, ahora):
+        if campo == "id":
+            return self._vigente(valor, ahora)
+        producto_id = self._indices[campo].get(valor)
+        if producto_id is None:
+            return None
+        datos = self._vigente(producto_id, ahora)
+        # El índice puede apuntar a un producto cuyo código cambió
+        if datos is None or datos.get(campo) != valor:
+            return None
+        return datos
+
+    # endregion
+
+    # region Escritura
+    def _guardar(self, datos: dict, ahora: float):
+        anterior = self._productos.get(datos["id"])
+        if anterior is not None:
+            for campo in CAMPOS_INDICE:
+                valor = anterior[0].get(campo)
+                if valor is not None and self._indices[campo].get(valor) == datos["id"]:
+                    del self._indices[campo][valor]
+        self._productos[datos["id"]] = (datos, ahora + self.ttl)
+        for campo in CAMPOS_INDICE:
+            valor = datos.get(campo)
+            if valor is not None:
+                self._indices[campo][valor] = datos["id"]
+                self._ausentes.pop((campo, valor), None)
+        self._ausentes.pop(("id", datos["id"]), None)
+        if self._exentos is not None:
+            if datos.get("exento"):
+                self._exentos.add(datos["id"])
+            else:
+                self._exentos.discard(datos["id"])
+
+    def actualizar(self, producto: Producto):
+        """Reemplaza la entrada de un producto recién creado o modificado (después del commit)."""
+        with self._lock:
+            self._generacion += 1
+            self.invalidaciones += 1
+            self._guardar(producto.to_dict(), time.monotonic())
+
+    def publicar_cambio(self, db: Session):
+        """Avisa a los demás workers dentro de la transacción que modifica el catálogo."""
+        self.sello.incrementar(db)
+
+    def limpiar(self):
+        with self._lock:
+            self._generacion += 1
+            self.invalidaciones += 1
+            self._productos.clear()
+            for indice in self._indices.values():
+                indice.clear()
+            self._ausentes.clear()
+            self._exentos = None
+
+    def _sincronizar(self, db: Session):
+        if self.sello.cambio(db):
+            self.limpiar()
+
+    # endregion
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "productos": len(self._productos),
+                "exentos": len(self._exentos) if self._exentos is not None else None,
+                "ausentes": len(self._ausentes),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / consultas, 4) if consultas else None,
+                "invalidaciones": self.invalidaciones,
+                "ttl_segundos": self.ttl,
+                "sello_activo": self.sello.activo,
+                "version_sello": self.sello.version,
+            }
+
+
+producto_cache = ProductoCache()
@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, Query
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_async_db, get_db
 from src.producto.productoService import (
     get_producto_by_id,
     get_all_productos,
@@ -13,6 +15,7 @@ from src.producto.productoService import (
 )
 from src.producto.productoSchema import ProductoSchema, ProductoUpdateSchema
 from src.loggers.loggerService import get_logger, get_request_info
+from src.utils.pagination import CURSOR_DESCRIPTION, OFFSET_DESCRIPTION, agregar_cursor
 
 logger = get_logger("ProductoRouter")
 
@@ -20,23 +23,29 @@ router = APIRouter(prefix="/producto", tags=["Producto"])
 
 
 @router.get("/")
-def get_productos(
-    request: Request, db: Session = Depends(get_db), limit: int = Query(10, ge=1), offset: int = Query(0, ge=0)
+async def get_productos(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    limit: int = Query(10, ge=1),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    offset: int = Query(0, ge=0, deprecated=True, description=OFFSET_DESCRIPTION),
 ):
     request_info = get_request_info(request)
     logger.info("Obteniendo todos los productos", extra=request_info)
-    productos = get_all_productos(db, limit=limit, offset=offset)
+    productos = await db.run_sync(get_all_productos, limit=limit, cursor=cursor, offset=offset)
     if not productos:
         logger.warning("No se encontraron productos", extra=request_info)
         raise HTTPException(status_code=404, detail="No se encontraron productos")
+    agregar_cursor(response, productos)
     return productos
 
 
 @router.get("/{producto_id}")
-def get_producto(producto_id: int, request: Request, db: Session = Depends(get_db)):
+async def get_producto(producto_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
     request_info = get_request_info(request)
     logger.info(f"Obteniendo producto con ID: {producto_id}", extra=request_info)
-    producto = get_producto_by_id(db, producto_id)
+    producto = await db.run_sync(get_producto_by_id, producto_id)
     if not producto:
         logger.warning(f"Producto con ID: {producto_id} no encontrado", extra=request_info)
         raise HTTPException(status_code=404, detail="Producto no encontrado")
@@ -44,34 +53,34 @@ def get_producto(producto_id: int, request: Request, db: Session = Depends(get_d
 
 
 @router.get("/codigo/{codigo}")
-def get_producto_by_codigo_router(codigo: str, db: Session = Depends(get_db)):
-    producto = get_producto_by_codigo(db, codigo)
+async def get_producto_by_codigo_router(codigo: str, db: AsyncSession = Depends(get_async_db)):
+    producto = await db.run_sync(get_producto_by_codigo, codigo)
     if not producto:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
     return producto
 
 
 @router.get("/codigo_barras/{codigo_barras}")
-def get_producto_by_codigo_barras_router(
-    codigo_barras: str, db: Session = Depends(get_db)
+async def get_producto_by_codigo_barras_router(
+    codigo_barras: str, db: AsyncSession = Depends(get_async_db)
 ):
-    producto = get_producto_by_codigo_barras(db, codigo_barras)
+    producto = await db.run_sync(get_producto_by_codigo_barras, codigo_barras)
     if not producto:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
     return producto
 
 
 @router.get("/codigo_QR/{codigo_QR}")
-def get_producto_by_codigo_QR_router(codigo_QR: str, db: Session = Depends(get_db)):
-    producto = get_producto_by_codigo_QR(db, codigo_QR)
+async def get_producto_by_codigo_QR_router(codigo_QR: str, db: AsyncSession = Depends(get_async_db)):
+    producto = await db.run_sync(get_producto_by_codigo_QR, codigo_QR)
     if not producto:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
     return producto
 
 
 @router.get("/exento")
-def get_producto_exento_router(db: Session = Depends(get_db)):
-    return get_producto_exento(db)
+async def get_producto_exento_router(db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(get_producto_exento)
 
 
 @router.post("/create")
@@ -1,31 +1,56 @@
 from sqlalchemy.orm import Session
+from src.utils.pagination import paginar
 from src.producto.prodModel import Producto
+from src.producto.productoCache import producto_cache
 from src.producto.productoSchema import ProductoSchema, ProductoUpdateSchema
 import random
 
 
-def get_all_productos(db: Session, limit: int = 10, offset: int = 0):
-    return db.query(Producto).offset(offset).limit(limit).all()
+def get_all_productos(db: Session, limit: int = 10, offset: int = 0, cursor: str = None):
+    return paginar(db.query(Producto), [Producto.id], limit, cursor, offset)
 
 
 def get_producto_by_id(db: Session, producto_id: int):
-    return db.query(Producto).filter(Producto.id == producto_id).first()
+    return producto_cache.obtener(db, "id", producto_id)
 
 
 def get_producto_by_codigo(db: Session, codigo: str):
-    return db.query(Producto).filter(Producto.codigo == codigo).first()
+    return producto_cache.obtener(db, "codigo", codigo)
 
 
 def get_producto_by_codigo_barras(db: Session, codigo_barras: str):
-    return db.query(Producto).filter(Producto.codigo_barras == codigo_barras).first()
+    return producto_cache.obtener(db, "codigo_barras", codigo_barras)
 
 
 def get_producto_by_codigo_QR(db: Session, codigo_QR: str):
-    return db.query(Producto).filter(Producto.codigo_QR == codigo_QR).first()
+    return producto_cache.obtener(db, "codigo_QR", codigo_QR)
+
+
+def resolver_productos(db: Session, producto_ids) -> dict:
+    """
+    Carga en una sola consulta los productos indicados y los devuelve por ID.
+    Acepta los IDs de uno o varios pedidos; si falta alguno, lanza ValueError
+    con todos los IDs inexistentes.
+    """
+    ids = set(producto_ids)
+    productos = {}
+    if ids:
+        productos = {
+            producto.id: producto
+            for producto in db.query(Producto).filter(Producto.id.in_(ids))
+        }
+    faltantes = sorted(ids - productos.keys())
+    if len(faltantes) == 1:
+        raise ValueError(f"El producto con ID {faltantes[0]} no existe.")
+    if faltantes:
+        raise ValueError(
+            f"Los productos con ID {', '.join(str(i) for i in faltantes)} no existen."
+        )
+    return productos
 
 
 def get_producto_exento(db: Session):
-    return db.query(Producto).filter(Producto.exento).all()
+    return producto_cache.exentos(db)
 
 
 def generate_unique_codigo(db: Session) -> str:
@@ -48,8 +73,10 @@ def get_or_create_producto(db: Session, producto_data: ProductoSchema):
         producto.codigo_barras = generate_unique_codigo(db)
         producto.codigo_QR = generate_unique_codigo(db)
         db.add(producto)
+        producto_cache.publicar_cambio(db)
         db.commit()
         db.refresh(producto)
+        producto_cache.actualizar(producto)
         return producto
     return {"detail": "Producto ya existe.", "producto": producto}
 
@@ -59,6 +86,8 @@ def update_producto(db: Session, producto_id: int, producto_data: ProductoUpdate
     if producto:
         for key, value in producto_data.model_dump(exclude_unset=True).items():
             setattr(producto, key, value)
+        producto_cache.publicar_cambio(db)
         db.commit()
         db.refresh(producto)
+        producto_cache.actualizar(producto)
     return producto
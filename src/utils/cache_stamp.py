@@ -0,0 +1,91 @@
+"""
+cache_stamp.py
+Señal de invalidación entre procesos para las cachés en memoria.
+
+Cada caché tiene una fila en `cache_stamp` con un número de versión. El proceso
+que modifica los datos incrementa la versión dentro de su propia transacción;
+los demás workers la consultan como máximo cada CACHE_STAMP_INTERVAL segundos
+y vacían su caché cuando cambia. La consulta usa la sesión del llamador (dentro
+de `AsyncSession.run_sync` esa sesión no bloquea el event loop), en un
+SAVEPOINT para que un error no deje abortada su transacción. Con el intervalo en 0 la señal queda
+desactivada y cada caché depende solo de su TTL.
+
+Environment Variables:
+- CACHE_STAMP_INTERVAL: Segundos entre consultas de la versión (0 = desactivado).
+"""
+
+import os
+import threading
+import time
+
+from sqlalchemy import Column, Integer, String, update
+from sqlalchemy.orm import Session
+
+from database import Base
+from src.loggers.loggerService import get_logger
+
+CACHE_STAMP_INTERVAL = float(os.getenv("CACHE_STAMP_INTERVAL", "0"))
+
+logger = get_logger("cache_stamp")
+
+
+class CacheStamp(Base):
+    __tablename__ = "cache_stamp"
+
+    nombre = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+class SelloCache:
+    """Versión compartida de una caché, consultada con un intervalo mínimo."""
+
+    def __init__(self, nombre: str, intervalo: float = CACHE_STAMP_INTERVAL):
+        self.nombre = nombre
+        self.intervalo = intervalo
+        self._version = None
+        self._proxima_consulta = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def activo(self) -> bool:
+        return self.intervalo > 0
+
+    @property
+    def version(self):
+        return self._version
+
+    def incrementar(self, db: Session):
+        """Incrementa la versión en la transacción actual de `db` (se publica con su commit)."""
+        if not self.activo:
+            return
+        actualizadas = db.execute(
+            update(CacheStamp)
+            .where(CacheStamp.nombre == self.nombre)
+            .values(version=CacheStamp.version + 1)
+        ).rowcount
+        if not actualizadas:
+            db.add(CacheStamp(nombre=self.nombre, version=1))
+
+    def cambio(self, db: Session) -> bool:
+        """
+        Indica si otro proceso publicó una versión nueva desde la última consulta.
+        Consulta la base de datos con `db` como máximo una vez por intervalo.
+        """
+        if not self.activo:
+            return False
+        ahora = time.monotonic()
+        with self._lock:
+            if ahora < self._proxima_consulta:
+                return False
+            self._proxima_consulta = ahora + self.intervalo
+        try:
+            with db.begin_nested():
+                version = db.query(CacheStamp.version).filter(
+                    CacheStamp.nombre == self.nombre
+                ).scalar() or 0
+        except Exception as e:
+            logger.warning(f"No se pudo consultar la versión de la caché {self.nombre}: {str(e)}")
+            return False
+        with self._lock:
+            anterior, self._version = self._version, version
+        return anterior is not None and anterior != version
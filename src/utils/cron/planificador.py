@@ -0,0 +1,256 @@
+"""
+planificador.py
+Planificador de tareas periódicas con un único líder entre los workers.
+
+Cada worker de uvicorn arranca un hilo de elección que intenta tomar un lock
+exclusivo: en Postgres, `pg_try_advisory_lock` sobre una conexión dedicada que
+se mantiene abierta; con otras bases (SQLite en desarrollo), un `flock` sobre
+un archivo local. Solo el worker que tiene el lock arranca el
+BackgroundScheduler con los jobs registrados, así que cada job corre una vez
+por despliegue y no una vez por worker.
+
+Si el líder muere, su conexión (o su proceso) se cierra y el lock se libera;
+otro worker lo toma en el siguiente intento de elección. El líder comprueba su
+conexión en cada intervalo y, si la pierde, detiene sus jobs y vuelve a
+competir.
+
+Los jobs se registran con `registrar_job` al importar su módulo. Los marcados
+con `al_iniciar=True` corren una vez apenas el worker se vuelve líder, en el
+hilo del scheduler y no en el arranque de la aplicación.
+
+Environment Variables:
+- SCHEDULER_LOCK_ID: Clave del advisory lock de Postgres (default 4702111234).
+- SCHEDULER_LOCK_FILE: Archivo del lock cuando la base no es Postgres.
+- SCHEDULER_ELECCION_INTERVALO: Segundos entre intentos de elección y comprobaciones del líder (default 15).
+"""
+
+import os
+import tempfile
+import threading
+from datetime import datetime
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from sqlalchemy import text
+
+from database import engine
+from src.loggers.loggerService import get_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin flock, cada proceso se considera líder
+    fcntl = None
+
+SCHEDULER_LOCK_ID = int(os.getenv("SCHEDULER_LOCK_ID", "4702111234"))
+SCHEDULER_LOCK_FILE = os.getenv(
+    "SCHEDULER_LOCK_FILE",
+    os.path.join(tempfile.gettempdir(), "facturacion-planificador.lock"),
+)
+SCHEDULER_ELECCION_INTERVALO = float(os.getenv("SCHEDULER_ELECCION_INTERVALO", "15"))
+
+logger = get_logger("planificador")
+
+# Jobs registrados: (funcion, id, trigger, al_iniciar, argumentos del trigger)
+_jobs = []
+_lock = threading.Lock()
+_detener = threading.Event()
+_hilo = None
+_scheduler = None
+_conexion = None
+_archivo = None
+_estado = {"es_lider": False, "elecciones_ganadas": 0, "liderazgos_perdidos": 0, "lider_desde": None}
+
+
+def registrar_job(funcion, id: str, trigger: str = "interval", al_iniciar: bool = False, **trigger_args):
+    """
+    Registra un job periódico; solo lo ejecuta el worker líder.
+
+    Args:
+        funcion: Función sin argumentos a ejecutar.
+        id: Identificador único del job.
+        trigger: Trigger de APScheduler ("interval" o "cron").
+        al_iniciar: Si es True, corre también apenas el worker se vuelve líder.
+        **trigger_args: Argumentos del trigger, p. ej. hours=12.
+    """
+    with _lock:
+        if any(job[1] == id for job in _jobs):
+            return
+        _jobs.append((funcion, id, trigger, al_iniciar, trigger_args))
+        if _scheduler is not None:
+            _agregar(_scheduler, funcion, id, trigger, al_iniciar, trigger_args)
+
+
+def _agregar(scheduler, funcion, id, trigger, al_iniciar, trigger_args):
+    if al_iniciar:
+        trigger_args = {**trigger_args, "next_run_time": datetime.now()}
+    # Una ejecución a la vez; las atrasadas se juntan en una sola
+    scheduler.add_job(
+        funcion, trigger, id=id, max_instances=1, coalesce=True, **trigger_args
+    )
+
+
+# region Lock de líder
+def _tomar_lock() -> bool:
+    global _conexion, _archivo
+    if engine.dialect.name == "postgresql":
+        conexion = engine.connect()
+        try:
+            tomado = conexion.execute(
+                text("SELECT pg_try_advisory_lock(:clave)"), {"clave": SCHEDULER_LOCK_ID}
+            ).scalar()
+            # El advisory lock es de sesión: sobrevive al fin de la transacción
+            conexion.commit()
+        except Exception:
+            conexion.close()
+            raise
+        if tomado:
+            _conexion = conexion
+        else:
+            conexion.close()
+        return bool(tomado)
+
+    if fcntl is None:
+        return True
+    archivo = open(SCHEDULER_LOCK_FILE, "a")
+    try:
+        fcntl.flock(archivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        archivo.close()
+        return False
+    _archivo = archivo
+    return True
+
+
+def _lock_vigente() -> bool:
+    """El líder comprueba que su conexión (y con ella el lock) siga viva."""
+    if _conexion is None:
+        return True
+    try:
+        _conexion.execute(text("SELECT 1"))
+        _conexion.commit()
+        return True
+    except Exception:
+        return False
+
+
+def _soltar_lock():
+    global _conexion, _archivo
+    if _conexion is not None:
+        try:
+            _conexion.execute(
+                text("SELECT pg_advisory_unlock(:clave)"), {"clave": SCHEDULER_LOCK_ID}
+            )
+            _conexion.commit()
+        except Exception:
+            pass  # Si la conexión murió, Postgres ya liberó el lock
+        finally:
+            # invalidate: la conexión no vuelve al pool con el lock tomado
+            _conexion.invalidate()
+            _conexion.close()
+            _conexion = None
+    if _archivo is not None:
+        _archivo.close()  # Cerrar el archivo libera el flock
+        _archivo = None
+
+
+# endregion
+
+
+def _asumir_liderazgo():
+    global _scheduler
+    scheduler = BackgroundScheduler()
+    with _lock:
+        for funcion, id, trigger, al_iniciar, trigger_args in _jobs:
+            _agregar(scheduler, funcion, id, trigger, al_iniciar, trigger_args)
+        scheduler.start()
+        _scheduler = scheduler
+        _estado["es_lider"] = True
+        _estado["elecciones_ganadas"] += 1
+        _estado["lider_desde"] = datetime.now()
+    logger.info(f"Worker {os.getpid()} elegido líder del planificador ({len(_jobs)} jobs).")
+
+
+def _ceder_liderazgo(esperar: bool = False):
+    """
+    Detiene el scheduler de este worker y suelta el lock. Con `esperar`, espera a
+    que terminen los jobs en curso (apagado); al perder el lock no se espera,
+    para que el bucle de elección vuelva a competir de inmediato.
+    """
+    global _scheduler
+    with _lock:
+        scheduler, _scheduler = _scheduler, None
+        if _estado["es_lider"]:
+            _estado["liderazgos_perdidos"] += 1
+        _estado["es_lider"] = False
+        _estado["lider_desde"] = None
+    if scheduler is not None:
+        scheduler.shutdown(wait=esperar)
+    _soltar_lock()
+
+
+def _bucle_eleccion():
+    while not _detener.is_set():
+        try:
+            if not _estado["es_lider"]:
+                if _tomar_lock():
+                    _asumir_liderazgo()
+            elif not _lock_vigente():
+                logger.warning("El líder del planificador perdió su lock; vuelve a competir.")
+                _ceder_liderazgo()
+                continue  # Reintentar de inmediato
+        except Exception as e:
+            logger.error(f"Error en la elección del planificador: {e}")
+        _detener.wait(SCHEDULER_ELECCION_INTERVALO)
+
+
+def iniciar_planificador():
+    """Arranca el hilo de elección; no bloquea el arranque de la aplicación."""
+    global _hilo
+    if _hilo is not None:
+        return
+    _detener.clear()
+    _hilo = threading.Thread(target=_bucle_eleccion, name="planificador-eleccion", daemon=True)
+    _hilo.start()
+    print("Planificador de tareas iniciado.")
+
+
+def detener_planificador(timeout: float = 10):
+    """
+    Detiene los jobs (si este worker es el líder), esperando a que terminen los
+    que están en curso, y libera el lock. Bloquea: desde el lifespan se llama
+    en el threadpool.
+    """
+    global _hilo
+    _detener.set()
+    if _hilo is not None:
+        _hilo.join(timeout)
+        _hilo = None
+    _ceder_liderazgo(esperar=True)
+    print("Planificador de tareas detenido.")
+
+
+def get_planificador_stats() -> dict:
+    with _lock:
+        jobs = []
+        for funcion, id, trigger, al_iniciar, trigger_args in _jobs:
+            job = _scheduler.get_job(id) if _scheduler is not None else None
+            jobs.append(
+                {
+                    "id": id,
+                    "trigger": trigger,
+                    "al_iniciar": al_iniciar,
+                    "proxima_ejecucion": (
+                        job.next_run_time.isoformat() if job and job.next_run_time else None
+                    ),
+                }
+            )
+        return {
+            "pid": os.getpid(),
+            "es_lider": _estado["es_lider"],
+            "lider_desde": (
+                _estado["lider_desde"].isoformat() if _estado["lider_desde"] else None
+            ),
+            "elecciones_ganadas": _estado["elecciones_ganadas"],
+            "liderazgos_perdidos": _estado["liderazgos_perdidos"],
+            "intervalo_eleccion": SCHEDULER_ELECCION_INTERVALO,
+            "jobs": jobs,
+        }
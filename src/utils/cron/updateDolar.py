@@ -1,5 +1,6 @@
-from apscheduler.schedulers.background import BackgroundScheduler
 from src.monedas.dolar.dolarService import actualizar_dolar_unico
+from src.utils.cron.planificador import registrar_job
+from src.utils.tasa_proveedores import obtenedor_tasa
 from database import SessionLocal
 
 
@@ -7,10 +8,12 @@ def actualizar_dolar_job():
     """Función que se ejecutará en el cron job para actualizar el dólar."""
     db = SessionLocal()
     try:
-        resultado = actualizar_dolar_unico(db)
+        # Consulta las fuentes de tasa en paralelo, con timeouts y reintentos
+        resultado = actualizar_dolar_unico(db, obtenedor_tasa)
         if isinstance(resultado, dict) and "error" in resultado:
-            # Manejar el caso de error
+            # Manejar el caso de error (el detalle por fuente ayuda a diagnosticar)
             print(f"Error al actualizar el dólar: {resultado['error']}")
+            print(f"Fuentes de tasa: {obtenedor_tasa.get_stats()['fuentes']}")
         else:
             # Manejar el caso exitoso
             print(f"Dólar actualizado: {resultado}")
@@ -18,26 +21,5 @@ def actualizar_dolar_job():
         db.close()
 
 
-# Crear una instancia global del scheduler
-scheduler = BackgroundScheduler()
-
-
-def iniciar_cron_job():
-    """Configura y arranca el cron job."""
-    # Evitar agregar múltiples trabajos si el scheduler ya está en ejecución
-    if not scheduler.running:
-        # Ejecutar cada 12 horas
-        scheduler.add_job(actualizar_dolar_job, "interval", hours=12)
-        scheduler.start()
-        print("Cron job para actualizar el dólar configurado.")
-
-    # Ejecutar la tarea inmediatamente al iniciar
-    actualizar_dolar_job()
-    print("Tarea de actualización del dólar ejecutada al inicio.")
-
-
-def detener_cron_job():
-    """Detiene el cron job."""
-    if scheduler.running:
-        scheduler.shutdown(wait=False)
-        print("Cron job para actualizar el dólar detenido.")
+# Cada 12 horas y una vez apenas el worker se vuelve líder del planificador
+registrar_job(actualizar_dolar_job, "actualizar_dolar", hours=12, al_iniciar=True)
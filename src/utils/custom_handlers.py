@@ -1,36 +1,51 @@
 from fastapi import Request
 from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 import logging
 import os
 import secrets
-from core import oauth
+from core import get_oauth
 
-async def authentik_swagger_protection(request: Request, call_next):
+class AuthentikSwaggerProtectionMiddleware:
     """
-    Middleware to protect Swagger documentation.
+    Middleware ASGI to protect Swagger documentation.
     Redirects to Authentik for authentication using the registered OAuth client.
+
+    Only requests to /docs without a token cookie are intercepted; every other
+    request is passed straight to the application without wrapping its body.
+    Must run inside SessionMiddleware, since the OAuth client stores its state
+    in the session.
     """
-    if request.url.path == "/docs":
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] != "/docs":
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope, receive)
         token = request.cookies.get("token")
-        if not token:
-            logging.info("No token found in cookies. Redirecting to Authentik.")
-            redirect_uri = os.getenv("AUTHENTIK_REDIRECT_URI")
+        if token:
+            await self.app(scope, receive, send)
+            return
 
-            # Generate a unique state
-            state = secrets.token_urlsafe(16)
+        logging.info("No token found in cookies. Redirecting to Authentik.")
+        redirect_uri = os.getenv("AUTHENTIK_REDIRECT_URI")
 
-            # Redirect to the OAuth provider with the state
-            response = await oauth.authentik.authorize_redirect(
-                request, redirect_uri, state=state
-            )
+        # Generate a unique state
+        state = secrets.token_urlsafe(16)
 
-            # Store the state in a cookie
-            response.set_cookie(key="oauth_state", value=state, httponly=True)
+        # Redirect to the OAuth provider with the state
+        response = await get_oauth().authentik.authorize_redirect(
+            request, redirect_uri, state=state
+        )
 
-            return response
+        # Store the state in a cookie
+        response.set_cookie(key="oauth_state", value=state, httponly=True)
 
-    response = await call_next(request)
-    return response
+        await response(scope, receive, send)
 
 
 async def custom_404_handler(request: Request, exc):
@@ -41,3 +56,10 @@ async def custom_404_handler(request: Request, exc):
         status_code=404,
         content={"message": "La ruta que intentas acceder no existe. Por favor verifica la URL."},
     )
+
+
+async def cursor_invalido_handler(request: Request, exc):
+    """
+    Handler for invalid pagination cursors (CursorInvalidoError).
+    """
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
@@ -0,0 +1,135 @@
+"""
+db_pool.py
+Pool de conexiones de SQLAlchemy instrumentado.
+
+InstrumentedQueuePool es un QueuePool que mide cada checkout: cuánto esperó la
+petición por una conexión, cuántas conexiones hay en uso, cuándo se abrió una
+conexión de overflow (más allá de DB_POOL_SIZE) y cuántas peticiones agotaron
+DB_POOL_TIMEOUT. Con esos datos (`/monitoreo/db`) se dimensionan DB_POOL_SIZE y
+DB_MAX_OVERFLOW en lugar de adivinar.
+
+database.py lo usa como poolclass del engine (y la variante asíncrona en el
+engine de get_async_db); las métricas sobreviven a `engine.dispose()` (que
+recrea el pool).
+"""
+
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class MetricasPool:
+    """Tiempos de espera por conexión y eventos del pool."""
+
+    def __init__(self, window: int = 1000):
+        self._esperas = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.counters = {
+            "checkouts": 0,
+            # Checkouts que encontraron el pool y el overflow agotados y esperaron
+            "en_cola": 0,
+            "overflow": 0,
+            "timeouts": 0,
+        }
+        self.max_en_uso = 0
+        self.max_espera_ms = 0.0
+        self.total_espera_ms = 0.0
+
+    def registrar_checkout(self, espera_ms: float, en_cola: bool, overflow: bool, en_uso: int):
+        with self._lock:
+            self.counters["checkouts"] += 1
+            self.counters["en_cola"] += en_cola
+            self.counters["overflow"] += overflow
+            self._esperas.append(espera_ms)
+            self.total_espera_ms += espera_ms
+            self.max_espera_ms = max(self.max_espera_ms, espera_ms)
+            self.max_en_uso = max(self.max_en_uso, en_uso)
+
+    def registrar_timeout(self, espera_ms: float):
+        with self._lock:
+            self.counters["timeouts"] += 1
+            self.max_espera_ms = max(self.max_espera_ms, espera_ms)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            esperas = sorted(self._esperas)
+            checkouts = self.counters["checkouts"]
+
+            def percentile(p):
+                if not esperas:
+                    return None
+                return round(esperas[min(int(len(esperas) * p), len(esperas) - 1)], 3)
+
+            return {
+                **self.counters,
+                "max_en_uso": self.max_en_uso,
+                "espera_avg_ms": (
+                    round(self.total_espera_ms / checkouts, 3) if checkouts else None
+                ),
+                "espera_p50_ms": percentile(0.50),
+                "espera_p95_ms": percentile(0.95),
+                "espera_p99_ms": percentile(0.99),
+                "espera_max_ms": round(self.max_espera_ms, 3),
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que registra la espera de cada checkout en `metricas`."""
+
+    def __init__(self, *args, metricas: MetricasPool = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metricas = metricas or MetricasPool()
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        overflow_antes = self._overflow
+        en_cola = (
+            self._max_overflow > -1
+            and self._overflow >= self._max_overflow
+            and self._pool.empty()
+        )
+        try:
+            conexion = super()._do_get()
+        except exc.TimeoutError:
+            self.metricas.registrar_timeout((time.perf_counter() - inicio) * 1000)
+            raise
+        self.metricas.registrar_checkout(
+            (time.perf_counter() - inicio) * 1000,
+            en_cola,
+            # _overflow es negativo mientras hay lugar dentro de pool_size
+            overflow=self._overflow > max(overflow_antes, 0),
+            en_uso=self.checkedout(),
+        )
+        return conexion
+
+    def recreate(self):
+        # engine.dispose() crea un pool nuevo; se conservan las métricas
+        nuevo = super().recreate()
+        nuevo.metricas = self.metricas
+        return nuevo
+
+
+class InstrumentedAsyncAdaptedQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    """Variante para el engine asíncrono (create_async_engine)."""
+
+
+def get_pool_stats(engine) -> dict:
+    """Configuración, estado actual y métricas del pool de un engine."""
+    pool = engine.pool
+    if not isinstance(pool, InstrumentedQueuePool):
+        return {"pool": type(pool).__name__, "status": pool.status()}
+    return {
+        "pool": type(pool).__name__,
+        "pool_size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "timeout_segundos": pool.timeout(),
+        "recycle_segundos": pool._recycle,
+        "pre_ping": pool._pre_ping,
+        "en_uso": pool.checkedout(),
+        "libres": pool.checkedin(),
+        "overflow_actual": max(pool.overflow(), 0),
+        **pool.metricas.snapshot(),
+    }
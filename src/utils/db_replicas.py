@@ -0,0 +1,305 @@
+"""
+db_replicas.py
+Enrutamiento de lecturas a réplicas de la base de datos.
+
+Las rutas GET de solo lectura (las que usan get_async_db) se sirven desde una
+de las réplicas de DB_REPLICA_URLS, elegida en round-robin entre las sanas.
+Todo lo demás (get_db: creaciones, `get_or_create_*`, `create_pedido`,
+actualizaciones y los jobs) sigue en el primario de SQLALCHEMY_DATABASE_URL.
+
+Salud: un hilo comprueba cada DB_REPLICA_CHECK_INTERVAL segundos que cada
+réplica responda y, en Postgres, que su retraso de replicación no supere
+DB_REPLICA_MAX_LAG. Un error de conexión durante una lectura la marca caída de
+inmediato; vuelve a recibir lecturas cuando pasa la siguiente comprobación. Sin
+réplicas sanas las lecturas van al primario.
+
+Lectura de las propias escrituras: ConsistenciaLecturaMiddleware registra cada
+petición que modifica datos (POST, PUT, PATCH o DELETE con respuesta exitosa)
+por usuario (o IP) y en la cookie `db_escritura`. Durante los
+DB_READ_YOUR_WRITES segundos siguientes las lecturas de ese cliente van al
+primario, así no lee una réplica que todavía no recibió su cambio. La cookie
+cubre a los clientes que pasan por otro worker; el registro en memoria, a los
+que no guardan cookies. Una cookie con un momento futuro se ignora.
+
+Environment Variables:
+- DB_REPLICA_URLS: URLs de las réplicas separadas por coma (vacío = sin réplicas).
+- DB_REPLICA_CHECK_INTERVAL: Segundos entre comprobaciones de salud (default 10).
+- DB_REPLICA_MAX_LAG: Retraso de replicación máximo en segundos, solo Postgres (default 5).
+- DB_READ_YOUR_WRITES: Segundos que un cliente lee del primario después de escribir (default 5).
+"""
+
+import contextvars
+import itertools
+import math
+import os
+import threading
+import time
+from http.cookies import SimpleCookie
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.loggers.loggerService import get_logger
+from src.utils.db_pool import get_pool_stats
+
+DB_REPLICA_URLS = [u.strip() for u in os.getenv("DB_REPLICA_URLS", "").split(",") if u.strip()]
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", "10"))
+DB_REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", "5"))
+DB_READ_YOUR_WRITES = float(os.getenv("DB_READ_YOUR_WRITES", "5"))
+
+COOKIE_ESCRITURA = "db_escritura"
+METODOS_ESCRITURA = {"POST", "PUT", "PATCH", "DELETE"}
+
+# Retraso de una réplica de Postgres (0 en un primario o sin transacciones replicadas)
+CONSULTA_LAG = text(
+    "SELECT CASE WHEN pg_is_in_recovery() THEN "
+    "COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+    "ELSE 0 END"
+)
+
+logger = get_logger("db_replicas")
+
+# True mientras la petición actual deba leer del primario
+_leer_del_primario = contextvars.ContextVar("leer_del_primario", default=False)
+
+
+class Replica:
+    """Una réplica: engines síncrono y asíncrono, estado de salud y contadores."""
+
+    def __init__(self, url: str, crear_engine):
+        self.engine = crear_engine(url)
+        self.nombre = self.engine.url.render_as_string(hide_password=True)
+        self._url = url
+        self._crear_engine = crear_engine
+        self._async_engine = None
+        self._sesiones_async = None
+        self.sana = True
+        self.lag_segundos = None
+        self.ultimo_error = None
+        self.lecturas = 0
+        self.caidas = 0
+        event.listen(self.engine, "handle_error", self._al_fallar)
+
+    def _al_fallar(self, contexto):
+        # Solo las desconexiones marcan la réplica; los errores de SQL son de la consulta
+        if contexto.is_disconnect or contexto.connection is None:
+            self.marcar_caida(contexto.original_exception)
+
+    def sesiones_async(self):
+        """async_sessionmaker sobre el engine asíncrono de la réplica (se crea al primer uso)."""
+        if self._sesiones_async is None:
+            self._async_engine = self._crear_engine(self._url, asincrono=True)
+            event.listen(self._async_engine.sync_engine, "handle_error", self._al_fallar)
+            self._sesiones_async = async_sessionmaker(
+                self._async_engine, autoflush=False, expire_on_commit=False
+            )
+        return self._sesiones_async
+
+    def marcar_caida(self, error):
+        if self.sana:
+            self.caidas += 1
+            logger.warning(f"Réplica {self.nombre} fuera de servicio: {error}")
+        self.sana = False
+        self.ultimo_error = str(error)[:200]
+
+    def comprobar(self):
+        """Comprueba la conexión y el retraso de replicación; actualiza `sana`."""
+        try:
+            with self.engine.connect() as conexion:
+                if self.engine.dialect.name == "postgresql":
+                    self.lag_segundos = float(conexion.execute(CONSULTA_LAG).scalar())
+                else:
+                    conexion.execute(text("SELECT 1"))
+                    self.lag_segundos = None
+        except Exception as e:
+            self.marcar_caida(e)
+            return
+        if self.lag_segundos is not None and self.lag_segundos > DB_REPLICA_MAX_LAG:
+            self.marcar_caida(f"retraso de {self.lag_segundos:.1f} s")
+            return
+        if not self.sana:
+            logger.info(f"Réplica {self.nombre} de nuevo en servicio")
+        self.sana = True
+        self.ultimo_error = None
+
+    async def cerrar(self):
+        if self._async_engine is not None:
+            await self._async_engine.dispose()
+            self._async_engine = self._sesiones_async = None
+        self.engine.dispose()
+
+    def get_stats(self) -> dict:
+        return {
+            "nombre": self.nombre,
+            "sana": self.sana,
+            "lag_segundos": self.lag_segundos,
+            "ultimo_error": self.ultimo_error,
+            "lecturas": self.lecturas,
+            "caidas": self.caidas,
+            "pool": get_pool_stats(self._async_engine.sync_engine) if self._async_engine else None,
+        }
+
+
+class EnrutadorLecturas:
+    """Elige la réplica de cada lectura y registra las escrituras recientes por cliente."""
+
+    def __init__(
+        self,
+        urls,
+        crear_engine,
+        intervalo: float = DB_REPLICA_CHECK_INTERVAL,
+        ventana: float = DB_READ_YOUR_WRITES,
+    ):
+        self.replicas = [Replica(url, crear_engine) for url in urls]
+        self.intervalo = intervalo
+        self.ventana = ventana
+        self._turno = itertools.count()
+        # Última escritura por cliente (usuario o IP) en este worker
+        self._escrituras = {}
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = None
+        self.counters = {"lecturas_primario": 0, "lecturas_por_escritura": 0, "sin_replicas": 0}
+
+    @property
+    def activo(self) -> bool:
+        return bool(self.replicas)
+
+    def elegir(self):
+        """
+        Réplica para la lectura actual, o None si debe ir al primario (sin
+        réplicas sanas o dentro de la ventana de lectura de las propias escrituras).
+        """
+        if not self.replicas:
+            return None
+        if _leer_del_primario.get():
+            self.counters["lecturas_por_escritura"] += 1
+            self.counters["lecturas_primario"] += 1
+            return None
+        sanas = [r for r in self.replicas if r.sana]
+        if not sanas:
+            self.counters["sin_replicas"] += 1
+            self.counters["lecturas_primario"] += 1
+            return None
+        replica = sanas[next(self._turno) % len(sanas)]
+        replica.lecturas += 1
+        return replica
+
+    def registrar_escritura(self, clave: str, momento: float = None):
+        momento = momento or time.time()
+        with self._lock:
+            self._escrituras[clave] = momento
+            # Descartar los clientes cuya ventana ya venció
+            if len(self._escrituras) > 1000:
+                limite = momento - self.ventana
+                self._escrituras = {k: t for k, t in self._escrituras.items() if t > limite}
+
+    def escritura_reciente(self, clave: str, cookie: float = None) -> bool:
+        ahora = time.time()
+        # La cookie la envía el cliente: un momento futuro (o inf/nan) no es una
+        # escritura real y dejaría sus lecturas en el primario indefinidamente
+        if cookie is None or not math.isfinite(cookie) or cookie > ahora:
+            cookie = 0.0
+        ultima = max(self._escrituras.get(clave, 0.0), cookie)
+        return ahora - ultima < self.ventana
+
+    def comprobar(self):
+        for replica in self.replicas:
+            replica.comprobar()
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            self.comprobar()
+            self._detener.wait(self.intervalo)
+
+    def iniciar(self):
+        """Arranca el hilo de comprobación de salud (si hay réplicas)."""
+        if not self.replicas or self._hilo is not None:
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._bucle, name="replicas-salud", daemon=True)
+        self._hilo.start()
+
+    async def detener(self):
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=5)
+            self._hilo = None
+        for replica in self.replicas:
+            await replica.cerrar()
+
+    def get_stats(self) -> dict:
+        return {
+            "replicas": [r.get_stats() for r in self.replicas],
+            "ventana_segundos": self.ventana,
+            "intervalo_segundos": self.intervalo,
+            "clientes_en_ventana": sum(
+                1 for t in list(self._escrituras.values()) if time.time() - t < self.ventana
+            ),
+            **self.counters,
+        }
+
+
+class ConsistenciaLecturaMiddleware:
+    """
+    Middleware ASGI de lectura de las propias escrituras: marca las peticiones
+    de clientes que escribieron hace menos de DB_READ_YOUR_WRITES segundos
+    para que lean del primario, y registra las escrituras exitosas.
+    """
+
+    def __init__(self, app: ASGIApp, enrutador: EnrutadorLecturas):
+        self.app = app
+        self.enrutador = enrutador
+
+    @staticmethod
+    def _clave(request: Request) -> str:
+        # Usuario verificado por GroupMembershipMiddleware; si no hay, la IP
+        payload = getattr(request.state, "user_payload", None) or {}
+        usuario = payload.get("sub") or payload.get("nickname")
+        if usuario:
+            return f"u:{usuario}"
+        return "ip:" + request.headers.get("X-Forwarded-For", request.client.host if request.client else "")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        enrutador = self.enrutador
+        if scope["type"] != "http" or not enrutador.activo:
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        clave = self._clave(request)
+        try:
+            cookie = float(request.cookies.get(COOKIE_ESCRITURA, 0))
+        except ValueError:
+            cookie = 0.0
+        token = _leer_del_primario.set(enrutador.escritura_reciente(clave, cookie))
+
+        if scope["method"] not in METODOS_ESCRITURA:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                _leer_del_primario.reset(token)
+            return
+
+        async def send_con_registro(message: Message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                # La respuesta sale después del commit: desde aquí cuenta la ventana
+                momento = time.time()
+                enrutador.registrar_escritura(clave, momento)
+                galleta = SimpleCookie()
+                galleta[COOKIE_ESCRITURA] = f"{momento:.3f}"
+                galleta[COOKIE_ESCRITURA]["max-age"] = max(int(enrutador.ventana), 1)
+                galleta[COOKIE_ESCRITURA]["path"] = "/"
+                galleta[COOKIE_ESCRITURA]["httponly"] = True
+                galleta[COOKIE_ESCRITURA]["samesite"] = "lax"
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"set-cookie", galleta.output(header="").strip().encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_con_registro)
+        finally:
+            _leer_del_primario.reset(token)
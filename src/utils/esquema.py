@@ -0,0 +1,79 @@
+"""
+esquema.py
+Tablas, columnas e índices agregados después del esquema inicial.
+
+`Base.metadata.create_all` solo corre con RESET_DB=true, que además borra los
+datos. Para que una base existente reciba los objetos nuevos sin reiniciarla,
+el lifespan llama a `asegurar_esquema`, que crea lo que falte con `checkfirst`
+y agrega las columnas faltantes sin tocar los datos. También siembra las filas
+de contador_documento que falten con el MAX de cada numeración. Es idempotente
+y seguro de ejecutar en todos los workers a la vez. scripts/create_schema.sql
+lleva el mismo DDL para las instalaciones que crean el esquema con psql.
+"""
+
+from sqlalchemy import Table, inspect, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateColumn
+
+from database import engine
+from src.documento.contadorModel import ContadorDocumento
+from src.documento.docModel import ix_documento_fecha_emision_id
+from src.documento.documentoService.numeracionService import sembrar_contadores
+from src.documento.imprenta.imprentaModel import SmartJob
+from src.monedas.dolar.dolarModel import DolarHistorial
+from src.utils.cache_stamp import CacheStamp
+
+# Tablas creadas si faltan (con sus índices)
+TABLAS = [
+    SmartJob.__table__,
+    ContadorDocumento.__table__,
+    CacheStamp.__table__,
+    DolarHistorial.__table__,
+]
+
+# Columnas agregadas a tablas que pueden existir sin ellas: (tabla, columna)
+COLUMNAS = [
+    (SmartJob.__table__, SmartJob.__table__.c.depende_de),
+]
+
+# Índices sobre tablas preexistentes
+INDICES = [
+    ix_documento_fecha_emision_id,
+]
+
+
+def _crear(objeto, bind):
+    try:
+        objeto.create(bind=bind, checkfirst=True)
+    except (OperationalError, ProgrammingError):
+        # Otro worker lo creó entre la comprobación y el CREATE; si no, el error es real
+        if isinstance(objeto, Table) and not inspect(bind).has_table(objeto.name):
+            raise
+
+
+def _agregar_columna(bind, tabla, columna):
+    with bind.connect() as conexion:
+        columnas = {c["name"] for c in inspect(conexion).get_columns(tabla.name)}
+        if columna.name in columnas:
+            return
+        definicion = CreateColumn(columna).compile(dialect=bind.dialect)
+        try:
+            conexion.execute(text(f"ALTER TABLE {tabla.name} ADD COLUMN {definicion}"))
+            conexion.commit()
+            print(f"Columna {tabla.name}.{columna.name} agregada.")
+        except (OperationalError, ProgrammingError):
+            conexion.rollback()
+
+
+def asegurar_esquema(bind=engine):
+    """Crea las tablas, columnas e índices nuevos que falten en la base."""
+    for tabla in TABLAS:
+        _crear(tabla, bind)
+    for tabla, columna in COLUMNAS:
+        _agregar_columna(bind, tabla, columna)
+    for indice in INDICES:
+        _crear(indice, bind)
+    # Los contadores parten del MAX actual: una base existente continúa su numeración
+    with Session(bind) as db, db.begin():
+        sembrar_contadores(db)
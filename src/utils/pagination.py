@@ -0,0 +1,124 @@
+"""
+pagination.py
+Paginación por cursor (keyset) para los listados.
+
+Cada listado se ordena por una clave única, por ejemplo (fecha_emision, id) o la
+clave primaria, y el cursor codifica los valores de esa clave para el último
+elemento entregado. La página siguiente se obtiene con `WHERE (clave) > (cursor)`,
+que usa el índice y cuesta lo mismo en la página 1 que en la 10.000, a diferencia
+de OFFSET, que recorre y descarta todas las filas anteriores.
+
+El cursor es opaco para el cliente (base64 de JSON) y se entrega en el
+encabezado `X-Next-Cursor` para que las respuestas sigan siendo listas. Cuando no
+hay más resultados el encabezado no se envía. `offset`/`page` se mantienen como
+alternativa obsoleta; también devuelven el cursor de la página siguiente.
+"""
+
+import base64
+import binascii
+import json
+from datetime import date, datetime, time
+
+from fastapi import Response
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+CURSOR_DESCRIPTION = (
+    f"Cursor opaco de la página siguiente, tomado del encabezado {NEXT_CURSOR_HEADER}."
+)
+OFFSET_DESCRIPTION = "Obsoleto: usar `cursor`. Se mantiene por compatibilidad."
+
+
+class CursorInvalidoError(ValueError):
+    """El cursor recibido no se pudo decodificar o no corresponde al listado."""
+
+
+class Pagina(list):
+    """Lista de resultados con el cursor de la página siguiente (None si no hay más)."""
+
+    def __init__(self, items=(), next_cursor: str = None):
+        super().__init__(items)
+        self.next_cursor = next_cursor
+
+
+# region Cursor
+def _codificar_valor(valor):
+    if isinstance(valor, datetime):
+        return {"dt": valor.isoformat()}
+    if isinstance(valor, date):
+        return {"d": valor.isoformat()}
+    if isinstance(valor, time):
+        return {"t": valor.isoformat()}
+    return valor
+
+
+def _decodificar_valor(valor):
+    if isinstance(valor, dict):
+        if "dt" in valor:
+            return datetime.fromisoformat(valor["dt"])
+        if "d" in valor:
+            return date.fromisoformat(valor["d"])
+        if "t" in valor:
+            return time.fromisoformat(valor["t"])
+        raise CursorInvalidoError("Cursor inválido.")
+    return valor
+
+
+def encode_cursor(valores) -> str:
+    datos = json.dumps([_codificar_valor(v) for v in valores], separators=(",", ":"))
+    return base64.urlsafe_b64encode(datos.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, cantidad: int) -> list:
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if not isinstance(valores, list) or len(valores) != cantidad:
+            raise CursorInvalidoError("Cursor inválido.")
+        return [_decodificar_valor(v) for v in valores]
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError, ValueError, TypeError) as e:
+        raise CursorInvalidoError("Cursor inválido.") from e
+
+
+# endregion
+
+
+def paginar(query, columnas, limit: int, cursor: str = None, offset: int = 0) -> Pagina:
+    """
+    Ordena `query` por `columnas` (que deben formar una clave única) y devuelve
+    una página de hasta `limit` elementos.
+
+    Args:
+        query: Consulta de SQLAlchemy (entidades o columnas) sin ORDER BY/LIMIT.
+        columnas: Columnas de la clave de orden; sus nombres deben poder leerse
+            como atributos de cada resultado.
+        cursor: Cursor devuelto por la página anterior.
+        offset: Alternativa obsoleta; se ignora si hay cursor.
+    """
+    columnas = list(columnas)
+    query = query.order_by(*columnas)
+    if cursor:
+        valores = decode_cursor(cursor, len(columnas))
+        if len(columnas) == 1:
+            query = query.filter(columnas[0] > valores[0])
+        else:
+            query = query.filter(tuple_(*columnas) > tuple_(*valores))
+    elif offset:
+        query = query.offset(offset)
+
+    # Se pide un elemento extra para saber si existe una página siguiente
+    items = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        ultimo = items[-1]
+        next_cursor = encode_cursor([getattr(ultimo, columna.key) for columna in columnas])
+    return Pagina(items, next_cursor)
+
+
+def agregar_cursor(response: Response, pagina) -> None:
+    """Publica el cursor de la página siguiente en el encabezado de la respuesta."""
+    next_cursor = getattr(pagina, "next_cursor", None)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
@@ -0,0 +1,186 @@
+"""
+sql_metricas.py
+Instrumentación de las consultas SQL por petición.
+
+Los eventos before/after_cursor_execute de SQLAlchemy (registrados sobre la
+clase Engine, así cubren el engine síncrono, el asíncrono y las réplicas)
+suman en la ConsultasPeticion activa la cantidad de consultas, su tiempo y
+cuántas veces se ejecutó cada forma de sentencia (el SQL con sus parámetros
+sin valores y las listas de IN colapsadas).
+
+SQLMetricasMiddleware abre una ConsultasPeticion por petición HTTP. La
+respuesta lleva los encabezados `Server-Timing: db;dur=...;desc="N consultas"`
+y `X-DB-Queries`, y al terminar se registra una línea en el log. La
+ConsultasPeticion vive en una ContextVar, que se copia a los hilos del
+threadpool y a `AsyncSession.run_sync`, así que cuenta también las rutas `def`.
+
+Detector de N+1 (desarrollo y pruebas): con SQL_N1_UMBRAL > 0, una petición
+que ejecuta el mismo SELECT más de ese número de veces se registra como
+advertencia con la sentencia repetida y lleva el encabezado `X-DB-N1`.
+
+Presupuestos de consultas: una prueba de endpoint compara `X-DB-Queries` con su
+presupuesto (scripts/check_consultas.py); una prueba de servicio usa
+`contar_consultas()`:
+
+    with contar_consultas() as consultas:
+        get_all_documentos(db, limit=50)
+    assert consultas.total <= 3, consultas.resumen()
+
+Environment Variables:
+- SQL_METRICAS: Agrega los encabezados y la línea de log por petición (default true).
+- SQL_N1_UMBRAL: Repeticiones de un mismo SELECT por petición a partir de las que se marca un N+1; 0 lo desactiva (default 0).
+"""
+
+import contextvars
+import os
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.loggers.loggerService import get_logger, get_request_info
+
+SQL_METRICAS = os.getenv("SQL_METRICAS", "true").lower() == "true"
+SQL_N1_UMBRAL = int(os.getenv("SQL_N1_UMBRAL", "0"))
+
+logger = get_logger("sql_metricas")
+
+# IN (?, ?, ?) / IN (%(id_1_1)s, %(id_1_2)s) / IN ($1, $2): el largo de la lista no cambia la forma
+_LISTA_IN = re.compile(r"\bIN \((?:\s*(?:\?|%\(\w+\)s|\$\d+|:\w+)\s*,?)+\)", re.IGNORECASE)
+_ESPACIOS = re.compile(r"\s+")
+
+_consultas_actual = contextvars.ContextVar("consultas_sql", default=None)
+
+
+def forma_sentencia(sentencia: str) -> str:
+    """SQL normalizado para agrupar las ejecuciones de una misma consulta."""
+    return _LISTA_IN.sub("IN (...)", _ESPACIOS.sub(" ", sentencia).strip())
+
+
+class ConsultasPeticion:
+    """Consultas ejecutadas dentro de una petición (o de un bloque contar_consultas)."""
+
+    def __init__(self):
+        self.total = 0
+        self.tiempo_ms = 0.0
+        self.formas = Counter()
+
+    def registrar(self, sentencia: str, duracion_ms: float):
+        # Las consultas de una petición pueden venir de varios hilos (run_sync,
+        # threadpool), pero no a la vez: la sesión no se comparte entre hilos
+        self.total += 1
+        self.tiempo_ms += duracion_ms
+        self.formas[forma_sentencia(sentencia)] += 1
+
+    def repetidas(self, umbral: int):
+        """SELECT ejecutados más de `umbral` veces, del más repetido al menos."""
+        # Los INSERT/UPDATE repetidos de un flush no son lecturas N+1
+        return [
+            (forma, n)
+            for forma, n in self.formas.most_common()
+            if n > umbral and forma[:6].upper() in ("SELECT", "WITH R")
+        ]
+
+    def resumen(self, maximo: int = 5) -> str:
+        lineas = [f"{self.total} consultas, {self.tiempo_ms:.1f} ms"]
+        lineas += [f"  {n}x {forma[:200]}" for forma, n in self.formas.most_common(maximo)]
+        return "\n".join(lineas)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    if _consultas_actual.get() is not None:
+        conn.info.setdefault("sql_inicio", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    consultas = _consultas_actual.get()
+    inicios = conn.info.get("sql_inicio")
+    if consultas is None or not inicios:
+        return
+    consultas.registrar(statement, (time.perf_counter() - inicios.pop()) * 1000)
+
+
+@event.listens_for(Engine, "handle_error")
+def _al_fallar(contexto):
+    # La sentencia fallida no llega a after_cursor_execute: descartar su inicio
+    if contexto.connection is not None:
+        inicios = contexto.connection.info.get("sql_inicio")
+        if inicios:
+            inicios.pop()
+
+
+@contextmanager
+def contar_consultas():
+    """Cuenta las consultas ejecutadas dentro del bloque (pruebas y scripts)."""
+    consultas = ConsultasPeticion()
+    token = _consultas_actual.set(consultas)
+    try:
+        yield consultas
+    finally:
+        _consultas_actual.reset(token)
+
+
+class SQLMetricasMiddleware:
+    """
+    Middleware ASGI que cuenta las consultas y el tiempo de base de datos de
+    cada petición, los publica en Server-Timing y X-DB-Queries, los registra en
+    el log y marca los N+1 (SQL_N1_UMBRAL).
+    """
+
+    def __init__(self, app: ASGIApp, umbral_n1: int = SQL_N1_UMBRAL):
+        self.app = app
+        self.umbral_n1 = umbral_n1
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not SQL_METRICAS:
+            await self.app(scope, receive, send)
+            return
+
+        consultas = ConsultasPeticion()
+        token = _consultas_actual.set(consultas)
+        repetidas = []
+
+        async def send_con_metricas(message: Message):
+            if message["type"] == "http.response.start":
+                # Las consultas de la ruta ya terminaron cuando empieza la respuesta
+                encabezados = list(message.get("headers", []))
+                encabezados.append((
+                    b"server-timing",
+                    f'db;dur={consultas.tiempo_ms:.1f};desc="{consultas.total} consultas"'.encode(),
+                ))
+                encabezados.append((b"x-db-queries", str(consultas.total).encode()))
+                if self.umbral_n1 > 0:
+                    repetidas.extend(consultas.repetidas(self.umbral_n1))
+                    if repetidas:
+                        encabezados.append((b"x-db-n1", str(repetidas[0][1]).encode()))
+                message["headers"] = encabezados
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_con_metricas)
+        finally:
+            _consultas_actual.reset(token)
+            if consultas.total:
+                self._registrar(scope, consultas, repetidas)
+
+    @staticmethod
+    def _registrar(scope: Scope, consultas: ConsultasPeticion, repetidas):
+        request = Request(scope)
+        request_info = get_request_info(request)
+        ruta = f"{scope['method']} {scope['path']}"
+        logger.info(
+            f"SQL {ruta}: {consultas.total} consultas, {consultas.tiempo_ms:.1f} ms",
+            extra=request_info,
+        )
+        for forma, n in repetidas:
+            logger.warning(
+                f"Posible N+1 en {ruta}: {n} ejecuciones de {forma[:300]}",
+                extra=request_info,
+            )
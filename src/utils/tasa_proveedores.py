@@ -0,0 +1,322 @@
+"""
+tasa_proveedores.py
+Obtención de la tasa del dólar BCV desde varias fuentes.
+
+Cada fuente (ProveedorTasa) tiene su propio timeout. Todas se consultan en
+paralelo y cada una reintenta con backoff exponencial y jitter ante errores.
+Una tasa se descarta si no es un número positivo. Las que se alejan de la
+última tasa conocida más de DOLAR_VARIACION_MAXIMA (fracción) quedan fuera de
+banda y solo se usan si no hay ninguna dentro y además al menos
+DOLAR_FUENTES_CONSENSO fuentes coinciden entre sí (dentro de
+DOLAR_TOLERANCIA_CONSENSO), como ocurre con una devaluación real, o si
+DOLAR_ACEPTAR_FUERA_DE_BANDA=true. Si no, se registra un error con la tasa
+rechazada y cómo aceptarla. La selección puede ser:
+- "mediana": espera a todas las fuentes (acotado por sus timeouts) y usa la
+  mediana de las tasas válidas; una fuente que devuelve un valor raro no
+  mueve el resultado si las demás coinciden.
+- "primero": usa la primera tasa válida que llega.
+
+La fuente "local" devuelve DOLAR_TASA_LOCAL sin tocar la red, para desarrollo
+y pruebas; también se puede construir un ObtenedorTasa con ProveedorFijo.
+
+Environment Variables:
+- DOLAR_PROVEEDORES: Fuentes separadas por coma, en orden (default "dolarapi,bcv").
+- DOLAR_SELECCION: "mediana" o "primero" (default "mediana").
+- DOLAR_TIMEOUT: Timeout en segundos de cada fuente (default 10); se puede
+  ajustar por fuente con DOLAR_TIMEOUT_<FUENTE>, p. ej. DOLAR_TIMEOUT_BCV.
+- DOLAR_REINTENTOS, DOLAR_BACKOFF_BASE: Reintentos por fuente y backoff base en segundos.
+- DOLAR_VARIACION_MAXIMA: Variación máxima aceptada frente a la última tasa (default 0.25).
+- DOLAR_FUENTES_CONSENSO: Fuentes que deben coincidir para aceptar una tasa fuera de banda (default 2).
+- DOLAR_TOLERANCIA_CONSENSO: Diferencia relativa máxima entre fuentes que coinciden (default 0.02).
+- DOLAR_ACEPTAR_FUERA_DE_BANDA: Acepta una tasa fuera de banda aunque la dé una sola
+  fuente (default false); pensado para activarlo una vez tras una devaluación.
+- DOLAR_TASA_LOCAL: Tasa que devuelve la fuente "local".
+"""
+
+import math
+import os
+import random
+import statistics
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import httpx
+
+from src.loggers.loggerService import get_logger
+
+DOLAR_PROVEEDORES = os.getenv("DOLAR_PROVEEDORES", "dolarapi,bcv")
+DOLAR_SELECCION = os.getenv("DOLAR_SELECCION", "mediana")
+DOLAR_TIMEOUT = float(os.getenv("DOLAR_TIMEOUT", "10"))
+DOLAR_REINTENTOS = int(os.getenv("DOLAR_REINTENTOS", "2"))
+DOLAR_BACKOFF_BASE = float(os.getenv("DOLAR_BACKOFF_BASE", "1"))
+DOLAR_VARIACION_MAXIMA = float(os.getenv("DOLAR_VARIACION_MAXIMA", "0.25"))
+DOLAR_FUENTES_CONSENSO = int(os.getenv("DOLAR_FUENTES_CONSENSO", "2"))
+DOLAR_TOLERANCIA_CONSENSO = float(os.getenv("DOLAR_TOLERANCIA_CONSENSO", "0.02"))
+DOLAR_ACEPTAR_FUERA_DE_BANDA = os.getenv("DOLAR_ACEPTAR_FUERA_DE_BANDA", "false").lower() == "true"
+
+SELECCIONES = ("mediana", "primero")
+
+logger = get_logger("tasa_proveedores")
+
+
+class TasaInvalidaError(ValueError):
+    """La fuente respondió, pero con una tasa que no pasa las validaciones."""
+
+
+# region Proveedores
+class ProveedorTasa(ABC):
+    """Fuente de la tasa del dólar. `obtener()` devuelve la tasa o lanza una excepción."""
+
+    def __init__(self, nombre: str, timeout: float = None):
+        self.nombre = nombre
+        self.timeout = timeout if timeout is not None else float(
+            os.getenv(f"DOLAR_TIMEOUT_{nombre.upper()}", DOLAR_TIMEOUT)
+        )
+
+    @abstractmethod
+    def obtener(self) -> float:
+        ...
+
+
+class ProveedorHttp(ProveedorTasa):
+    """Fuente HTTP: descarga `url` y extrae la tasa de la respuesta con `extraer`."""
+
+    def __init__(self, nombre: str, url: str, extraer, timeout: float = None):
+        super().__init__(nombre, timeout)
+        self.url = url
+        self.extraer = extraer
+
+    def obtener(self) -> float:
+        respuesta = httpx.get(self.url, timeout=self.timeout, follow_redirects=True)
+        respuesta.raise_for_status()
+        return self.extraer(respuesta)
+
+
+class ProveedorFijo(ProveedorTasa):
+    """Fuente local que devuelve siempre la misma tasa (desarrollo y pruebas)."""
+
+    def __init__(self, nombre: str, precio, timeout: float = None):
+        super().__init__(nombre, timeout)
+        self.precio = precio
+
+    def obtener(self) -> float:
+        if self.precio is None:
+            raise TasaInvalidaError(f"La fuente {self.nombre} no tiene una tasa configurada.")
+        return float(self.precio)
+
+
+def _extraer_dolarapi(respuesta) -> float:
+    return respuesta.json()["promedio"]
+
+
+def _extraer_bcv(respuesta) -> float:
+    # bs4 se importa aquí: solo esta fuente lo usa y su importación es costosa
+    from bs4 import BeautifulSoup
+
+    # Página del BCV: <div id="dolar"> ... <strong> 36,50370000 </strong>
+    valor = BeautifulSoup(respuesta.text, "html.parser").select_one("#dolar strong")
+    if valor is None:
+        raise TasaInvalidaError("No se encontró la tasa del dólar en la página del BCV.")
+    return float(valor.get_text(strip=True).replace(".", "").replace(",", "."))
+
+
+def crear_proveedor(nombre: str) -> ProveedorTasa:
+    """Construye una fuente registrada a partir de su nombre."""
+    if nombre == "dolarapi":
+        return ProveedorHttp(
+            nombre, "https://ve.dolarapi.com/v1/dolares/oficial", _extraer_dolarapi
+        )
+    if nombre == "bcv":
+        return ProveedorHttp(nombre, "https://www.bcv.org.ve/", _extraer_bcv)
+    if nombre == "local":
+        return ProveedorFijo(nombre, os.getenv("DOLAR_TASA_LOCAL"))
+    raise ValueError(f"Fuente de tasa desconocida: {nombre}")
+
+
+# endregion
+
+
+class ObtenedorTasa:
+    """Consulta varias fuentes en paralelo y elige una tasa válida."""
+
+    def __init__(
+        self,
+        proveedores: list,
+        seleccion: str = DOLAR_SELECCION,
+        reintentos: int = DOLAR_REINTENTOS,
+        backoff_base: float = DOLAR_BACKOFF_BASE,
+        variacion_maxima: float = DOLAR_VARIACION_MAXIMA,
+        fuentes_consenso: int = DOLAR_FUENTES_CONSENSO,
+        tolerancia_consenso: float = DOLAR_TOLERANCIA_CONSENSO,
+        aceptar_fuera_de_banda: bool = DOLAR_ACEPTAR_FUERA_DE_BANDA,
+    ):
+        if seleccion not in SELECCIONES:
+            raise ValueError(f"Selección de tasa desconocida: {seleccion}")
+        self.proveedores = proveedores
+        self.seleccion = seleccion
+        self.reintentos = reintentos
+        self.backoff_base = backoff_base
+        self.variacion_maxima = variacion_maxima
+        self.fuentes_consenso = fuentes_consenso
+        self.tolerancia_consenso = tolerancia_consenso
+        self.aceptar_fuera_de_banda = aceptar_fuera_de_banda
+        self._lock = threading.Lock()
+        self._estadisticas = {
+            proveedor.nombre: {"exitos": 0, "fallos": 0, "ultimo_error": None, "ultima_tasa": None}
+            for proveedor in proveedores
+        }
+
+    def _backoff(self, intento: int) -> float:
+        # Backoff exponencial con "full jitter"
+        return random.uniform(0, self.backoff_base * (2 ** intento))
+
+    def _validar(self, precio) -> float:
+        precio = float(precio)
+        if not math.isfinite(precio) or precio <= 0:
+            raise TasaInvalidaError(f"Tasa no válida: {precio}")
+        return precio
+
+    def _banda(self, tasa_anterior):
+        """Rango [mínimo, máximo] aceptado frente a la última tasa, o None si no hay tasa anterior."""
+        if not tasa_anterior:
+            return None
+        return (
+            tasa_anterior / (1 + self.variacion_maxima),
+            tasa_anterior * (1 + self.variacion_maxima),
+        )
+
+    def _consenso(self, tasas: list) -> list:
+        """Tasas que coinciden con la mediana de `tasas` dentro de la tolerancia de consenso."""
+        mediana = statistics.median(tasas)
+        return [t for t in tasas if abs(t - mediana) <= mediana * self.tolerancia_consenso]
+
+    def _fuera_de_banda(self, tasas: list, tasa_anterior, banda):
+        """
+        Decide qué hacer cuando todas las tasas recibidas están fuera de banda:
+        devuelve las que se aceptan (por consenso o por DOLAR_ACEPTAR_FUERA_DE_BANDA)
+        o una lista vacía, registrando el motivo en ambos casos.
+        """
+        coinciden = self._consenso(tasas)
+        minimo, maximo = banda
+        detalle = (
+            f"tasas {sorted(tasas)} fuera del rango [{minimo:.4f}, {maximo:.4f}] "
+            f"alrededor de la última tasa {tasa_anterior}"
+        )
+        if len(coinciden) >= self.fuentes_consenso:
+            logger.warning(
+                f"Se acepta una tasa fuera de banda porque {len(coinciden)} fuentes coinciden: {detalle}"
+            )
+            return coinciden
+        if self.aceptar_fuera_de_banda:
+            logger.warning(f"Se acepta una tasa fuera de banda (DOLAR_ACEPTAR_FUERA_DE_BANDA): {detalle}")
+            return tasas
+        logger.error(
+            f"Tasa del dólar no actualizada: {detalle}, y no hay {self.fuentes_consenso} "
+            "fuentes que coincidan entre sí. Si la variación es real, "
+            "agregue fuentes en DOLAR_PROVEEDORES, defina DOLAR_ACEPTAR_FUERA_DE_BANDA=true "
+            "hasta la próxima actualización o aumente DOLAR_VARIACION_MAXIMA."
+        )
+        return []
+
+    def _consultar(self, proveedor: ProveedorTasa, detener: threading.Event):
+        """Consulta una fuente con reintentos; devuelve la tasa validada o None."""
+        for intento in range(self.reintentos + 1):
+            inicio = time.perf_counter()
+            try:
+                precio = self._validar(proveedor.obtener())
+            except TasaInvalidaError as e:
+                # Un valor inválido no mejora al reintentar
+                self._registrar(proveedor.nombre, error=str(e))
+                return None
+            except Exception as e:
+                self._registrar(proveedor.nombre, error=f"{type(e).__name__}: {e}")
+                if intento < self.reintentos and not detener.wait(self._backoff(intento)):
+                    continue
+                return None
+            self._registrar(
+                proveedor.nombre,
+                precio=precio,
+                ms=(time.perf_counter() - inicio) * 1000,
+            )
+            return precio
+        return None
+
+    def _registrar(self, nombre: str, precio=None, ms=None, error=None):
+        with self._lock:
+            estadistica = self._estadisticas[nombre]
+            if error is not None:
+                estadistica["fallos"] += 1
+                estadistica["ultimo_error"] = error
+                logger.warning(f"Fuente de tasa {nombre}: {error}")
+            else:
+                estadistica["exitos"] += 1
+                estadistica["ultima_tasa"] = precio
+                estadistica["ultima_latencia_ms"] = round(ms, 2)
+
+    def obtener(self, tasa_anterior=None):
+        """
+        Devuelve la tasa elegida (redondeada a 4 decimales) o None si ninguna
+        fuente dio una tasa válida o aceptable.
+
+        Args:
+            tasa_anterior: Última tasa conocida, para descartar valores fuera de rango.
+        """
+        if not self.proveedores:
+            return None
+        banda = self._banda(tasa_anterior)
+
+        def dentro(tasa):
+            return banda is None or banda[0] <= tasa <= banda[1]
+
+        detener = threading.Event()
+        pool = ThreadPoolExecutor(
+            max_workers=len(self.proveedores), thread_name_prefix="tasa"
+        )
+        try:
+            pendientes = {
+                pool.submit(self._consultar, proveedor, detener)
+                for proveedor in self.proveedores
+            }
+            tasas = []
+            while pendientes:
+                listos, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+                tasas.extend(f.result() for f in listos if f.result() is not None)
+                if self.seleccion == "primero" and any(dentro(t) for t in tasas):
+                    break
+        finally:
+            # Las fuentes que siguen en curso terminan solas al vencer su timeout
+            detener.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        if not tasas:
+            logger.error("Ninguna fuente devolvió una tasa del dólar válida.")
+            return None
+        en_banda = [t for t in tasas if dentro(t)]
+        for tasa in tasas:
+            if not dentro(tasa):
+                logger.warning(f"Tasa {tasa} fuera del rango esperado [{banda[0]:.4f}, {banda[1]:.4f}]")
+        tasas = en_banda or self._fuera_de_banda(tasas, tasa_anterior, banda)
+        if not tasas:
+            return None
+        precio = tasas[0] if self.seleccion == "primero" else statistics.median(tasas)
+        return round(precio, 4)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "seleccion": self.seleccion,
+                "variacion_maxima": self.variacion_maxima,
+                "fuentes_consenso": self.fuentes_consenso,
+                "aceptar_fuera_de_banda": self.aceptar_fuera_de_banda,
+                "fuentes": {
+                    nombre: dict(estadistica)
+                    for nombre, estadistica in self._estadisticas.items()
+                },
+            }
+
+
+obtenedor_tasa = ObtenedorTasa(
+    [crear_proveedor(nombre.strip()) for nombre in DOLAR_PROVEEDORES.split(",") if nombre.strip()]
+)
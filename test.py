@@ -1,11 +1,38 @@
+import os
+
 from locust import HttpUser, task, between
 
+# Token Bearer con acceso de administrador para las rutas protegidas
+TOKEN = os.getenv("LOCUST_TOKEN", "")
+# Espera entre peticiones en segundos (0 para medir requests/segundo)
+WAIT = float(os.getenv("LOCUST_WAIT", "1"))
+
+
 class PerformanceTest(HttpUser):
-    wait_time = between(1, 1)  # Tiempo de espera entre peticiones (en segundos)
+    wait_time = between(WAIT, WAIT)  # Tiempo de espera entre peticiones (en segundos)
+
+    def on_start(self):
+        if TOKEN:
+            self.client.headers.update({"Authorization": f"Bearer {TOKEN}"})
 
     @task
     def test_empresa_endpoint(self):
         self.client.get("/empresa/")  # Realiza una petición GET al endpoint
 
+    @task
+    def test_documento_endpoint(self):
+        self.client.get("/documento/")
+
+    @task
+    def test_openapi_endpoint(self):
+        # Ruta excluida: mide el costo de los middlewares sin autenticación
+        self.client.get("/openapi.json")
+
+
 # Para ejecutar el script, usa el siguiente comando en la terminal:
-# locust -f performance_test.py --host=https://fact.talentoonline.com
\ No newline at end of file
+# LOCUST_TOKEN=<token> locust -f test.py --host=https://fact.talentoonline.com
+#
+# Para comparar requests/segundo antes y después de un cambio, ejecutar sin espera
+# entre peticiones y con los mismos parámetros en ambas versiones:
+# LOCUST_TOKEN=<token> LOCUST_WAIT=0 locust -f test.py --headless -u 50 -r 50 -t 60s \
+#     --host=http://localhost:8000 --csv=bench